@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import pygame
+
+# Sprite registry
+# name: (file, in-game size, fallback color, fallback size, message shown when the file cannot be loaded)
+SPRITES = {
+    "player": ("我方飛船.png", (50, 50), (0, 0, 255), (50, 50), "無法載入玩家飛船圖片，使用藍色方塊"),
+    "enemy": ("敵方飛船.png", (40, 40), (255, 0, 0), (30, 30), "無法載入敵方飛船圖片，使用紅色方塊"),
+    "boss": ("boss.png", (150, 150), (128, 0, 128), (150, 150), "無法載入頭目圖片，使用紫色方塊"),
+    "wingman": ("僚機.png", (40, 40), (255, 255, 255), (40, 40), "無法載入僚機圖片，使用白色方塊"),
+    "drone": ("無人機.png", (20, 20), (0, 255, 255), (10, 10), "無法載入無人機圖片，使用青色方塊"),
+    "bouncing_ball": ("彈球.png", (15, 15), (255, 255, 0), (15, 15), "無法載入彈球圖片，使用黃色方塊"),
+}
+
+# Texture atlas produced by bake_assets.py
+ATLAS_IMAGE = "atlas.png"
+ATLAS_INDEX = "atlas.json"
+
+# On-disk cache of scaled, decoded pixels (see PixelCache)
+PIXEL_CACHE_VERSION = 1 # Bump when the stored format or the scaling changes
+PIXEL_CACHE_NAME = "bullet_hell_shooter" # Directory under the user's cache directory
+PIXEL_CACHE_ENV = "BULLET_HELL_CACHE_DIR" # Environment variable naming another cache directory (tests, batch runs)
+PIXEL_HEADER = struct.Struct("<II") # width, height; RGBA rows follow
+
+
+def default_cache_dir():
+    # Per user and writable, also when the game runs from a read-only PyInstaller bundle
+    override = os.environ.get(PIXEL_CACHE_ENV)
+    if override:
+        return override
+    root = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, PIXEL_CACHE_NAME)
+
+
+# Raw pixel cache: the RGBA bytes of every image after scaling, so later launches skip PNG decoding and scaling.
+# Entries are named after the source file's path, size and mtime plus the target size, so an edited image is
+# simply decoded again. Only reads files and pixel buffers, so the loader thread can use it.
+class PixelCache():
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, path, size):
+        stat = os.stat(path)
+        key = f"{PIXEL_CACHE_VERSION}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{size}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".rgba")
+
+    def read(self, path, size=None):
+        # ((width, height), RGBA bytes) of the image at path scaled to size (None keeps its own size).
+        # Raises OSError / pygame.error like pygame.image.load when the image cannot be read.
+        entry = self.entry_path(path, size)
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+            width, height = PIXEL_HEADER.unpack_from(data)
+            if len(data) == PIXEL_HEADER.size + width * height * 4:
+                self.hits += 1
+                return (width, height), data[PIXEL_HEADER.size:]
+        except (OSError, struct.error):
+            pass
+        self.misses += 1
+        surface = pygame.image.load(path)
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+        pixels = pygame.image.tobytes(surface, "RGBA")
+        self.write(entry, surface.get_size(), pixels)
+        return surface.get_size(), pixels
+
+    def write(self, entry, size, pixels):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(PIXEL_HEADER.pack(*size))
+                f.write(pixels)
+            os.replace(temporary, entry) # Concurrent launches (batch.py workers) never see a half-written entry
+        except OSError:
+            pass # Read-only or full disk: decode again next time
+
+
+def to_surface(size, pixels, alpha=True):
+    # Display-format Surface from RGBA bytes; convert() needs the display, so this runs on the main thread
+    surface = pygame.image.frombuffer(pixels, size, "RGBA")
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+# Asset manager: decodes and scales every image once, then serves it from the cache
+class AssetManager():
+    def __init__(self, base_dir, sprites=SPRITES, cache_dir=None):
+        self.base_dir = base_dir
+        self.sprites = sprites
+        self.pixel_cache = PixelCache(cache_dir if cache_dir is not None else default_cache_dir())
+        self.cache = {} # (path, size, alpha) -> scaled Surface, or (atlas, name) -> atlas subsurface
+        self.load_times = {} # (path, size, alpha) -> seconds spent decoding and scaling
+        self.hits = 0
+        self.misses = 0
+        self.atlas = None
+        self.atlas_rects = {} # name -> (x, y, w, h) inside the atlas
+        self.masks = {} # name -> pygame.mask.Mask of the sprite's surface
+
+    def read_atlas(self, index_name=ATLAS_INDEX):
+        # (index, (size, pixels), seconds) of the baked atlas, or None when there is none; safe on the loader thread
+        index_path = os.path.join(self.base_dir, index_name)
+        if not os.path.exists(index_path):
+            return None
+        start = time.perf_counter()
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        pixels = self.pixel_cache.read(os.path.join(self.base_dir, index["image"]))
+        return index, pixels, time.perf_counter() - start
+
+    def install_atlas(self, index, pixels, seconds):
+        start = time.perf_counter()
+        self.atlas = to_surface(*pixels)
+        for name, entry in index["sprites"].items():
+            self.atlas_rects[name] = tuple(entry["rect"])
+        self.load_times[(os.path.join(self.base_dir, index["image"]), self.atlas.get_size(), True)] = seconds + time.perf_counter() - start
+
+    def load_atlas(self, index_name=ATLAS_INDEX):
+        # Load the baked atlas once; sprites found in it are served as subsurfaces instead of decoding their PNG
+        if self.atlas is not None:
+            return True
+        try:
+            atlas = self.read_atlas(index_name)
+            if atlas is None:
+                return False
+            self.install_atlas(*atlas)
+        except (pygame.error, OSError, ValueError, KeyError):
+            print("無法載入貼圖集，改用原始圖片")
+            return False
+        return True
+
+    def load(self, filename, size, alpha=True, fallback_color=None, fallback_size=None, message=None):
+        path = os.path.join(self.base_dir, filename)
+        key = (path, tuple(size), alpha)
+        surface = self.cache.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        start = time.perf_counter()
+        try:
+            surface = to_surface(*self.pixel_cache.read(path, tuple(size)), alpha)
+        except (pygame.error, OSError):
+            if fallback_color is None:
+                raise
+            print(message or f"無法載入 {filename}，使用方塊")
+            # The fallback is cached too, so a missing file is only tried (and reported) once
+            surface = pygame.Surface(fallback_size or size)
+            surface.fill(fallback_color)
+        self.load_times[key] = time.perf_counter() - start
+        self.cache[key] = surface
+        return surface
+
+    def install(self, filename, size, pixels, seconds):
+        # Surface for pixels the loader thread read, cached as load() would have cached it
+        key = (os.path.join(self.base_dir, filename), tuple(size), True)
+        if key not in self.cache:
+            start = time.perf_counter()
+            self.misses += 1
+            self.cache[key] = to_surface(*pixels)
+            self.load_times[key] = seconds + time.perf_counter() - start
+
+    def covered_by_atlas(self, name, rects):
+        rect = rects.get(name)
+        return rect is not None and tuple(rect[2:]) == tuple(self.sprites[name][1])
+
+    def get(self, name):
+        # Lazy loading: a sprite that was not preloaded is loaded on first use
+        filename, size, fallback_color, fallback_size, message = self.sprites[name]
+        if self.covered_by_atlas(name, self.atlas_rects):
+            key = (ATLAS_IMAGE, name)
+            surface = self.cache.get(key)
+            if surface is None:
+                self.misses += 1
+                surface = self.cache[key] = self.atlas.subsurface(self.atlas_rects[name])
+            else:
+                self.hits += 1
+            return surface
+        # Not baked (or baked at a different size): decode the source image
+        return self.load(filename, size, True, fallback_color, fallback_size, message)
+
+    def mask(self, name):
+        # Pixel mask for the pixel-accurate narrowphase, built once from the sprite's scaled surface
+        mask = self.masks.get(name)
+        if mask is None:
+            mask = self.masks[name] = pygame.mask.from_surface(self.get(name))
+        return mask
+
+    def solid(self, size, color):
+        # Pre-rendered single-color surface, shared by every sprite drawn with it
+        key = ("solid", tuple(size), tuple(color))
+        surface = self.cache.get(key)
+        if surface is None:
+            surface = self.cache[key] = pygame.Surface(size).convert()
+            surface.fill(color)
+        return surface
+
+    def preload(self, names=None):
+        for name in (names if names is not None else self.sprites):
+            self.get(name)
+
+    def report(self):
+        lines = [f"Assets: {len(self.cache)} cached, {self.hits} hits, {self.misses} misses, "
+                 f"{sum(self.load_times.values()) * 1000:.1f} ms loading, "
+                 f"pixel cache {self.pixel_cache.hits} hits / {self.pixel_cache.misses} decoded"]
+        for (path, size, alpha), seconds in sorted(self.load_times.items(), key=lambda item: -item[1]):
+            lines.append(f"  {os.path.basename(path)} {size[0]}x{size[1]}: {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+# Background loader: a worker thread reads the atlas and every sprite's pixels (from the pixel cache, or by
+# decoding and scaling the PNG) while the main thread keeps drawing a loading screen. poll() on the main
+# thread turns whatever is ready into Surfaces in the manager's cache; afterwards get() only hits the cache.
+class AssetLoader():
+    def __init__(self, manager, names=None):
+        self.manager = manager
+        self.names = list(names if names is not None else manager.sprites)
+        self.total = len(self.names) + 1 # Sprites plus the atlas
+        self.finished = 0
+        self.ready = queue.Queue() # (kind, name, result) in completion order
+        self.thread = threading.Thread(target=self.work, name="asset-loader", daemon=True)
+        self.thread.start()
+
+    def work(self):
+        manager = self.manager
+        rects = {}
+        try:
+            atlas = manager.read_atlas() if manager.atlas is None else None
+        except (pygame.error, OSError, ValueError, KeyError):
+            atlas = None
+        if atlas is not None:
+            rects = {name: entry["rect"] for name, entry in atlas[0]["sprites"].items()}
+        self.ready.put(("atlas", None, atlas))
+        for name in self.names:
+            if manager.covered_by_atlas(name, rects) or manager.covered_by_atlas(name, manager.atlas_rects):
+                self.ready.put(("sprite", name, None)) # Cut from the atlas, nothing to decode
+                continue
+            filename, size = manager.sprites[name][:2]
+            start = time.perf_counter()
+            try:
+                pixels = manager.pixel_cache.read(os.path.join(manager.base_dir, filename), tuple(size))
+            except (pygame.error, OSError):
+                pixels = None # get() retries on the main thread and falls back to a colored box
+            self.ready.put(("sprite", name, (pixels, time.perf_counter() - start) if pixels is not None else None))
+
+    def poll(self):
+        # Installs everything the worker finished so far; returns the fraction done
+        manager = self.manager
+        while True:
+            try:
+                kind, name, result = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "atlas":
+                if result is not None:
+                    manager.install_atlas(*result)
+            else:
+                if result is not None:
+                    filename, size = manager.sprites[name][:2]
+                    manager.install(filename, size, *result)
+                manager.get(name)
+            self.finished += 1
+        return self.finished / self.total
+
+    @property
+    def done(self):
+        return self.finished == self.total
@@ -0,0 +1,80 @@
+# Offline asset bake: downsizes every sprite in assets.SPRITES to its in-game size
+# and packs them into one texture atlas (atlas.png) with a metadata index (atlas.json).
+#
+#   python bake_assets.py
+#
+# Run it before building with PyInstaller; game.spec ships the atlas instead of the full-size PNGs.
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from assets import SPRITES, ATLAS_IMAGE, ATLAS_INDEX
+
+ATLAS_WIDTH = 256
+
+
+def pack(sizes, width, padding):
+    # Simple shelf packer: tallest sprites first, fill rows left to right
+    placements = {}
+    x = y = shelf_height = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if x + w > width:
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        placements[name] = (x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    return placements, y + shelf_height
+
+
+def bake(source_dir, output_dir, padding=1):
+    pygame.init()
+    sprites = {}
+    source_bytes = 0
+    for name, (filename, size, *_) in SPRITES.items():
+        path = os.path.join(source_dir, filename)
+        try:
+            image = pygame.image.load(path)
+        except (pygame.error, OSError):
+            print(f"Skipping {name}: cannot load {filename}")
+            continue
+        source_bytes += os.path.getsize(path)
+        # Baked offline, so use the higher quality filter
+        sprites[name] = (filename, pygame.transform.smoothscale(image, size))
+
+    width = max([ATLAS_WIDTH] + [surface.get_width() for _, surface in sprites.values()])
+    placements, height = pack({name: surface.get_size() for name, (_, surface) in sprites.items()}, width, padding)
+
+    atlas = pygame.Surface((width, max(height, 1)), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    index = {"image": ATLAS_IMAGE, "sprites": {}}
+    for name, (filename, surface) in sprites.items():
+        x, y, w, h = placements[name]
+        atlas.blit(surface, (x, y))
+        index["sprites"][name] = {"file": filename, "rect": [x, y, w, h]}
+
+    atlas_path = os.path.join(output_dir, ATLAS_IMAGE)
+    pygame.image.save(atlas, atlas_path)
+    with open(os.path.join(output_dir, ATLAS_INDEX), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    pygame.quit()
+    return atlas_path, len(sprites), source_bytes
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Bake sprites into a packed texture atlas")
+    parser.add_argument("--source-dir", default=base_dir)
+    parser.add_argument("--output-dir", default=base_dir)
+    parser.add_argument("--padding", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    atlas_path, count, source_bytes = bake(args.source_dir, args.output_dir, args.padding)
+    print(f"Baked {count} sprites into {atlas_path} ({os.path.getsize(atlas_path) / 1024:.1f} KB, "
+          f"sources {source_bytes / 1024:.1f} KB) in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,191 @@
+# Batch simulation runner for balancing sweeps: runs many headless games in a process pool, each with its
+# own seed and overrides of game.py's tuning constants, and streams one result row per game as it finishes.
+#
+#   python batch.py --set ENEMY_SPAWN_INTERVAL=1500,2000,2500 --set BOSS_HEALTH=300000 --seeds 8 --output sweep.csv
+#
+# Every combination of the --set values is played with --seeds different seeds. Output is CSV, or Parquet
+# (row group per game, needs pyarrow) when the path ends in .parquet. Games share nothing, so throughput
+# scales with the number of worker processes.
+import argparse
+import ast
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+DEFAULT_TICKS = 30 * 60 * 60 # 30 minutes of game time
+SCORE_SAMPLE_TICKS = 600 # Score curve resolution (every 10 seconds of game time)
+
+# game.py constants a sweep cannot change: they are baked into other values when game.py is imported
+FIXED_CONSTANTS = {
+    "FPS": "the fixed simulation step (every per-tick speed assumes it)",
+    "FRAME_TIME": "the fixed simulation step (every per-tick speed assumes it)",
+    "BOSS_BULLET_OFFSETS": "copied into BOSS_PHASES when game.py is imported; sweep BOSS_PHASES instead",
+}
+# Not tuning values: ids (also bound into class attributes and other modules) and the window size
+FIXED_PREFIXES = ("GAME_STATE_", "BULLET_KIND_", "ENTITY_KIND_", "OWNER_", "LAYER_", "TIMER_", "WINDOW_")
+
+
+def init_worker():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1" # Otherwise SDL takes over SIGTERM and the pool cannot stop the workers
+
+
+def run_game(job):
+    # Runs in a worker process. The overrides patch game.py's module constants for this game only.
+    import game
+    from game import Game, GAME_STATE_BOSS_FIGHT, GAME_STATE_BOSS_DEFEATED, GAME_STATE_PLAYER_DEFEATED
+    from benchmarks.stress import scripted_input # The stress benchmark's scripted player
+    job_id, seed, overrides, max_ticks = job
+    saved = {name: getattr(game, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(game, name, value)
+        g = Game(seed=seed, headless=True, render=False)
+        frame_ms = np.zeros(max_ticks)
+        score_curve = []
+        deaths = 0
+        boss_time = None
+        lives = g.player.lives
+        tick = 0
+        perf_counter = time.perf_counter
+        while tick < max_ticks:
+            start = perf_counter()
+            g.step(scripted_input(tick))
+            frame_ms[tick] = (perf_counter() - start) * 1000
+            tick += 1
+            if g.player.lives < lives:
+                deaths += 1
+            lives = g.player.lives
+            if boss_time is None and g.game_state == GAME_STATE_BOSS_FIGHT:
+                boss_time = g.game_time # Game time, so it stays right whatever the overrides do to the tick rate
+            if tick % SCORE_SAMPLE_TICKS == 0:
+                score_curve.append(g.score)
+            if g.game_state in (GAME_STATE_BOSS_DEFEATED, GAME_STATE_PLAYER_DEFEATED):
+                break
+    finally:
+        for name, value in saved.items():
+            setattr(game, name, value)
+
+    frame_ms = frame_ms[:tick]
+    outcome = {GAME_STATE_BOSS_DEFEATED: "boss_defeated", GAME_STATE_PLAYER_DEFEATED: "player_defeated"}.get(g.game_state, "timeout")
+    row = {"job": job_id, "seed": seed}
+    row.update(overrides)
+    row.update({
+        "ticks": tick,
+        "outcome": outcome,
+        "score": g.score,
+        "time_to_boss_s": round(boss_time / 1000, 2) if boss_time is not None else None,
+        "deaths": deaths,
+        "frame_ms_mean": float(frame_ms.mean()),
+        "frame_ms_p95": float(np.percentile(frame_ms, 95)),
+        "frame_ms_max": float(frame_ms.max()),
+        "score_curve": score_curve,
+    })
+    return row
+
+
+def parse_overrides(specs):
+    # ["NAME=1,2", ...] -> {"NAME": [1, 2], ...}, checked against game.py's constants
+    import game
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not name.isupper() or not hasattr(game, name):
+            raise SystemExit(f"--set {spec}: {name} is not a constant in game.py")
+        if name in FIXED_CONSTANTS:
+            raise SystemExit(f"--set {spec}: {name} cannot be swept, it is {FIXED_CONSTANTS[name]}")
+        value = getattr(game, name)
+        if name.startswith(FIXED_PREFIXES) or (isinstance(value, tuple) and len(value) == 3): # Colors are copied into BULLET_COLORS and the like
+            raise SystemExit(f"--set {spec}: {name} is an id, the window size or a color, not a tuning constant")
+        grid[name] = [ast.literal_eval(value) for value in values.split(",")]
+    return grid
+
+
+def make_jobs(grid, seeds, base_seed, ticks):
+    names = list(grid)
+    jobs = []
+    for combination in itertools.product(*(grid[name] for name in names)):
+        overrides = dict(zip(names, combination))
+        for i in range(seeds):
+            jobs.append((len(jobs), base_seed + i, overrides, ticks))
+    return jobs
+
+
+class CsvSink():
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, columns)
+        self.writer.writeheader()
+
+    def write(self, row):
+        row = dict(row, score_curve=" ".join(map(str, row["score_curve"])))
+        self.writer.writerow(row)
+        self.file.flush() # Partial sweeps stay usable
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink():
+    def __init__(self, path, columns):
+        import pyarrow.parquet # Optional: only needed for .parquet output
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, row):
+        import pyarrow
+        table = pyarrow.Table.from_pydict({column: [row[column]] for column in self.columns})
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def run(jobs, workers, output):
+    columns = ["job", "seed"] + list(jobs[0][2]) + ["ticks", "outcome", "score", "time_to_boss_s", "deaths",
+                                                    "frame_ms_mean", "frame_ms_p95", "frame_ms_max", "score_curve"]
+    sink = ParquetSink(output, columns) if output.endswith(".parquet") else CsvSink(output, columns)
+    start = time.perf_counter()
+    total_ticks = 0
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+            for done, row in enumerate(pool.imap_unordered(run_game, jobs), 1):
+                sink.write(row)
+                total_ticks += row["ticks"]
+                print(f"[{done}/{len(jobs)}] job {row['job']} seed {row['seed']}: {row['outcome']}, score {row['score']}, "
+                      f"{row['deaths']} deaths, {row['frame_ms_mean']:.2f} ms/tick")
+            pool.close() # Let the workers exit on their own; leaving the block would terminate() them
+            pool.join()
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(jobs)} games, {total_ticks} ticks in {elapsed:.1f}s on {workers} workers "
+          f"({total_ticks / elapsed:.0f} ticks/s), results in {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless games in parallel for balancing sweeps")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2", help="Values to sweep for a game.py constant; can be repeated")
+    parser.add_argument("--seeds", type=int, default=4, help="Games per parameter combination")
+    parser.add_argument("--base-seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="Tick limit per game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="batch_results.csv")
+    parser.add_argument("--cache-dir", help="Pixel cache directory (default: the user's cache directory)")
+    args = parser.parse_args()
+
+    if args.cache_dir is not None:
+        from assets import PIXEL_CACHE_ENV
+        os.environ[PIXEL_CACHE_ENV] = args.cache_dir # Before game.py is imported, here and in the workers
+
+    jobs = make_jobs(parse_overrides(args.set), args.seeds, args.base_seed, args.ticks)
+    run(jobs, args.workers, args.output)
@@ -0,0 +1,54 @@
+# Collision benchmark: pygame.sprite.groupcollide (brute force) against the spatial hash in collision.py
+#
+#   python -m benchmarks.collision_bench [--repeat N]
+import argparse
+import random
+import time
+
+import pygame
+
+import collision
+
+WINDOW_WIDTH = 800
+WINDOW_HEIGHT = 600
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, x, y, width, height):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, width, height)
+
+
+def make_group(rng, count, width, height):
+    group = pygame.sprite.Group()
+    for i in range(count):
+        group.add(Box(rng.randrange(WINDOW_WIDTH - width), rng.randrange(WINDOW_HEIGHT - height), width, height))
+    return group
+
+
+def time_call(function, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(repeat, seed=0):
+    rng = random.Random(seed)
+    print(f"{'enemies':>8} {'bullets':>8} {'pygame ms':>10} {'grid ms':>9} {'speedup':>8}")
+    for enemy_count, bullet_count in ((10, 20), (50, 100), (100, 300), (200, 600), (400, 1200)):
+        enemies = make_group(rng, enemy_count, 40, 40)
+        bullets = make_group(rng, bullet_count, 5, 10)
+        # dokill is off so every repetition sees the same sprites
+        brute_time, expected = time_call(lambda: pygame.sprite.groupcollide(enemies, bullets, False, False), repeat)
+        grid_time, result = time_call(lambda: collision.groupcollide(enemies, bullets, False, False), repeat)
+        assert list(result.items()) == list(expected.items()), "spatial hash result differs from pygame"
+        print(f"{enemy_count:>8} {bullet_count:>8} {brute_time * 1000:>10.3f} {grid_time * 1000:>9.3f} {brute_time / grid_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sprite collision broadphases")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.repeat, args.seed)
@@ -0,0 +1,131 @@
+# Entity storage benchmark: the old per-object Sprite movers against World component arrays, with and
+# without entity proxies. Reports memory per entity, create+kill throughput and the cost of one movement
+# and culling tick.
+#
+#   python -m benchmarks.entity_bench [--count N ...] [--repeat N]
+import argparse
+import random
+import time
+import tracemalloc
+
+import pygame
+
+from ecs import World, EntityGroup
+from game import EntityProxy, WINDOW_WIDTH, WINDOW_HEIGHT, ENTITY_KIND_ENEMY
+
+ENEMY_SIZE = (40, 40)
+ENEMY_CULL = (-25, -float("inf"), WINDOW_WIDTH + 25 - ENEMY_SIZE[0], WINDOW_HEIGHT)
+
+
+class LegacyEnemy(pygame.sprite.Sprite):
+    # The Enemy class before the World: own rect and speeds, moved and culled by its update()
+    def __init__(self, x, y, speedx, speedy):
+        super().__init__()
+        self.rect = pygame.Rect((x, y), ENEMY_SIZE)
+        self.speedx = speedx
+        self.speedy = speedy
+
+    def update(self):
+        self.rect.y += self.speedy
+        self.rect.x += self.speedx
+        if self.rect.top > WINDOW_HEIGHT or self.rect.left < -25 or self.rect.right > WINDOW_WIDTH + 25:
+            self.kill()
+
+
+class ProxyEnemy(EntityProxy):
+    __slots__ = ()
+
+    def __init__(self, world, x, y, speedx, speedy):
+        super().__init__(world)
+        self.rect = pygame.Rect((x, y), ENEMY_SIZE)
+        self.spawn(ENTITY_KIND_ENEMY, (speedx, speedy), cull=ENEMY_CULL)
+
+
+def spawn_args(rng, count):
+    # Spread over the upper half so most survive a tick
+    return [(rng.randrange(WINDOW_WIDTH - 40), rng.randrange(-100, WINDOW_HEIGHT // 2), rng.randrange(-2, 2), rng.randrange(1, 4))
+            for i in range(count)]
+
+
+def build_legacy(args):
+    # all_sprites, the enemies group and a render layer, like add_sprite did
+    groups = [pygame.sprite.Group() for i in range(3)]
+    for x, y, speedx, speedy in args:
+        LegacyEnemy(x, y, speedx, speedy).add(*groups)
+    return groups
+
+
+def build_proxies(args):
+    # The enemies group only: it is also what the render layer draws (World entities are not in all_sprites)
+    world = World(len(args), WINDOW_WIDTH, WINDOW_HEIGHT)
+    group = EntityGroup(world)
+    for x, y, speedx, speedy in args:
+        group.add(ProxyEnemy(world, x, y, speedx, speedy))
+    return world, group
+
+
+def build_arrays(args):
+    world = World(len(args), WINDOW_WIDTH, WINDOW_HEIGHT)
+    for x, y, speedx, speedy in args:
+        world.create(x, y, ENEMY_SIZE[0], ENEMY_SIZE[1], ENTITY_KIND_ENEMY, (speedx, speedy), ENEMY_CULL)
+    return world
+
+
+def kill_legacy(groups):
+    for sprite in groups[0].sprites():
+        sprite.kill()
+
+
+def kill_proxies(state):
+    world, group = state
+    for proxy in group.sprites():
+        proxy.kill()
+
+
+def kill_arrays(world):
+    world.clear()
+
+
+def memory_per_entity(build, args):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    return (after - before) / len(args)
+
+
+def best_of(function, repeat):
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(counts, repeat, seed=0):
+    rng = random.Random(seed)
+    variants = {
+        "sprites": (build_legacy, kill_legacy, lambda groups: groups[0].update()),
+        "world+proxies": (build_proxies, kill_proxies, lambda state: state[0].step(0)),
+        "world arrays": (build_arrays, kill_arrays, lambda world: world.step(0)),
+    }
+    print(f"{'entities':>8} {'storage':<15} {'bytes/entity':>12} {'create+kill ms':>15} {'tick ms':>8}")
+    for count in counts:
+        args = spawn_args(rng, count)
+        for name, (build, kill, tick) in variants.items():
+            memory = memory_per_entity(build, args)
+            churn = best_of(lambda: kill(build(args)), repeat)
+            tick_time = min(best_of(lambda: tick(state), 1) for state in [build(args) for i in range(repeat)])
+            print(f"{count:>8} {name:<15} {memory:>12.0f} {churn * 1000:>15.3f} {tick_time * 1000:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Sprite objects with World component storage")
+    parser.add_argument("--count", type=int, action="append", help="Entity count, can be repeated (default 100, 1000, 5000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.count or [100, 1000, 5000], args.repeat, args.seed)
@@ -0,0 +1,91 @@
+# Pixel collision benchmark for the boss fight: rect-only hits against the cached-mask narrowphase, and
+# against pygame.sprite.collide_mask with masks rebuilt on every check. Boss bullets are packed around the
+# player (worst case for the narrowphase) and player bullets around the boss.
+#
+#   python -m benchmarks.mask_bench [--repeat N]
+import argparse
+import random
+import time
+
+import numpy as np
+import pygame
+
+import collision
+from game import Game, Boss, BULLET_SIZE
+
+
+class Box(pygame.sprite.Sprite):
+    # A player bullet, or for the uncached variant a sprite whose mask pygame builds from image on every check
+    def __init__(self, x, y, image):
+        super().__init__()
+        self.image = image
+        self.rect = image.get_rect(topleft=(x, y))
+
+
+class Uncached(pygame.sprite.Sprite):
+    def __init__(self, sprite):
+        super().__init__()
+        self.image = sprite.image
+        self.rect = sprite.rect
+
+
+def fill_field(field, rng, count, around, spread):
+    # count bullets with top-left corners within spread pixels of the around rect's center
+    field.clear()
+    x = np.array([around.centerx + rng.uniform(-spread, spread) for i in range(count)])
+    y = np.array([around.centery + rng.uniform(-spread, spread) for i in range(count)]) + BULLET_SIZE[1]
+    field.emit(x, y, np.zeros((count, 2)))
+
+
+def time_call(function, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(repeat, seed=0):
+    rng = random.Random(seed)
+    g = Game(seed=seed, headless=True, render=False)
+    player = g.player
+    field = g.boss_bullets
+    bullet_image = field.image
+    print("Boss bullets against the player (bullets within 60 px of the player's center)")
+    print(f"{'bullets':>8} {'rect ms':>8} {'hits':>5} {'mask ms':>8} {'hits':>5} {'checked':>8} {'rebuilt ms':>11}")
+    for count in (100, 500, 2000, 5000):
+        fill_field(field, rng, count, player.rect, 60)
+        rect_time, rect_hits = time_call(lambda: field.collide_rect(player.rect, remove=False), repeat)
+        mask_time, mask_hits = time_call(lambda: field.collide_mask(player.rect, player.mask, remove=False), repeat)
+        checked = int(np.count_nonzero(field.rect_hits(player.rect))) # Pairs the narrowphase looks at
+        # pygame.sprite.collide_mask without cached masks: every bullet becomes a sprite, both masks rebuilt per pair
+        corners = np.floor(field.pos[:field.count]).astype(np.int64).tolist()
+        bullets = pygame.sprite.Group(Box(x, y, bullet_image) for x, y in corners)
+        target = Uncached(player)
+        rebuilt_time, rebuilt = time_call(lambda: pygame.sprite.spritecollide(target, bullets, False, pygame.sprite.collide_mask), max(1, repeat // 10))
+        assert len(rebuilt) == mask_hits, "cached masks disagree with pygame.sprite.collide_mask"
+        print(f"{count:>8} {rect_time * 1000:>8.3f} {rect_hits:>5} {mask_time * 1000:>8.3f} {mask_hits:>5} {checked:>8} {rebuilt_time * 1000:>11.3f}")
+
+    print()
+    print("Player bullets against the boss (bullets within 100 px of the boss's center)")
+    print(f"{'bullets':>8} {'rect ms':>8} {'hits':>5} {'mask ms':>8} {'hits':>5} {'rebuilt ms':>11}")
+    boss = Boss(g)
+    boss_group = pygame.sprite.Group(boss)
+    uncached_group = pygame.sprite.Group(Uncached(boss))
+    for count in (50, 200, 800):
+        bullets = pygame.sprite.Group(Box(boss.rect.centerx + rng.randrange(-100, 100), boss.rect.centery + rng.randrange(-100, 100), bullet_image)
+                                      for i in range(count))
+        rect_time, rect_hits = time_call(lambda: collision.groupcollide(boss_group, bullets, False, False), repeat)
+        mask_time, mask_hits = time_call(lambda: collision.groupcollide(boss_group, bullets, False, False, collision.collide_mask), repeat)
+        rebuilt_time, rebuilt = time_call(lambda: pygame.sprite.groupcollide(uncached_group, bullets, False, False, pygame.sprite.collide_mask), max(1, repeat // 10))
+        rect_hits = sum(map(len, rect_hits.values()))
+        mask_hits = sum(map(len, mask_hits.values()))
+        assert sum(map(len, rebuilt.values())) == mask_hits, "cached masks disagree with pygame.sprite.collide_mask"
+        print(f"{count:>8} {rect_time * 1000:>8.3f} {rect_hits:>5} {mask_time * 1000:>8.3f} {mask_hits:>5} {rebuilt_time * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pixel-mask collision narrowphase")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.repeat, args.seed)
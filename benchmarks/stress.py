@@ -0,0 +1,249 @@
+# Scripted stress scenarios: each one builds a worst-case game state, runs it headless for a fixed number
+# of frames and reports frame-time percentiles plus a per-phase breakdown.
+#
+#   python -m benchmarks.stress [--frames N] [--scenario NAME ...] [--output results.json] [--compare old.json]
+#                               [--budget MS]
+#
+# --budget runs the frame governor against that per-frame budget, like main() does against FRAME_TIME.
+#
+# The JSON output is meant to be kept per commit and compared between runs with --compare.
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+import pygame
+
+import game
+from game import Game, FrameInput, BouncingBall
+from governor import FrameGovernor
+
+DEFAULT_FRAMES = 1200 # 20 seconds of game time at 60 FPS
+PERCENTILES = (50, 95, 99)
+NEVER_SCORE = 2 ** 62 # Out of reach, and still an int64 for snapshot.capture (inf is not)
+
+
+class PhaseRecorder():
+    # Collects the time spent in each phase of every frame (plugged into Game.set_phase_timer)
+    def __init__(self):
+        self.frames = []
+        self.current = None
+        self.last = 0
+
+    def start_frame(self):
+        self.current = {}
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        self.frames.append(self.current)
+
+
+def keep_player_alive(g):
+    g.player.lives = 10 ** 9
+    g.next_skill_score = NEVER_SCORE # A skill pick would replace skill_options_display and stop passive skills
+
+
+def full_loadout(g):
+    # MAX_WEAPON_LEVEL with Split Shot and Electromagnetic Wave, three wingmen, three drones, five bouncing balls
+    player = g.player
+    keep_player_alive(g)
+    while player.weapon_level < game.MAX_WEAPON_LEVEL:
+        player.upgrade_weapon()
+    player.activate_split_shot(float("inf"))
+    player.activate_electromagnetic_wave()
+    for i in range(game.MAX_WINGMEN):
+        player.add_wingman()
+    player.activate_drone()
+    g.skill_options_display = ["Fireball", "Bouncing Ball", "Drone"]
+    for i in range(game.MAX_BOUNCING_BALLS):
+        g.add_entity(BouncingBall(g), g.bouncing_balls)
+
+
+def scenario_baseline(g):
+    keep_player_alive(g)
+
+
+def scenario_max_weapon(g):
+    full_loadout(g)
+
+
+def scenario_long_session(g):
+    # Twenty minutes in: the difficulty curves at their caps and the live enemy budget full
+    keep_player_alive(g)
+    g.clock.advance(20 * 60 * 1000)
+    g.director.last_timed_spawn = g.clock.get_ticks()
+    for i in range(game.MAX_ENEMY_BUDGET - len(g.enemies)):
+        g.spawn_enemy()
+    while g.player.weapon_level < game.MAX_PLAYER_BULLETS_PER_SHOT:
+        g.player.upgrade_weapon()
+
+
+def start_boss_fight(g, phases=None):
+    g.score = game.BOSS_FIGHT_SCORE_THRESHOLD
+    g.step(FrameInput()) # Triggers the boss fight
+    boss = g.boss
+    if phases is not None:
+        boss.phases = phases
+        boss.phase = -1
+    boss.health = boss.phases[-1][0]
+    boss.take_damage(0) # Enters the last phase
+    boss.health = 10 ** 9 # Keep the boss alive for the whole run
+
+
+def scenario_boss_phase5(g):
+    # Boss at its last phase (BOSS_PHASES[-1]) against a full loadout
+    full_loadout(g)
+    start_boss_fight(g)
+
+
+# Denser than anything in BOSS_PHASES: keeps well over 2,000 boss bullets on screen once it has filled up
+BULLET_HELL_PHASES = [
+    (game.BOSS_HEALTH, [
+        {"type": "ring", "count": 90, "speed": 2.5, "spin": 0.05, "interval": 100},
+        {"type": "ring", "count": 12, "speed": 3, "spin": -0.3, "interval": 50},
+        {"type": "fan", "count": 15, "spread": 1.2, "speed": 4, "interval": 250},
+    ]),
+]
+
+
+def scenario_boss_bullet_hell(g):
+    keep_player_alive(g)
+    start_boss_fight(g, BULLET_HELL_PHASES)
+
+
+SCENARIOS = {
+    "baseline": scenario_baseline,
+    "max_weapon": scenario_max_weapon,
+    "long_session": scenario_long_session,
+    "boss_phase5": scenario_boss_phase5,
+    "boss_bullet_hell": scenario_boss_bullet_hell,
+}
+
+
+def scripted_input(frame):
+    # Sweep left and right across the screen, always take the first skill offered
+    return FrameInput(left=(frame // 90) % 2 == 0, right=(frame // 90) % 2 == 1, skill=0)
+
+
+def summarize(samples):
+    values = np.asarray(samples) * 1000
+    summary = {"mean": float(values.mean()), "max": float(values.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = float(np.percentile(values, p))
+    return summary
+
+
+def run_scenario(name, frames, render=True, seed=0, dirty_rects=False, budget_ms=None):
+    g = Game(seed=seed, headless=True, render=render, dirty_rects=dirty_rects)
+    SCENARIOS[name](g)
+    game.freeze_heap() # Like main()
+    recorder = PhaseRecorder()
+    g.set_phase_timer(recorder)
+    governor = FrameGovernor(budget_ms, len(game.QUALITY_LEVELS) - 1, frame_ms=game.FRAME_TIME) if budget_ms is not None else None
+    frame_times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        g.step(scripted_input(frame))
+        frame_times.append(time.perf_counter() - start)
+        if governor is not None:
+            level = governor.record(frame_times[-1] * 1000)
+            if level is not None:
+                g.set_quality(level)
+
+    phase_names = dict.fromkeys(phase for sample in recorder.frames for phase in sample) # In first-seen order
+    phases = {phase: [sample.get(phase, 0) for sample in recorder.frames] for phase in phase_names}
+    result = {
+        "frames": frames,
+        "frame_ms": summarize(frame_times),
+        "phases_ms": {phase: summarize(values) for phase, values in phases.items()},
+        "final": {
+            "score": g.score,
+            "enemies": len(g.enemies),
+            "bullets": len(g.bullets),
+            "boss_bullets": g.boss_bullets.count,
+            "boss_bullets_peak": g.boss_bullets.peak,
+            "boss_damage": g.boss.damage_meter.total if g.boss else 0,
+            "pool_exhausted": g.bullet_pool.exhausted_count,
+            "director": g.director.metrics(),
+            "timers": g.timers.metrics(),
+        },
+    }
+    if governor is not None:
+        result["governor"] = governor.metrics()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(name, result):
+    frame_ms = result["frame_ms"]
+    print(f"\n{name}: p50 {frame_ms['p50']:.2f} ms, p95 {frame_ms['p95']:.2f} ms, p99 {frame_ms['p99']:.2f} ms, max {frame_ms['max']:.2f} ms")
+    for phase, summary in sorted(result["phases_ms"].items(), key=lambda item: -item[1]["mean"]):
+        print(f"  {phase:<24} mean {summary['mean']:7.3f} ms   p95 {summary['p95']:7.3f} ms")
+    print(f"  final: {result['final']}")
+    if "governor" in result:
+        print(f"  governor: {result['governor']}")
+
+
+def print_comparison(baseline, results):
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for name, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        changes = []
+        for p in PERCENTILES:
+            key = f"p{p}"
+            before = old["frame_ms"][key]
+            after = result["frame_ms"][key]
+            changes.append(f"{key} {before:.2f} -> {after:.2f} ms ({(after - before) / before * 100:+.0f}%)")
+        print(f"  {name:<14} " + ", ".join(changes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stress scenarios and report frame-time percentiles")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Can be repeated; default is all")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-render", action="store_true", help="Skip the draw phase")
+    parser.add_argument("--dirty-rects", action="store_true", help="Draw with the dirty-rect renderer")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Earlier --output file to compare the percentiles against")
+    parser.add_argument("--budget", type=float, metavar="MS", help="Run the frame governor against this frame budget")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "render": not args.no_render,
+        "dirty_rects": args.dirty_rects,
+        "seed": args.seed,
+        "budget_ms": args.budget,
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        results["scenarios"][name] = run_scenario(name, args.frames, not args.no_render, args.seed, args.dirty_rects, args.budget)
+        print_report(name, results["scenarios"][name])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
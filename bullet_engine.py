@@ -0,0 +1,114 @@
+import numpy as np
+import pygame
+
+# Player bullets are World entities (ecs.py) with a sprite adapter; boss bullets only ever exist
+# in the arrays of a BulletField.
+
+
+class BulletField():
+    # Bullets that never get a sprite (boss patterns). Live bullets are packed at the front of the arrays,
+    # a whole volley is written with one emit() call, and moving, culling and hit tests are single
+    # NumPy passes. The renderer draws them straight from the position array (blit_sequence).
+    def __init__(self, capacity, width, height, bullet_size, image=None):
+        self.width = width
+        self.height = height
+        self.bullet_width, self.bullet_height = bullet_size
+        self.image = image # Surface drawn for every bullet; the field itself never touches it
+        self.mask = None # Filled bullet-sized mask for collide_mask, made on first use
+        self.count = 0
+        self.pos = np.zeros((capacity, 2)) # Top-left corner of each bullet, [:count] are live
+        self.vel = np.zeros((capacity, 2)) # Pixels per tick
+        self.emitted = 0
+        self.peak = 0
+
+    def reserve(self, needed):
+        capacity = len(self.pos)
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            self.pos = np.resize(self.pos, (capacity, 2))
+            self.vel = np.resize(self.vel, (capacity, 2))
+
+    def emit(self, x, y, vel):
+        # x, y: centerx and bottom of the new bullets (scalars or one per bullet), vel: (n, 2) velocities
+        n = len(vel)
+        start = self.count
+        self.reserve(start + n)
+        end = start + n
+        self.pos[start:end, 0] = x
+        self.pos[start:end, 0] -= self.bullet_width // 2
+        self.pos[start:end, 1] = y - self.bullet_height
+        self.vel[start:end] = vel
+        self.count = end
+        self.emitted += n
+        self.peak = max(self.peak, end)
+
+    def keep(self, mask):
+        # Pack the bullets selected by mask (over the live ones) to the front
+        kept = int(np.count_nonzero(mask))
+        if kept < self.count:
+            count = self.count
+            self.pos[:kept] = self.pos[:count][mask]
+            self.vel[:kept] = self.vel[:count][mask]
+            self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+    def step(self):
+        count = self.count
+        if not count:
+            return
+        pos = self.pos[:count]
+        pos += self.vel[:count]
+        x = pos[:, 0]
+        y = pos[:, 1]
+        inside = (y + self.bullet_height >= 0) & (y <= self.height) & (x <= self.width) & (x + self.bullet_width >= 0)
+        self.keep(inside)
+
+    def rect_hits(self, rect):
+        # Mask over the live bullets overlapping rect (same test as Rect.colliderect on the floored positions)
+        pos = np.floor(self.pos[:self.count])
+        x = pos[:, 0]
+        y = pos[:, 1]
+        return (x < rect[0] + rect[2]) & (x + self.bullet_width > rect[0]) & (y < rect[1] + rect[3]) & (y + self.bullet_height > rect[1])
+
+    def collide_rect(self, rect, remove=True):
+        # Number of bullets overlapping rect
+        if not self.count:
+            return 0
+        hit = self.rect_hits(rect)
+        hits = int(np.count_nonzero(hit))
+        if hits and remove:
+            self.keep(~hit)
+        return hits
+
+    def collide_mask(self, rect, mask, remove=True):
+        # Number of bullets touching a set pixel of mask placed at rect. The rect test above is the broadphase;
+        # only the few bullets it keeps are overlapped with the mask, one call each.
+        if not self.count:
+            return 0
+        hit = self.rect_hits(rect)
+        candidates = np.flatnonzero(hit)
+        if not len(candidates):
+            return 0
+        if self.mask is None:
+            self.mask = pygame.mask.Mask((self.bullet_width, self.bullet_height), fill=True)
+        bullet_mask = self.mask
+        left, top = rect[0], rect[1]
+        corners = np.floor(self.pos[candidates]).astype(np.int64).tolist()
+        for index, (x, y) in zip(candidates.tolist(), corners):
+            if mask.overlap(bullet_mask, (x - left, y - top)) is None:
+                hit[index] = False
+        hits = int(np.count_nonzero(hit))
+        if hits and remove:
+            self.keep(~hit)
+        return hits
+
+    def blit_sequence(self, alpha=None):
+        # (image, top-left) for every live bullet; with alpha, drawn that far along their last tick
+        count = self.count
+        pos = self.pos[:count]
+        if alpha is not None:
+            pos = pos + self.vel[:count] * (alpha - 1)
+        image = self.image
+        return [(image, topleft) for topleft in np.floor(pos).astype(np.int64).tolist()]
@@ -0,0 +1,166 @@
+# Uniform-grid spatial hash used as a broadphase for sprite collisions.
+# groupcollide is a drop-in replacement for pygame.sprite.groupcollide and returns the same hit dictionary,
+# in the same order. Either group may be a pygame group or an ecs.EntityGroup of World entity proxies.
+# A custom collided callback only runs on pairs whose rects overlap (it is a narrowphase, not a replacement test).
+import pygame
+
+SPATIAL_HASH_CELL_SIZE = 64 # A little larger than the biggest regular sprite (enemies are 40x40)
+BRUTE_FORCE_PAIRS = 400 # Below this many candidate pairs building the grid costs more than it saves
+
+
+class SpatialHash():
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (cell x, cell y) -> list of (index, sprite)
+
+    def clear(self):
+        self.cells.clear()
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, (rect.right - 1) // size, rect.top // size, (rect.bottom - 1) // size)
+
+    def insert(self, index, sprite):
+        cells = self.cells
+        x0, x1, y0, y1 = self.cell_range(sprite.rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [(index, sprite)]
+                else:
+                    bucket.append((index, sprite))
+
+    def build(self, sprites):
+        # Rebuilt every frame: sprites move every frame, so an incremental update would touch them all anyway
+        cells = self.cells
+        cells.clear()
+        size = self.cell_size
+        for index, sprite in enumerate(sprites):
+            rect = sprite.rect
+            cx = rect.left // size
+            cy = rect.top // size
+            if cx == (rect.right - 1) // size and cy == (rect.bottom - 1) // size:
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [(index, sprite)]
+                else:
+                    bucket.append((index, sprite))
+            else:
+                self.insert(index, sprite)
+
+    def query(self, rect):
+        # Candidates whose cells overlap rect, as a dict index -> sprite (a sprite spanning cells is listed once)
+        cells = self.cells
+        found = {}
+        x0, x1, y0, y1 = self.cell_range(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for index, sprite in bucket:
+                        found[index] = sprite
+        return found
+
+
+    def query_radius(self, x, y, radius):
+        # Sprites whose centers lie strictly within radius of (x, y), in insertion order
+        found = self.query(pygame.Rect(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1))
+        limit = radius * radius
+        result = []
+        for index in sorted(found):
+            sprite = found[index]
+            dx = sprite.rect.centerx - x
+            dy = sprite.rect.centery - y
+            if dx * dx + dy * dy < limit:
+                result.append(sprite)
+        return result
+
+
+# Shared grid, cleared and refilled by every groupcollide call
+grid = SpatialHash()
+
+# Full masks for sprites without a mask attribute, one per size
+solid_masks = {}
+
+
+def solid_mask(size):
+    mask = solid_masks.get(size)
+    if mask is None:
+        mask = solid_masks[size] = pygame.mask.Mask(size, fill=True)
+    return mask
+
+
+def collide_mask(a, b):
+    # Pixel-accurate collided callback: rect test first, then the sprites' precomputed masks (sprite.mask,
+    # see AssetManager.mask) are overlapped. A sprite without a mask is treated as a filled rect.
+    rect_a = a.rect
+    rect_b = b.rect
+    if not rect_a.colliderect(rect_b):
+        return False
+    mask_a = getattr(a, "mask", None)
+    mask_b = getattr(b, "mask", None)
+    if mask_a is None and mask_b is None:
+        return True
+    if mask_a is None:
+        mask_a = solid_mask(rect_a.size)
+    if mask_b is None:
+        mask_b = solid_mask(rect_b.size)
+    return mask_a.overlap(mask_b, (rect_b.x - rect_a.x, rect_b.y - rect_a.y)) is not None
+
+
+def groupcollide(groupa, groupb, dokilla, dokillb, collided=None, grid=grid):
+    # Same result as pygame.sprite.groupcollide: {sprite in groupa: [colliding sprites in groupb]}.
+    # pygame walks groupa in order and kills each hit in groupb immediately when dokillb is set,
+    # so a sprite in groupb is only reported for the first sprite of groupa it touches.
+    if len(groupa) * len(groupb) <= BRUTE_FORCE_PAIRS:
+        return brute_force_groupcollide(groupa, groupb, dokilla, dokillb, collided)
+
+    sprites_a = groupa.sprites()
+    grid.build(sprites_a)
+    cells = grid.cells
+    size = grid.cell_size
+    crashed = {}
+    for sprite_b in groupb.sprites():
+        rect_b = sprite_b.rect
+        cx = rect_b.left // size
+        cy = rect_b.top // size
+        if cx == (rect_b.right - 1) // size and cy == (rect_b.bottom - 1) // size:
+            # Common case (small projectiles): a single cell, whose bucket is already in groupa order
+            candidates = cells.get((cx, cy))
+            if not candidates:
+                continue
+        else:
+            candidates = sorted(grid.query(rect_b).items())
+        for index, sprite_a in candidates:
+            hit = sprite_a.rect.colliderect(rect_b)
+            if hit and collided is not None:
+                hit = collided(sprite_a, sprite_b)
+            if hit:
+                hits = crashed.get(index)
+                if hits is None:
+                    crashed[index] = [sprite_b]
+                else:
+                    hits.append(sprite_b)
+                if dokillb:
+                    break
+
+    result = {}
+    for index in sorted(crashed):
+        sprite_a = sprites_a[index]
+        result[sprite_a] = crashed[index]
+        if dokillb:
+            for sprite_b in crashed[index]:
+                sprite_b.kill()
+        if dokilla:
+            sprite_a.kill()
+    return result
+
+
+def brute_force_groupcollide(groupa, groupb, dokilla, dokillb, collided=None):
+    if collided is None:
+        return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb)
+    # Keep the rect prefilter so small groups behave exactly like the grid path
+    return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb,
+                                      lambda a, b: a.rect.colliderect(b.rect) and collided(a, b))
+
@@ -0,0 +1,81 @@
+from collections import deque
+
+# Wave director: every enemy spawn goes through a queue that is drained only while the live population is
+# under the current budget, so the enemies group stays bounded however long a session runs.
+# Timed spawns and replacements for killed or escaped enemies are all just requests in the queue.
+
+
+class DifficultyCurve():
+    # Linear ramp on game time: start, change per minute, clamped at limit
+    def __init__(self, start, per_minute, limit):
+        self.start = start
+        self.per_minute = per_minute
+        self.limit = limit
+
+    def value(self, elapsed_ms):
+        value = self.start + self.per_minute * elapsed_ms / 60000
+        if self.per_minute < 0:
+            return max(self.limit, value)
+        return min(self.limit, value)
+
+
+class WaveDirector():
+    def __init__(self, spawn, interval_curve, budget_curve, max_spawns_per_tick, queue_limit, start_time=0):
+        self.spawn = spawn # Creates one enemy
+        self.interval_curve = interval_curve # ms between timed spawns
+        self.budget_curve = budget_curve # Live enemies allowed
+        self.max_spawns_per_tick = max_spawns_per_tick
+        self.queue = deque() # Pending spawn requests (their reason), oldest first
+        self.queue_limit = queue_limit
+        self.start_time = start_time
+        self.last_timed_spawn = start_time
+        self.interval = interval_curve.value(0)
+        self.budget = int(budget_curve.value(0))
+        # Metrics
+        self.population = 0
+        self.peak_population = 0
+        self.spawned = 0
+        self.throttled = 0 # Requests dropped because the queue was full
+        self.blocked_ticks = 0 # Ticks where queued spawns waited on the budget
+
+    def request(self, reason="replace", count=1):
+        for i in range(count):
+            if len(self.queue) >= self.queue_limit:
+                self.throttled += 1
+            else:
+                self.queue.append(reason)
+
+    def clear(self):
+        self.queue.clear()
+
+    def update(self, current_time, population):
+        elapsed = current_time - self.start_time
+        self.interval = self.interval_curve.value(elapsed)
+        self.budget = int(self.budget_curve.value(elapsed))
+        if current_time - self.last_timed_spawn > self.interval:
+            self.request("timed")
+            self.last_timed_spawn = current_time
+
+        room = min(self.budget - population, self.max_spawns_per_tick)
+        spawned = 0
+        while self.queue and spawned < room:
+            self.queue.popleft()
+            self.spawn()
+            spawned += 1
+        if self.queue and population + spawned >= self.budget:
+            self.blocked_ticks += 1
+        self.spawned += spawned
+        self.population = population + spawned
+        self.peak_population = max(self.peak_population, self.population)
+
+    def metrics(self):
+        return {
+            "population": self.population,
+            "peak_population": self.peak_population,
+            "budget": self.budget,
+            "interval_ms": self.interval,
+            "queued": len(self.queue),
+            "spawned": self.spawned,
+            "throttled": self.throttled,
+            "blocked_ticks": self.blocked_ticks,
+        }
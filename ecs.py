@@ -0,0 +1,223 @@
+import numpy as np
+
+from timestep import INTERPOLATION_SNAP_DISTANCE
+
+# Entity-component storage. Every moving entity (bullets, enemies, fireballs, bouncing balls) is an id into
+# parallel NumPy component arrays; the systems in World.step move, bounce, expire, cull and sync them all
+# in one batched pass. Game objects that still need per-entity behaviour keep a thin "proxy" (see EntityProxy
+# in game.py): a __slots__ object, not a pygame Sprite, whose rect is written by sync() and whose kill()
+# destroys the entity. Proxies live in one EntityGroup each, which collision.groupcollide accepts like a
+# sprite group and which the render layers draw as a source, so there is no per-sprite group bookkeeping.
+#
+# Components (one row per id):
+#   pos      top-left corner (float, subpixel)         vel      pixels per tick
+#   size     collider width and height                 kind     entity / bullet kind (game-defined codes)
+#   cull     (min x, min y, max x, max y) box for the top-left; leaving it culls the entity
+#   bounce   reflect off the window edges instead       expires  game time (ms) the entity dies at, inf if never
+#   owner    id of whatever created it (-1 if none)     alive    slot in use
+#   prev     top-left before the last step (render-only, for interpolation; reset on create)
+
+NO_LIMIT = float("inf")
+
+# Columns of World.data (float) and World.tags (int); the named component arrays are views into them,
+# so create() writes a whole entity with two row assignments
+DATA_COLUMNS = 11 # pos x, y | vel x, y | size w, h | cull min x, min y, max x, max y | expires
+TAG_COLUMNS = 3 # kind | owner | bounce
+
+
+class World():
+    def __init__(self, capacity, width, height):
+        self.width = width
+        self.height = height
+        self.capacity = 0
+        self.data = np.zeros((0, DATA_COLUMNS))
+        self.tags = np.zeros((0, TAG_COLUMNS), dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.prev = np.zeros((0, 2))
+        self.proxies = [] # id -> proxy object (or None)
+        self.free = [] # Unused ids, popped from the end
+        self.grow(capacity)
+
+    def grow(self, extra):
+        # Existing ids keep their index
+        old_capacity = self.capacity
+        self.capacity += extra
+        self.data = np.concatenate((self.data, np.zeros((extra, DATA_COLUMNS))))
+        self.tags = np.concatenate((self.tags, np.zeros((extra, TAG_COLUMNS), dtype=np.int32)))
+        self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+        self.prev = np.concatenate((self.prev, np.zeros((extra, 2))))
+        self.proxies.extend([None] * extra)
+        self.free.extend(range(self.capacity - 1, old_capacity - 1, -1)) # Lowest ids are handed out first
+        data = self.data
+        self.pos = data[:, 0:2]
+        self.vel = data[:, 2:4]
+        self.size = data[:, 4:6]
+        self.cull = data[:, 6:10]
+        self.expires = data[:, 10]
+        self.kind = self.tags[:, 0]
+        self.owner = self.tags[:, 1]
+        self.bounce = self.tags[:, 2]
+
+    def create(self, x, y, width, height, kind, vel=(0, 0), cull=(-NO_LIMIT, -NO_LIMIT, NO_LIMIT, NO_LIMIT),
+               bounce=False, expires=NO_LIMIT, owner=-1, proxy=None):
+        if not self.free:
+            self.grow(self.capacity)
+        entity = self.free.pop()
+        self.data[entity] = (x, y, vel[0], vel[1], width, height, cull[0], cull[1], cull[2], cull[3], expires)
+        self.tags[entity] = (kind, owner, bounce)
+        self.prev[entity] = (x, y) # Not interpolated from wherever the slot's last user was
+        self.alive[entity] = True
+        self.proxies[entity] = proxy
+        return entity
+
+    def destroy(self, entity):
+        if self.alive[entity]:
+            self.alive[entity] = False
+            self.proxies[entity] = None
+            self.free.append(entity)
+
+    def count(self, kind=None):
+        if kind is None:
+            return int(np.count_nonzero(self.alive))
+        return int(np.count_nonzero(self.alive & (self.kind == kind)))
+
+    def remove(self, entities):
+        # Entities leave through their proxy when they have one, so it can drop out of its groups and pool
+        proxies = self.proxies
+        for entity in entities:
+            proxy = proxies[entity]
+            if proxy is not None:
+                proxy.on_removed()
+            else:
+                self.destroy(entity)
+
+    def step(self, current_time):
+        alive = self.alive
+        if not alive.any():
+            return
+        # Movement (dead slots move too, cheaper than masking; they are reset on create)
+        pos = self.pos
+        self.prev[:] = pos
+        pos += self.vel
+        x = pos[:, 0]
+        y = pos[:, 1]
+
+        # Bounce off the window edges
+        bounce = alive & (self.bounce != 0)
+        if bounce.any():
+            width = self.size[:, 0]
+            height = self.size[:, 1]
+            self.vel[bounce & ((x < 0) | (x + width > self.width)), 0] *= -1
+            self.vel[bounce & ((y < 0) | (y + height > self.height)), 1] *= -1
+
+        # Lifetime and culling
+        cull = self.cull
+        gone = alive & ((self.expires <= current_time) | (x < cull[:, 0]) | (y < cull[:, 1]) | (x > cull[:, 2]) | (y > cull[:, 3]))
+        if gone.any():
+            self.remove(np.flatnonzero(gone).tolist())
+        self.sync()
+
+    def sync(self):
+        # Mirror the integer positions into the proxies' rects for the collision and drawing phases
+        live = np.flatnonzero(self.alive)
+        xs = np.floor(self.pos[live, 0]).astype(np.int64).tolist()
+        ys = np.floor(self.pos[live, 1]).astype(np.int64).tolist()
+        proxies = self.proxies
+        for entity, left, top in zip(live.tolist(), xs, ys):
+            proxy = proxies[entity]
+            if proxy is not None:
+                proxy.rect.topleft = (left, top)
+
+    def collide_rect(self, rect, kind=None):
+        # Ids of the live entities (of one kind) whose collider overlaps rect, like Rect.colliderect
+        left, top, width, height = rect
+        pos = np.floor(self.pos)
+        size = self.size
+        hit = (self.alive & (pos[:, 0] < left + width) & (pos[:, 0] + size[:, 0] > left)
+               & (pos[:, 1] < top + height) & (pos[:, 1] + size[:, 1] > top))
+        if kind is not None:
+            hit &= self.kind == kind
+        return np.flatnonzero(hit).tolist()
+
+    def clear(self):
+        self.remove(np.flatnonzero(self.alive).tolist())
+
+    def reset(self):
+        # Every slot free again, handed out lowest first like a new World's (the proxies are dropped, not told)
+        self.alive[:] = False
+        self.proxies = [None] * self.capacity
+        self.free = list(range(self.capacity - 1, -1, -1))
+
+    def state(self):
+        # (live ids, their data rows, their tag rows) plus the free list: everything that decides the future
+        # of the simulation (dead rows are overwritten on create). Proxies are the caller's business.
+        live = np.flatnonzero(self.alive)
+        return live, self.data[live], self.tags[live], self.free
+
+    def load_state(self, capacity, live, data, tags, free):
+        # Inverse of state(); every proxy is dropped, the caller attaches new ones
+        if capacity != self.capacity:
+            self.capacity = 0
+            self.data = np.zeros((0, DATA_COLUMNS))
+            self.tags = np.zeros((0, TAG_COLUMNS), dtype=np.int32)
+            self.alive = np.zeros(0, dtype=bool)
+            self.prev = np.zeros((0, 2))
+            self.grow(capacity)
+        self.alive[:] = False
+        self.alive[live] = True
+        self.data[live] = data
+        self.tags[live] = tags
+        self.prev[live] = data[:, 0:2]
+        self.proxies = [None] * capacity
+        self.free = list(free)
+
+
+class EntityGroup():
+    # Insertion-ordered set of proxies. Enough of the pygame.sprite.Group interface for groupcollide
+    # (len, iteration, sprites()), and drawn through RenderLayers.attach like BulletField
+    def __init__(self, world):
+        self.world = world
+        self.members = {} # proxy -> None, in insertion order
+
+    def add(self, proxy):
+        self.members[proxy] = None
+        proxy.group = self
+
+    def remove(self, proxy):
+        del self.members[proxy]
+        proxy.group = None
+
+    def sprites(self):
+        return list(self.members)
+
+    def __iter__(self):
+        return iter(list(self.members)) # A copy, so members can be killed while iterating
+
+    def __len__(self):
+        return len(self.members)
+
+    def __bool__(self):
+        return bool(self.members)
+
+    def __contains__(self, proxy):
+        return proxy in self.members
+
+    def empty(self):
+        for proxy in self.members:
+            proxy.group = None
+        self.members.clear()
+
+    def blit_sequence(self, alpha=None):
+        # (image, top-left) for every member; with alpha, drawn that far along their last tick unless they
+        # jumped further than INTERPOLATION_SNAP_DISTANCE (like timestep.interpolated_position)
+        proxies = self.members
+        if alpha is None:
+            return [(proxy.image, proxy.rect) for proxy in proxies]
+        entities = [proxy.entity for proxy in proxies]
+        world = self.world
+        prev = world.prev[entities]
+        moved = world.pos[entities] - prev
+        snap = np.abs(moved).sum(axis=1) > INTERPOLATION_SNAP_DISTANCE
+        moved[~snap] *= alpha
+        pos = np.floor(prev + moved).astype(np.int64).tolist()
+        return [(proxy.image, topleft) for proxy, topleft in zip(proxies, pos)]
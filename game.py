@@ -1,38 +1,37 @@
+import time
+LAUNCH_TIME = time.perf_counter() # Start of the time-to-first-frame measurement, before the heavy imports
+import argparse
+import gc
 import pygame
 import random
 import math
 import os
-
-# Initialize Pygame
-pygame.init()
+import functools
+from collections import deque, namedtuple
+import numpy as np
+from assets import AssetManager, AssetLoader
+from bullet_engine import BulletField
+from ecs import World, EntityGroup, NO_LIMIT
+from patterns import PatternEmitter
+import collision
+from profiler import FrameProfiler
+from hud import Hud
+from render import FullRedraw, DirtyRectRenderer, RenderLayers
+from timestep import FixedTimestep
+from director import DifficultyCurve, WaveDirector
+from replay import InputRecorder, state_digest
+from snapshot import RewindBuffer, capture, restore
+from governor import FrameGovernor
+from scheduler import Scheduler
 
 # Game window settings
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Bullet Hell Shooter")
-
-# Load player and enemy images
-try:
-    player_img = pygame.image.load(os.path.join(os.path.dirname(__file__), "我方飛船.png")).convert_alpha()
-    player_img = pygame.transform.scale(player_img, (50, 50))
-except:
-    print("無法載入玩家飛船圖片，使用藍色方塊")
-    player_img = None
-
-try:
-    enemy_img = pygame.image.load(os.path.join(os.path.dirname(__file__), "敵方飛船.png")).convert_alpha()
-    enemy_img = pygame.transform.scale(enemy_img, (40, 40))
-except:
-    print("無法載入敵方飛船圖片，使用紅色方塊")
-    enemy_img = None
-
-try:
-    boss_img = pygame.image.load(os.path.join(os.path.dirname(__file__), "boss.png")).convert_alpha()
-    boss_img = pygame.transform.scale(boss_img, (150, 150)) # 調整頭目圖片大小
-except:
-    print("無法載入頭目圖片，使用紫色方塊")
-    boss_img = None
+FPS = 60 # Simulation ticks per second (and the default render rate)
+FRAME_TIME = 1000 / FPS # Simulation time per tick (ms); every per-tick speed below assumes this fixed step
+
+# Sprite images are decoded once per process and shared by every Game (see Game.__init__)
+assets = AssetManager(os.path.dirname(__file__))
 
 # Color definitions
 WHITE = (255, 255, 255)
@@ -59,6 +58,12 @@ INITIAL_ENEMY_COUNT = 8
 ENEMY_SPAWN_INTERVAL = 2000  # Initial enemy spawn interval (ms)
 MIN_ENEMY_SPAWN_INTERVAL = 500  # Minimum enemy spawn interval (ms)
 DIFFICULTY_INCREASE_INTERVAL = 10000  # Difficulty increase interval (ms)
+ENEMY_SPAWN_INTERVAL_STEP = 100 # Spawn interval decrease per DIFFICULTY_INCREASE_INTERVAL (ms)
+ENEMY_BUDGET = 15 # Live enemies allowed at the start (the wave director holds spawns back above this)
+ENEMY_BUDGET_PER_MINUTE = 5 # Budget growth per minute of game time
+MAX_ENEMY_BUDGET = 60 # Budget cap, so a long session never has more enemies than this
+MAX_ENEMY_SPAWNS_PER_TICK = 2 # Queued spawns released per simulation tick at most
+ENEMY_SPAWN_QUEUE_LIMIT = 120 # Spawn requests beyond this are dropped (counted as throttled)
 SCORE_FOR_UPGRADE = 100  # Score needed for weapon upgrade
 SCORE_FOR_LIFE = 500  # Score needed for extra life
 SCORE_FOR_WINGMAN = 1000 # Score needed for an extra wingman
@@ -75,10 +80,57 @@ BOUNCING_BALL_GEN_INTERVAL = 30000 # Interval for generating bouncing balls (ms)
 MAX_BOUNCING_BALLS = 5 # Maximum number of bouncing balls
 DRONE_COUNT = 3 # Number of drones to spawn
 DRONE_RADIUS = 70 # Radius of drone orbit
-DRONE_ORBIT_SPEED = 0.05 # Speed of drone orbit (radians per frame)
+DRONE_ORBIT_SPEED = 0.05 # Speed of drone orbit (radians per simulation tick)
 DRONE_SHOOT_COOLDOWN = 500 # Cooldown for drone shooting (ms)
+
+# Scheduler slots (see scheduler.py): timers due in the same tick fire in this order
+TIMER_FIREBALL = 0
+TIMER_BOUNCING_BALL = 1
+TIMER_PLAYER_SHOT = 2
+TIMER_INVINCIBILITY = 3
+TIMER_FLASH = 4
+TIMER_SPLIT_SHOT = 5
+TIMER_DRONE_SHOT = 6
+TIMER_BOSS_PATTERN = 7
 ELECTROMAGNETIC_RADIUS = 100 # Radius for chain lightning effect
+ELECTROMAGNETIC_MAX_HOPS = 3 # How many times chain lightning can jump on from an enemy it killed
+ELECTROMAGNETIC_HOP_BUDGET = 48 # Chain lightning radius queries allowed per frame
 BOSS_FIGHT_SCORE_THRESHOLD = 100000 # Score to trigger boss fight
+BOSS_HEALTH = 500000 # 500,000 bullet hits
+BOSS_BULLET_CAPACITY = 4096 # Boss bullets preallocated by the bullet field (it grows when needed)
+DPS_WINDOW = 1000 # Time window of the boss damage-per-second meter (ms)
+BULLET_POOL_CAPACITY = 512 # Number of bullets preallocated by the bullet pool (it doubles when exhausted)
+ENTITY_CAPACITY = 1024 # Entity ids preallocated by the World component arrays (they double when full)
+BULLET_SIZE = (5, 10)
+PIXEL_COLLISIONS = True # Hits on the player and the boss need overlapping pixels (cached masks), not just overlapping rects
+HUD_COMPOSITE = False # Merge the HUD into one cached surface instead of blitting each cached field
+
+# Bullet kinds, each kind shares one pre-rendered surface
+BULLET_KIND_NORMAL = 0
+BULLET_KIND_ELECTROMAGNETIC = 1
+BULLET_KIND_BOSS = 2
+BULLET_KIND_SPLIT = 3 # A split shot merged into one bullet by the frame governor, worth all three
+
+# Other World entity kinds (bullets use their bullet kind)
+ENTITY_KIND_ENEMY = 4
+ENTITY_KIND_FIREBALL = 5
+ENTITY_KIND_BOUNCING_BALL = 6
+ENTITY_KIND_COUNT = 7
+
+# Who fired a player-side bullet (World owner column), for the per-owner projectile caps
+OWNER_PLAYER = 0
+OWNER_WINGMAN = 1
+OWNER_DRONE = 2
+OWNER_COUNT = 3
+
+# Render layers, drawn back to front (each sprite class names its layer in a `layer` attribute)
+LAYER_BOSS = 0
+LAYER_ENEMIES = 1
+LAYER_BALLS = 2 # Fireballs and bouncing balls
+LAYER_BULLETS = 3 # Player, wingman, drone and boss bullets
+LAYER_PLAYER = 4 # Hidden while the player flashes after a hit
+LAYER_WINGMEN = 5
+LAYER_DRONES = 6
 
 # Bullet offsets for player and wingmen
 PLAYER_BULLET_OFFSETS = {
@@ -103,6 +155,49 @@ BOSS_BULLET_OFFSETS = {
     5: [-50, -25, 0, 25, 50]
 }
 
+# Boss phases: (health at or below which the phase starts, bullet patterns fired in it); see patterns.py
+BOSS_PHASES = [
+    (BOSS_HEALTH, [
+        {"type": "volley", "offsets": BOSS_BULLET_OFFSETS[1], "speed": 7, "interval": 500},
+    ]),
+    (400000, [
+        {"type": "volley", "offsets": BOSS_BULLET_OFFSETS[2], "speed": 7, "interval": 500},
+        {"type": "fan", "count": 5, "spread": 0.6, "speed": 5, "interval": 1200}, # Aimed at the player
+    ]),
+    (300000, [
+        {"type": "volley", "offsets": BOSS_BULLET_OFFSETS[3], "speed": 7, "interval": 500},
+        {"type": "ring", "count": 24, "speed": 4, "spin": 0.13, "interval": 900},
+    ]),
+    (200000, [
+        {"type": "volley", "offsets": BOSS_BULLET_OFFSETS[4], "speed": 7, "interval": 500},
+        {"type": "ring", "count": 4, "speed": 4, "spin": 0.25, "interval": 100}, # Spiral
+        {"type": "fan", "count": 9, "spread": 0.8, "speed": 6, "interval": 900},
+    ]),
+    (100000, [
+        {"type": "volley", "offsets": BOSS_BULLET_OFFSETS[5], "speed": 7, "interval": 500},
+        {"type": "ring", "count": 6, "speed": 4, "spin": 0.2, "interval": 80},
+        {"type": "ring", "count": 6, "speed": 4, "spin": -0.2, "interval": 80},
+        {"type": "ring", "count": 200, "speed": 3, "interval": 2500}, # Burst
+        {"type": "fan", "count": 11, "spread": 1.0, "speed": 6, "interval": 700},
+    ]),
+]
+
+# Bullet colors, one shared pre-rendered surface per kind
+BULLET_COLORS = {
+    BULLET_KIND_NORMAL: WHITE,
+    BULLET_KIND_ELECTROMAGNETIC: BLUE, # 電磁波子彈為藍色
+    BULLET_KIND_BOSS: WHITE,
+    BULLET_KIND_SPLIT: YELLOW
+}
+
+# Damage each bullet kind deals to the boss (summed per frame into one damage event)
+BULLET_DAMAGE = {
+    BULLET_KIND_NORMAL: 1,
+    BULLET_KIND_ELECTROMAGNETIC: 1,
+    BULLET_KIND_BOSS: 0,
+    BULLET_KIND_SPLIT: 3
+}
+
 # Skill definitions
 SKILLS = {
     "Fireball": "Fireball (randomly spawns on screen every few seconds)",
@@ -113,15 +208,48 @@ SKILLS = {
     "Electromagnetic Wave": "Electromagnetic Wave (bullets with chain lightning)"
 }
 
+# Quality levels picked by the frame governor (governor.py), full quality first. The first step only drops
+# cosmetic work; the later ones thin out the simulation itself, so replays and practice mode stop at level 1.
+Quality = namedtuple("Quality", "hud_details interpolate passive_spawn_factor merge_split_shot projectile_cap boss_bullet_cap")
+QUALITY_LEVELS = [
+    Quality(True, True, 1, False, NO_LIMIT, NO_LIMIT),
+    Quality(False, False, 1, False, NO_LIMIT, NO_LIMIT), # HUD details and render interpolation off
+    Quality(False, False, 2, True, NO_LIMIT, NO_LIMIT), # Fireballs and bouncing balls at half rate, split shots merged
+    Quality(False, False, 3, True, 150, 1500), # Live bullets capped per owner (player, wingmen, drones) and for the boss
+]
+COSMETIC_QUALITY_LEVEL = 1 # Deepest level that leaves the simulation untouched
+
+# Player input for one frame (held arrow keys, key-down nudges, mouse clicks, skill picked by index)
+FrameInput = namedtuple("FrameInput", "left right nudge clicks skill quit", defaults=(False, False, 0, (), None, False))
+NO_INPUT = FrameInput()
+
+
+def merge_inputs(first, second):
+    # Inputs of two render frames that fell into the same simulation tick: key presses and clicks add up
+    return FrameInput(second.left, second.right, first.nudge + second.nudge, first.clicks + second.clicks,
+                      second.skill if second.skill is not None else first.skill, first.quit or second.quit)
+
+
+# Simulation clock: game time in ms, advanced only by Game.step (never by the wall clock)
+class SimClock():
+    def __init__(self, start_time=0):
+        self.time = start_time
+
+    def get_ticks(self):
+        return self.time
+
+    def advance(self, dt):
+        self.time += dt
+
 # Player class
 class Player(pygame.sprite.Sprite):
-    def __init__(self):
+    layer = LAYER_PLAYER
+
+    def __init__(self, game):
         super().__init__()
-        if player_img:
-            self.image = player_img
-        else:
-            self.image = pygame.Surface((50, 50))
-            self.image.fill(BLUE)
+        self.game = game
+        self.image = game.assets.get("player")
+        self.mask = game.assets.mask("player")
         self.rect = self.image.get_rect()
         self.rect.centerx = WINDOW_WIDTH // 2
         self.rect.bottom = WINDOW_HEIGHT - 10
@@ -139,33 +267,30 @@ class Player(pygame.sprite.Sprite):
         self.split_shot_end_time = 0
         self.has_electromagnetic_wave = False
         self.drones = pygame.sprite.Group()
+        # Cooldown and durations run on the game's scheduler; the fields above stay the state they are built from
+        timers = game.timers
+        self.shot_timer = timers.timer(TIMER_PLAYER_SHOT, self.shoot, self.shoot_delay)
+        self.invincibility_timer = timers.timer(TIMER_INVINCIBILITY, self.end_invincibility)
+        self.flash_timer = timers.timer(TIMER_FLASH, self.flash, FLASH_INTERVAL)
+        self.split_shot_timer = timers.timer(TIMER_SPLIT_SHOT, self.end_split_shot)
+        self.schedule()
+
+    # The flashing after a hit is the visibility flag of the player's render layer
+    @property
+    def is_visible(self):
+        return self.game.layers.is_visible(LAYER_PLAYER)
+
+    @is_visible.setter
+    def is_visible(self, visible):
+        self.game.layers.set_visible(LAYER_PLAYER, visible)
 
     def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
+        keys = self.game.input
+        if keys.left and self.rect.left > 0:
             self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < WINDOW_WIDTH:
+        if keys.right and self.rect.right < WINDOW_WIDTH:
             self.rect.x += self.speed
-
-        current_time = pygame.time.get_ticks()
-
-        # 自動射擊
-        self.shoot(current_time)
-
-        # Handle invincibility and flashing
-        if self.is_invincible:
-            if current_time - self.invincible_start_time > INVINCIBLE_TIME:
-                self.is_invincible = False
-                self.is_visible = True
-            else:
-                # Flash effect
-                if current_time - self.last_flash_time > FLASH_INTERVAL:
-                    self.is_visible = not self.is_visible
-                    self.last_flash_time = current_time
-        
-        # Handle split shot duration
-        if self.has_split_shot and current_time > self.split_shot_end_time:
-            self.has_split_shot = False
+        # 自動射擊、無敵閃爍和分裂射擊的時間都由 Game.timers 觸發 (see schedule)
 
         # Update wingmen positions
         if len(self.wingmen) == 1:
@@ -187,141 +312,326 @@ class Player(pygame.sprite.Sprite):
             wingmen_list[2].rect.centerx = self.rect.centerx + 60
             wingmen_list[2].rect.centery = self.rect.centery
 
-    def shoot(self, current_time):
-        if current_time - self.last_shot > self.shoot_delay:
-            # Player's bullets
-            player_bullets_count = min(self.weapon_level, MAX_PLAYER_BULLETS_PER_SHOT)
-            offsets = PLAYER_BULLET_OFFSETS.get(player_bullets_count, [0])
-            for offset in offsets:
-                bullet = Bullet(self.rect.centerx + offset, self.rect.top, is_electromagnetic=self.has_electromagnetic_wave)
-                all_sprites.add(bullet)
-                bullets.add(bullet)
-                if self.has_split_shot: # Apply split shot effect
-                    split_bullet1 = Bullet(self.rect.centerx + offset - 5, self.rect.top, speed=-8, angle=-0.2, is_electromagnetic=self.has_electromagnetic_wave)
-                    split_bullet2 = Bullet(self.rect.centerx + offset + 5, self.rect.top, speed=-8, angle=0.2, is_electromagnetic=self.has_electromagnetic_wave)
-                    all_sprites.add(split_bullet1, split_bullet2)
-                    bullets.add(split_bullet1, split_bullet2)
-
-            self.last_shot = current_time
-
-            # Distribute excess firepower to wingmen
-            excess_firepower = max(0, self.weapon_level - MAX_PLAYER_BULLETS_PER_SHOT)
-            wingmen_list = self.wingmen.sprites()
-
-            if wingmen_list and excess_firepower > 0:
-                bullets_per_wingman_base = excess_firepower // len(wingmen_list)
-                remaining_bullets = excess_firepower % len(wingmen_list)
+    def schedule(self):
+        # (Re)arm the timers from the state fields, also after a snapshot restore
+        self.shot_timer.interval = self.shoot_delay
+        self.shot_timer.start(self.last_shot + self.shoot_delay)
+        if self.is_invincible:
+            self.invincibility_timer.start(self.invincible_start_time + INVINCIBLE_TIME)
+            self.flash_timer.start(self.last_flash_time + FLASH_INTERVAL)
+        else:
+            self.invincibility_timer.stop()
+            self.flash_timer.stop()
+        if self.has_split_shot:
+            self.split_shot_timer.start(self.split_shot_end_time)
+        else:
+            self.split_shot_timer.stop()
 
-                for i, wingman in enumerate(wingmen_list):
-                    wingman_bullets_to_fire = bullets_per_wingman_base
-                    if i < remaining_bullets:
-                        wingman_bullets_to_fire += 1
-                    
-                    if wingman_bullets_to_fire > 0:
-                        wingman.shoot_bullet(wingman_bullets_to_fire)
+    def shoot(self, current_time):
+        # Player's bullets
+        player_bullets_count = min(self.weapon_level, MAX_PLAYER_BULLETS_PER_SHOT)
+        offsets = PLAYER_BULLET_OFFSETS.get(player_bullets_count, [0])
+        merge_split_shot = self.has_split_shot and self.game.quality.merge_split_shot
+        for offset in offsets:
+            if merge_split_shot: # One bullet carrying the damage of all three
+                self.game.spawn_bullet(self.game.bullets, self.rect.centerx + offset, self.rect.top, is_electromagnetic=self.has_electromagnetic_wave, kind=BULLET_KIND_SPLIT)
+                continue
+            self.game.spawn_bullet(self.game.bullets, self.rect.centerx + offset, self.rect.top, is_electromagnetic=self.has_electromagnetic_wave)
+            if self.has_split_shot: # Apply split shot effect
+                self.game.spawn_bullet(self.game.bullets, self.rect.centerx + offset - 5, self.rect.top, speed=-8, angle=-0.2, is_electromagnetic=self.has_electromagnetic_wave)
+                self.game.spawn_bullet(self.game.bullets, self.rect.centerx + offset + 5, self.rect.top, speed=-8, angle=0.2, is_electromagnetic=self.has_electromagnetic_wave)
+
+        self.last_shot = current_time
+
+        # Distribute excess firepower to wingmen
+        excess_firepower = max(0, self.weapon_level - MAX_PLAYER_BULLETS_PER_SHOT)
+        wingmen_list = self.wingmen.sprites()
+
+        if wingmen_list and excess_firepower > 0:
+            bullets_per_wingman_base = excess_firepower // len(wingmen_list)
+            remaining_bullets = excess_firepower % len(wingmen_list)
+
+            for i, wingman in enumerate(wingmen_list):
+                wingman_bullets_to_fire = bullets_per_wingman_base
+                if i < remaining_bullets:
+                    wingman_bullets_to_fire += 1
+                
+                if wingman_bullets_to_fire > 0:
+                    wingman.shoot_bullet(wingman_bullets_to_fire)
 
     def upgrade_weapon(self):
         if self.weapon_level < MAX_WEAPON_LEVEL:  # Max weapon level is now higher
             self.weapon_level += 1
             self.shoot_delay = max(100, self.shoot_delay - 20)  # 每次升級減少 20 毫秒，但最低不低於 100 毫秒
+            self.shot_timer.interval = self.shoot_delay
+            self.shot_timer.start(self.last_shot + self.shoot_delay)
 
     def take_damage(self):
         if not self.is_invincible:
             self.lives -= 1
-            self.is_invincible = True
-            self.invincible_start_time = pygame.time.get_ticks()
+            self.start_invincibility(self.game.clock.get_ticks())
             return True
         return False
 
+    def start_invincibility(self, start_time):
+        # Invincible (and flashing) until INVINCIBLE_TIME after start_time
+        self.is_invincible = True
+        self.invincible_start_time = start_time
+        self.invincibility_timer.start(start_time + INVINCIBLE_TIME)
+        self.flash_timer.start(self.last_flash_time + FLASH_INTERVAL)
+
+    def end_invincibility(self, current_time):
+        self.is_invincible = False
+        self.is_visible = True
+        self.flash_timer.stop()
+
+    def flash(self, current_time):
+        # Flash effect
+        self.is_visible = not self.is_visible
+        self.last_flash_time = current_time
+
     def add_life(self):
         self.lives += 1
 
     def add_wingman(self):
         if len(self.wingmen) < MAX_WINGMEN: # Limit wingmen by MAX_WINGMEN
-            wingman = Wingman(self.rect.centerx, self.rect.centery, 0) # Pass player_img here
-            all_sprites.add(wingman)
-            self.wingmen.add(wingman)
+            wingman = Wingman(self.game, self.rect.centerx, self.rect.centery, 0)
+            self.game.add_sprite(wingman, self.wingmen)
 
     def activate_shield(self):
-        self.is_invincible = True
-        self.invincible_start_time = pygame.time.get_ticks() - (INVINCIBLE_TIME - SHIELD_DURATION) # Make it last longer
+        self.start_invincibility(self.game.clock.get_ticks() - (INVINCIBLE_TIME - SHIELD_DURATION)) # Make it last longer
 
-    def activate_split_shot(self):
+    def activate_split_shot(self, duration=None):
+        if duration is None:
+            duration = SPLIT_SHOT_DURATION # Looked up here so batch.py sweeps can override it
         self.has_split_shot = True
-        self.split_shot_end_time = pygame.time.get_ticks() + SPLIT_SHOT_DURATION
+        self.split_shot_end_time = self.game.clock.get_ticks() + duration
+        self.split_shot_timer.start(self.split_shot_end_time)
+
+    def end_split_shot(self, current_time):
+        self.has_split_shot = False
 
     def activate_drone(self):
         for i in range(DRONE_COUNT):
-            drone = Drone(self)
-            all_sprites.add(drone)
-            self.drones.add(drone)
+            drone = Drone(self.game, self)
+            self.game.add_sprite(drone, self.drones)
     
     def activate_electromagnetic_wave(self):
         self.has_electromagnetic_wave = True
 
 
+# Entity proxies: thin handles on World entities. Position, velocity and culling live in the world's
+# component arrays and are advanced in bulk by World.step; the proxy carries the image, gets its rect
+# written by World.sync and belongs to one EntityGroup, which its layer draws. Not a pygame Sprite and
+# __slots__ only (subclasses list their own fields), so an entity costs no __dict__ and no group bookkeeping.
+class EntityProxy():
+    __slots__ = ("world", "entity", "rect", "image", "group")
+
+    def __init__(self, world):
+        self.world = world
+        self.entity = -1 # World id (kept after kill so the components can still be read this frame)
+        self.group = None # Its EntityGroup, None once killed
+
+    def spawn(self, kind, vel=(0, 0), cull=(-NO_LIMIT, -NO_LIMIT, NO_LIMIT, NO_LIMIT), bounce=False, expires=NO_LIMIT, owner=-1):
+        rect = self.rect
+        self.entity = self.world.create(rect.x, rect.y, rect.width, rect.height, kind, vel, cull, bounce, expires, owner, proxy=self)
+
+    def adopt(self, entity):
+        # Become the proxy of an entity that already exists in the world (snapshot restore)
+        self.entity = entity
+        self.world.proxies[entity] = self
+        x, y = self.world.pos[entity]
+        self.rect.topleft = (math.floor(x), math.floor(y))
+
+    def alive(self):
+        return self.group is not None
+
+    def kill(self):
+        if self.group is not None:
+            self.group.remove(self)
+        if self.entity >= 0 and self.world.proxies[self.entity] is self: # Not already destroyed (or reused)
+            self.world.destroy(self.entity)
+
+    def on_removed(self):
+        # Culled or expired by World.step
+        self.kill()
+
 # Bullet class
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, speed=-10, angle=0, is_electromagnetic=False):
-        super().__init__()
-        self.image = pygame.Surface((5, 10))
-        if is_electromagnetic:
-            self.image.fill(BLUE) # 電磁波子彈為藍色
-        else:
-            self.image.fill(WHITE)
-        self.rect = self.image.get_rect()
+class Bullet(EntityProxy):
+    __slots__ = ("pool", "in_pool", "kind", "speed", "angle", "is_electromagnetic")
+
+    def __init__(self, pool):
+        super().__init__(pool.world)
+        self.pool = pool
+        self.in_pool = True
+        self.rect = pygame.Rect((0, 0), BULLET_SIZE)
+        self.kind = BULLET_KIND_NORMAL
+        self.image = pool.images[BULLET_KIND_NORMAL]
+        self.speed = 0
+        self.angle = 0
+        self.is_electromagnetic = False
+
+    def reset(self, x, y, speed=-10, angle=0, is_electromagnetic=False, kind=None, owner=OWNER_PLAYER):
+        # Re-initialise every field so a recycled bullet carries nothing over from its previous shot
+        if kind is None:
+            kind = BULLET_KIND_ELECTROMAGNETIC if is_electromagnetic else BULLET_KIND_NORMAL
+        self.kind = kind
+        self.image = self.pool.images[kind]
         self.rect.centerx = x
         self.rect.bottom = y
         self.speed = speed
         self.angle = angle
         self.is_electromagnetic = is_electromagnetic
+        width, height = BULLET_SIZE
+        self.spawn(kind, (speed * math.sin(angle), speed * math.cos(angle)), cull=(-width, -height, WINDOW_WIDTH, WINDOW_HEIGHT), owner=owner)
 
-    def update(self):
-        self.rect.y += self.speed * math.cos(self.angle)
-        self.rect.x += self.speed * math.sin(self.angle)
-        if self.rect.bottom < 0 or self.rect.top > WINDOW_HEIGHT or self.rect.left > WINDOW_WIDTH or self.rect.right < 0:
-            self.kill()
+    def adopt(self, entity, speed, angle, is_electromagnetic):
+        kind = int(self.world.kind[entity])
+        self.kind = kind
+        self.image = self.pool.images[kind]
+        self.speed = speed
+        self.angle = angle
+        self.is_electromagnetic = is_electromagnetic
+        super().adopt(entity)
+
+    def kill(self):
+        super().kill()
+        self.pool.release(self)
+
+# Bullet pool: preallocates bullet sprites and recycles them on kill()
+class BulletPool():
+    def __init__(self, world, images, capacity=None):
+        self.world = world
+        self.images = images # kind -> shared bullet surface
+        self.exhausted_count = 0 # Number of times the pool ran out and had to grow
+        self.capacity = 0
+        self.free = []
+        self.add_bullets(capacity if capacity is not None else BULLET_POOL_CAPACITY)
+
+    def add_bullets(self, count):
+        self.free.extend(Bullet(self) for i in range(count))
+        self.capacity += count
+
+    def acquire(self, x, y, speed=-10, angle=0, is_electromagnetic=False, kind=None, owner=OWNER_PLAYER):
+        if not self.free:
+            # Pool exhausted: grow the pool instead of dropping shots
+            self.exhausted_count += 1
+            self.add_bullets(self.capacity)
+        bullet = self.free.pop()
+        bullet.in_pool = False
+        bullet.reset(x, y, speed, angle, is_electromagnetic, kind, owner)
+        return bullet
+
+    def acquire_entity(self, entity, speed, angle, is_electromagnetic):
+        # A bullet for a world entity restored from a snapshot
+        if not self.free:
+            self.add_bullets(self.capacity)
+        bullet = self.free.pop()
+        bullet.in_pool = False
+        bullet.adopt(entity, speed, angle, is_electromagnetic)
+        return bullet
+
+    def release_all(self, bullets):
+        # Back into the pool without touching the world (snapshot restore replaces the world wholesale)
+        for bullet in bullets:
+            self.release(bullet)
+
+    def release(self, bullet):
+        if bullet.in_pool: # Already released (e.g. killed twice)
+            return
+        bullet.in_pool = True
+        self.free.append(bullet)
+
+    def in_use(self):
+        return self.capacity - len(self.free)
+
+
+def chain_lightning(index, source, hops_left):
+    # Cascade outward from source: every enemy within ELECTROMAGNETIC_RADIUS is zapped and becomes
+    # the source of the next hop. Each radius query costs one hop from the frame's budget.
+    killed = []
+    frontier = [source]
+    for hop in range(ELECTROMAGNETIC_MAX_HOPS):
+        next_frontier = []
+        for origin in frontier:
+            if hops_left <= 0:
+                return killed, hops_left
+            hops_left -= 1
+            for other_enemy in index.query_radius(origin.rect.centerx, origin.rect.centery, ELECTROMAGNETIC_RADIUS):
+                if other_enemy.alive(): # Skip enemies already killed this frame
+                    other_enemy.kill()
+                    killed.append(other_enemy)
+                    next_frontier.append(other_enemy)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return killed, hops_left
 
 # Enemy class
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        if enemy_img:
-            self.image = enemy_img
-        else:
-            self.image = pygame.Surface((30, 30))
-            self.image.fill(RED)
+class Enemy(EntityProxy):
+    __slots__ = ("game", "mask")
+
+    def __init__(self, game, entity=None):
+        super().__init__(game.world)
+        self.game = game
+        rng = game.rng
+        self.image = game.assets.get("enemy")
+        self.mask = game.assets.mask("enemy")
         self.rect = self.image.get_rect()
-        self.rect.x = random.randrange(WINDOW_WIDTH - self.rect.width)
-        self.rect.y = random.randrange(-100, -40)
-        self.speedy = random.randrange(1, 4)
-        self.speedx = random.randrange(-2, 2)
-
-    def update(self):
-        self.rect.y += self.speedy
-        self.rect.x += self.speedx
-        if self.rect.top > WINDOW_HEIGHT or self.rect.left < -25 or self.rect.right > WINDOW_WIDTH + 25:
-            self.rect.x = random.randrange(WINDOW_WIDTH - self.rect.width)
-            self.rect.y = random.randrange(-100, -40)
-            self.speedy = random.randrange(1, 4)
+        if entity is not None: # Restored from a snapshot
+            self.adopt(entity)
+            return
+        self.rect.x = rng.randrange(WINDOW_WIDTH - self.rect.width)
+        self.rect.y = rng.randrange(-100, -40)
+        speedy = rng.randrange(1, 4)
+        speedx = rng.randrange(-2, 2)
+        # Culled once below the window or more than 25 px past either side
+        self.spawn(ENTITY_KIND_ENEMY, (speedx, speedy), cull=(-25, -NO_LIMIT, WINDOW_WIDTH + 25 - self.rect.width, WINDOW_HEIGHT))
+
+    def on_removed(self):
+        # Escaped: leave the game and let the wave director send a replacement when the budget allows
+        self.kill()
+        self.game.director.request("escaped")
+
+# Damage per second over a sliding window of game time, fed one event per frame
+class DamageMeter():
+    def __init__(self, window=None):
+        self.window = window if window is not None else DPS_WINDOW
+        self.events = deque() # (time, damage), oldest first
+        self.window_total = 0
+        self.total = 0
+
+    def record(self, current_time, damage):
+        self.events.append((current_time, damage))
+        self.window_total += damage
+        self.total += damage
+
+    def dps(self, current_time):
+        events = self.events
+        while events and events[0][0] <= current_time - self.window:
+            self.window_total -= events.popleft()[1]
+        return self.window_total * 1000 / self.window
 
 # Boss class
 class Boss(pygame.sprite.Sprite):
-    def __init__(self):
+    layer = LAYER_BOSS
+
+    def __init__(self, game, phases=None):
         super().__init__()
-        if boss_img:
-            self.image = boss_img
-        else:
-            self.image = pygame.Surface((150, 150))
-            self.image.fill(PURPLE)
+        self.game = game
+        self.image = game.assets.get("boss")
+        self.mask = game.assets.mask("boss")
         self.rect = self.image.get_rect()
         self.rect.centerx = WINDOW_WIDTH // 2
         self.rect.top = 50 # Start near the top of the screen
-        self.health = 500000 # 500,000 bullet hits
+        self.health = BOSS_HEALTH
         self.speed_x = 2
-        self.shoot_delay = 500 # Boss shoots every 500 ms
-        self.last_shot = 0
-        self.bullet_level = 1 # Boss's initial bullet level
+        self.phases = phases if phases is not None else BOSS_PHASES
+        self.phase = -1 # Index into phases
+        self.emitters = [] # One PatternEmitter per pattern of the current phase
+        self.pattern_timers = [] # One repeating timer per emitter
+        self.damage_meter = DamageMeter()
+        self.enter_phase()
 
     def update(self):
         self.rect.x += self.speed_x
@@ -329,32 +639,45 @@ class Boss(pygame.sprite.Sprite):
         if self.rect.left < 0 or self.rect.right > WINDOW_WIDTH:
             self.speed_x *= -1
 
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_shot > self.shoot_delay:
-            self.shoot()
-            self.last_shot = current_time
-
-    def shoot(self):
-        # Boss shoots multiple bullets downwards based on bullet_level
-        bullets_to_fire = self.bullet_level # Number of bullets to fire per shot
-        offsets = BOSS_BULLET_OFFSETS.get(bullets_to_fire, [0]) # Get offsets based on bullet level
-        for offset in offsets:
-            bullet = Bullet(self.rect.centerx + offset, self.rect.bottom, speed=7) # Boss bullets move downwards
-            all_sprites.add(bullet)
-            boss_bullets.add(bullet)
+    def schedule(self):
+        # (Re)arm one timer per emitter of the current phase, also after a snapshot restore
+        for timer in self.pattern_timers:
+            timer.stop()
+        self.pattern_timers = []
+        for emitter in self.emitters:
+            timer = self.game.timers.timer(TIMER_BOSS_PATTERN, functools.partial(self.fire_pattern, emitter), emitter.interval)
+            timer.start(emitter.last_fire + emitter.interval)
+            self.pattern_timers.append(timer)
+
+    def fire_pattern(self, emitter, current_time):
+        # The emitter fires its whole volley into the boss bullet field in one batch
+        field = self.game.boss_bullets
+        if field.count < self.game.quality.boss_bullet_cap: # Frame governor: volleys are skipped (on their cadence) while too many bullets are out
+            emitter.fire(field, self.rect.centerx, self.rect.bottom, self.game.player.rect.center)
+        emitter.last_fire = current_time
+
+    def kill(self):
+        super().kill()
+        for timer in self.pattern_timers:
+            timer.stop()
+
+    def enter_phase(self):
+        # Move on to the last phase whose health threshold has been reached (the first one starts right away,
+        # whatever BOSS_HEALTH is set to)
+        phase = self.phase
+        while phase + 1 < len(self.phases) and (phase < 0 or self.health <= self.phases[phase + 1][0]):
+            phase += 1
+        if phase != self.phase:
+            self.phase = phase
+            current_time = self.game.clock.get_ticks()
+            self.emitters = [PatternEmitter(pattern, current_time) for pattern in self.phases[phase][1]]
+            self.schedule()
 
     def take_damage(self, damage):
+        # Called once per frame with everything that hit the boss in it
         self.health -= damage
-        
-        # Upgrade boss bullet level based on health
-        if self.health <= 100000 and self.bullet_level < 5:
-            self.bullet_level = 5
-        elif self.health <= 200000 and self.bullet_level < 4:
-            self.bullet_level = 4
-        elif self.health <= 300000 and self.bullet_level < 3:
-            self.bullet_level = 3
-        elif self.health <= 400000 and self.bullet_level < 2:
-            self.bullet_level = 2
+        self.damage_meter.record(self.game.clock.get_ticks(), damage)
+        self.enter_phase() # 血量越低，彈幕越密
 
         if self.health <= 0:
             self.kill()
@@ -363,24 +686,18 @@ class Boss(pygame.sprite.Sprite):
 
 # Wingman class
 class Wingman(pygame.sprite.Sprite):
-    def __init__(self, x, y, offset_x):
+    layer = LAYER_WINGMEN
+
+    def __init__(self, game, x, y, offset_x):
         super().__init__()
+        self.game = game
         self.width = 40
         self.height = 40
         self.speed = 5
         self.last_shot = 0
         self.shoot_delay = 200  # 與玩家相同的射擊延遲
         self.offset_x = offset_x
-        
-        # 載入僚機圖片
-        try:
-            self.image = pygame.image.load(os.path.join(os.path.dirname(__file__), "僚機.png")).convert_alpha()
-            self.image = pygame.transform.scale(self.image, (self.width, self.height))
-        except:
-            print("無法載入僚機圖片，使用白色方塊")
-            self.image = pygame.Surface((self.width, self.height))
-            self.image.fill(WHITE)
-        
+        self.image = game.assets.get("wingman") # 僚機圖片 (cached, 40x40)
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.centery = y
@@ -395,81 +712,70 @@ class Wingman(pygame.sprite.Sprite):
         if bullet_count > 0:
             offsets = WINGMAN_BULLET_OFFSETS.get(bullet_count, [0])
             for offset in offsets:
-                bullet = Bullet(self.rect.centerx + offset, self.rect.top)
-                all_sprites.add(bullet)
-                bullets.add(bullet)
+                self.game.spawn_bullet(self.game.bullets, self.rect.centerx + offset, self.rect.top, owner=OWNER_WINGMAN)
 
 # Fireball class
-class Fireball(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        self.image = pygame.Surface((20, 20))
-        self.image.fill(ORANGE)
+class Fireball(EntityProxy):
+    __slots__ = ()
+
+    def __init__(self, game, entity=None):
+        super().__init__(game.world)
+        self.image = game.assets.solid((20, 20), ORANGE)
         self.rect = self.image.get_rect()
-        self.rect.x = random.randrange(0, WINDOW_WIDTH - self.rect.width)
+        if entity is not None:
+            self.adopt(entity)
+            return
+        self.rect.x = game.rng.randrange(0, WINDOW_WIDTH - self.rect.width)
         self.rect.y = 0 # Start from top
-        self.speed = random.randrange(3, 7)
-
-    def update(self):
-        self.rect.y += self.speed
-        if self.rect.top > WINDOW_HEIGHT:
-            self.kill()
+        speed = game.rng.randrange(3, 7)
+        self.spawn(ENTITY_KIND_FIREBALL, (0, speed), cull=(-NO_LIMIT, -NO_LIMIT, NO_LIMIT, WINDOW_HEIGHT)) # Gone once below the window
 
 # Bouncing Ball class
-class BouncingBall(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        # 載入彈球圖片
-        try:
-            self.image = pygame.image.load(os.path.join(os.path.dirname(__file__), "彈球.png")).convert_alpha()
-            self.image = pygame.transform.scale(self.image, (15, 15))
-        except:
-            print("無法載入彈球圖片，使用黃色方塊")
-            self.image = pygame.Surface((15, 15))
-            self.image.fill(YELLOW)
-        self.rect = self.image.get_rect()
-        self.rect.center = (random.randrange(50, WINDOW_WIDTH - 50), random.randrange(50, WINDOW_HEIGHT - 50))
-        self.speed_x = random.choice([-3, 3])
-        self.speed_y = random.choice([-3, 3])
+class BouncingBall(EntityProxy):
+    __slots__ = ()
 
-    def update(self):
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
-
-        # Bounce off walls
-        if self.rect.left < 0 or self.rect.right > WINDOW_WIDTH:
-            self.speed_x *= -1
-        if self.rect.top < 0 or self.rect.bottom > WINDOW_HEIGHT:
-            self.speed_y *= -1
+    def __init__(self, game, entity=None):
+        super().__init__(game.world)
+        self.image = game.assets.get("bouncing_ball") # 彈球圖片
+        self.rect = self.image.get_rect()
+        if entity is not None:
+            self.adopt(entity)
+            return
+        self.rect.center = (game.rng.randrange(50, WINDOW_WIDTH - 50), game.rng.randrange(50, WINDOW_HEIGHT - 50))
+        speed_x = game.rng.choice([-3, 3])
+        speed_y = game.rng.choice([-3, 3])
+        self.spawn(ENTITY_KIND_BOUNCING_BALL, (speed_x, speed_y), bounce=True) # Bounces off the walls, never culled
 
 # Drone class
 class Drone(pygame.sprite.Sprite):
-    def __init__(self, player):
+    layer = LAYER_DRONES
+
+    def __init__(self, game, player):
         super().__init__()
-        # 載入無人機圖片
-        try:
-            self.image = pygame.image.load(os.path.join(os.path.dirname(__file__), "無人機.png")).convert_alpha()
-            self.image = pygame.transform.scale(self.image, (20, 20)) # 調整無人機大小
-        except:
-            print("無法載入無人機圖片，使用青色方塊")
-            self.image = pygame.Surface((10, 10))
-            self.image.fill(CYAN) # Cyan color for drone
+        self.game = game
+        self.image = game.assets.get("drone") # 無人機圖片
         self.rect = self.image.get_rect()
         self.player = player
-        self.angle = random.uniform(0, 2 * math.pi) # Initial random angle
+        self.angle = game.rng.uniform(0, 2 * math.pi) # Initial random angle
         self.last_shot = 0
+        self.shot_timer = game.timers.timer(TIMER_DRONE_SHOT, self.shoot, DRONE_SHOOT_COOLDOWN)
+        self.schedule()
 
     def update(self):
         self.angle += DRONE_ORBIT_SPEED
         self.rect.centerx = self.player.rect.centerx + DRONE_RADIUS * math.cos(self.angle)
         self.rect.centery = self.player.rect.centery + DRONE_RADIUS * math.sin(self.angle)
 
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_shot > DRONE_SHOOT_COOLDOWN:
-            bullet = Bullet(self.rect.centerx, self.rect.top, speed=-7) # Drones shoot straight up
-            all_sprites.add(bullet)
-            bullets.add(bullet)
-            self.last_shot = current_time
+    def schedule(self):
+        self.shot_timer.start(self.last_shot + DRONE_SHOOT_COOLDOWN)
+
+    def shoot(self, current_time):
+        self.game.spawn_bullet(self.game.bullets, self.rect.centerx, self.rect.top, speed=-7, owner=OWNER_DRONE) # Drones shoot straight up
+        self.last_shot = current_time
+
+    def kill(self):
+        super().kill()
+        self.shot_timer.stop()
 
 # Button class for UI
 class Button():
@@ -482,6 +788,7 @@ class Button():
         self.text = text
         self.text_color = text_color
         self.font = pygame.font.Font(None, 30)
+        self.text_surface = None # Rendered on first draw, the label never changes
 
     def draw(self, screen, outline=None):
         # Call this method to draw the button on the screen
@@ -491,357 +798,733 @@ class Button():
         pygame.draw.rect(screen, self.color, (self.x,self.y,self.width,self.height),0)
         
         if self.text != '':
-            text_surface = self.font.render(self.text, 1, self.text_color)
+            if self.text_surface is None:
+                self.text_surface = self.font.render(self.text, 1, self.text_color)
+            text_surface = self.text_surface
             screen.blit(text_surface, (self.x + (self.width/2 - text_surface.get_width()/2), self.y + (self.height/2 - text_surface.get_height()/2)))
 
     def is_over(self, pos):
-        print(f"Checking if mouse at {pos} is over button at ({self.x}, {self.y}, {self.width}, {self.height})") # Added for debugging
         # Pos is the mouse position or a tuple of (x,y) coordinates
         if pos[0] > self.x and pos[0] < self.x + self.width:
             if pos[1] > self.y and pos[1] < self.y + self.height:
-                print("Mouse is over button!") # Added for debugging
                 return True
         return False
 
 
-# Create sprite groups
-all_sprites = pygame.sprite.Group()
-enemies = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-fireballs = pygame.sprite.Group() # New group for fireballs
-bouncing_balls = pygame.sprite.Group() # New group for bouncing balls
-drones = pygame.sprite.Group() # New group for drones
-boss_bullets = pygame.sprite.Group() # New group for boss bullets
-boss_group = pygame.sprite.Group() # New group for the boss
-
-# Create player
-player = Player()
-all_sprites.add(player)
-
-# Create initial enemies
-for i in range(INITIAL_ENEMY_COUNT):
-    enemy = Enemy()
-    all_sprites.add(enemy)
-    enemies.add(enemy)
-
-# Game variables
-score = 0
-font = pygame.font.Font(None, 36)
-game_time = 0
-last_enemy_spawn = 0
-enemy_spawn_interval = ENEMY_SPAWN_INTERVAL
-last_difficulty_increase = 0
-next_upgrade_score = SCORE_FOR_UPGRADE
-next_life_score = SCORE_FOR_LIFE
-next_wingman_score = SCORE_FOR_WINGMAN
-next_skill_score = SCORE_FOR_SKILL
-game_state = GAME_STATE_PLAYING
-skill_options_display = []
-skill_buttons = [] # New list to store skill buttons
-last_fireball_spawn = 0
-last_bouncing_ball_gen = 0
-boss = None # Initialize boss as None
-
-
-# Game main loop
-running = True
-clock = pygame.time.Clock()
-start_time = pygame.time.get_ticks()
-
-while running:
-    # Calculate game time
-    current_time = pygame.time.get_ticks()
-    game_time = current_time - start_time
-    
-    # Control game speed (always tick to ensure events are processed)
-    clock.tick(60)
-    
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if game_state == GAME_STATE_PLAYING or game_state == GAME_STATE_BOSS_FIGHT: # 允許在頭目戰中移動
-                if event.key == pygame.K_LEFT:
-                    player.rect.x -= player.speed
-                if event.key == pygame.K_RIGHT:
-                    player.rect.x += player.speed
-                # 自動射擊現在由 Player.update() 處理，不需要 K_SPACE
-        elif event.type == pygame.MOUSEBUTTONDOWN: # Handle mouse clicks
-            print(f"Mouse clicked at: {event.pos}") # Added for debugging
-            if game_state == GAME_STATE_SKILL_SELECTION:
-                for i, button in enumerate(skill_buttons):
-                    if button.is_over(event.pos):
-                        selected_skill = skill_options_display[i]
-                        if selected_skill == "Shield":
-                            player.activate_shield()
-                        elif selected_skill == "Split Shot":
-                            player.activate_split_shot()
-                        elif selected_skill == "Fireball":
-                            pass # Fireball is passive, no direct activation, but we still need to select it
-                        elif selected_skill == "Bouncing Ball":
-                            pass # Bouncing Ball is passive, no direct activation
-                        elif selected_skill == "Drone":
-                            player.activate_drone()
-                        elif selected_skill == "Electromagnetic Wave":
-                            player.activate_electromagnetic_wave()
-                        game_state = GAME_STATE_PLAYING
-                        skill_buttons = [] # Clear buttons after selection
+def ignore_phase(phase):
+    pass
+
+def init_pygame():
+    # Only the modules the game uses (display with its events, and fonts); no audio, joystick or camera start-up
+    pygame.display.init()
+    pygame.font.init()
+
+
+def open_window(vsync=False):
+    # The game window, or the one already open (the loading screen opens it before the Game exists)
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != (WINDOW_WIDTH, WINDOW_HEIGHT):
+        try:
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SCALED if vsync else 0, vsync=int(vsync))
+        except pygame.error: # vsync is not available with every driver
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Bullet Hell Shooter")
+    return screen
+
+
+# Game: owns all state and runs one frame per step(). Nothing touches the window until a Game is created.
+class Game():
+    def __init__(self, seed=None, clock=None, headless=False, render=None, dirty_rects=False, interpolate=False, vsync=False):
+        self.headless = headless
+        self.render_enabled = (not headless) if render is None else render
+        if headless:
+            # No window: the dummy driver still provides a display surface for convert()/convert_alpha()
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        init_pygame()
+        self.screen = open_window(vsync)
+
+        # Load all sprite images once (wingmen, drones and bouncing balls reuse the cached surfaces);
+        # after the loading screen (show_loading_screen) these only hit the cache
+        self.assets = assets
+        self.assets.load_atlas() # Baked atlas (bake_assets.py), if present
+        self.assets.preload()
+
+        self.quality_level = 0 # Index into QUALITY_LEVELS, set by the frame governor in main()
+        self.quality = QUALITY_LEVELS[0]
+        self.projectile_counts = None # Live bullets per owner this tick, only while projectiles are capped
+        self.timers = Scheduler() # Cooldowns, durations and periodic spawns on simulation time, run once per tick
+        self.interpolate = interpolate # Draw sprites between their last two simulated positions
+        self.phase_timer = None
+        self.mark = ignore_phase # Phase boundary hook, see set_phase_timer
+        self.overlays = [] # Debug layers drawn over the frame (e.g. the profiler graph), each with draw(screen)
+        # Dirty-rect mode redraws and pushes only the changed parts of the window
+        self.renderer = DirtyRectRenderer(BLACK) if dirty_rects else FullRedraw(BLACK)
+
+        # Create sprite groups
+        self.all_sprites = pygame.sprite.Group()
+        self.layers = RenderLayers()
+        self.world = World(ENTITY_CAPACITY, WINDOW_WIDTH, WINDOW_HEIGHT) # Bullets, enemies, fireballs and bouncing balls
+        self.enemies = EntityGroup(self.world)
+        self.bullets = EntityGroup(self.world)
+        self.fireballs = EntityGroup(self.world) # New group for fireballs
+        self.bouncing_balls = EntityGroup(self.world) # New group for bouncing balls
+        self.boss_bullets = BulletField(BOSS_BULLET_CAPACITY, WINDOW_WIDTH, WINDOW_HEIGHT, BULLET_SIZE,
+                                        self.assets.solid(BULLET_SIZE, BULLET_COLORS[BULLET_KIND_BOSS])) # Boss bullets, arrays only
+        self.boss_group = pygame.sprite.Group() # New group for the boss
+        self.layers.attach(LAYER_ENEMIES, self.enemies)
+        self.layers.attach(LAYER_BALLS, self.fireballs)
+        self.layers.attach(LAYER_BALLS, self.bouncing_balls)
+        self.layers.attach(LAYER_BULLETS, self.bullets)
+        self.layers.attach(LAYER_BULLETS, self.boss_bullets)
+        bullet_images = {kind: self.assets.solid(BULLET_SIZE, color) for kind, color in BULLET_COLORS.items()}
+        self.bullet_pool = BulletPool(self.world, bullet_images)
+        self.bullet_damage = np.zeros(ENTITY_KIND_COUNT, dtype=np.int64) # Entity kind -> damage to the boss
+        for kind, damage in BULLET_DAMAGE.items():
+            self.bullet_damage[kind] = damage
+        self.pixel_collisions = PIXEL_COLLISIONS # Mask narrowphase after the rect broadphase (player and boss hits)
+        self.chain_index = collision.SpatialHash(ELECTROMAGNETIC_RADIUS) # Enemy positions for chain lightning radius queries
+
+        self.font = pygame.font.Font(None, 36)
+        self.hud = Hud(self.font, composite=HUD_COMPOSITE)
+        self.hud.add("score", "Score: {}", WHITE, (10, 10))
+        self.hud.add("lives", "Lives: {}", WHITE, (10, 50))
+        self.hud.add("time", "Time: {}s", WHITE, (10, 90))
+        self.hud.add("enemies", "Enemies: {}", WHITE, (10, 130))
+        self.hud.add("boss_health", "Boss Health: {}", RED, (WINDOW_WIDTH // 2, 10), centered=True)
+        self.hud.add("boss_dps", "DPS: {}", RED, (WINDOW_WIDTH // 2, 50), centered=True)
+        self.hud.add("weapon_level", "Weapon Level: {}", YELLOW, (10, 170))
+        self.hud.add("next_upgrade", "Next Upgrade: {}", YELLOW, (10, 210))
+        self.hud.add("next_life", "Next Life: {}", YELLOW, (10, 250))
+        self.hud.add("wingmen", "Wingmen: {}", YELLOW, (10, 290))
+        self.hud.add("drones", "Drones: {}", YELLOW, (10, 330))
+        self.hud.add("quality", "Quality -{}", LIGHT_GRAY, (WINDOW_WIDTH - 120, 10))
+        self.skill_overlay = None
+        self.fireball_timer = self.timers.timer(TIMER_FIREBALL, self.spawn_fireball, FIREBALL_COOLDOWN)
+        self.bouncing_ball_timer = self.timers.timer(TIMER_BOUNCING_BALL, self.spawn_bouncing_ball, BOUNCING_BALL_GEN_INTERVAL)
+        self.reset(seed, clock)
+
+    def reset(self, seed=None, clock=None):
+        # Start a new session on this window: everything the simulation depends on is set up again, while the
+        # assets, groups, render layers, world and pool arrays are kept (the RL envs reset once per episode)
+        if seed is None:
+            seed = random.randrange(1 << 32) # Picked here so a recording can replay the same session
+        self.seed = seed
+        self.rng = random.Random(seed) # All gameplay randomness goes through this generator
+        self.recorder = None # InputRecorder fed with every tick's input (see replay.py)
+        self.rewind = None # RewindBuffer snapshotting the last seconds of play (practice mode, see snapshot.py)
+        self.clock = clock if clock is not None else SimClock()
+        self.input = NO_INPUT
+        self.running = True
+        self.frame = 0 # Simulation ticks so far
+        self.timestep = FixedTimestep(FRAME_TIME) # Real time -> simulation ticks, see run_frame
+        self.pending_input = None # Input of render frames that ran no simulation tick
+        self.drawn_state = None # Game state of the last drawn frame
+
+        # Take the last session apart (like snapshot.restore); the world hands out its ids from the start again
+        self.timers.clear()
+        self.bullet_pool.release_all(self.bullets.sprites())
+        self.bullet_pool.exhausted_count = 0
+        for group in (self.all_sprites, self.enemies, self.bullets, self.fireballs, self.bouncing_balls, self.boss_group):
+            group.empty()
+        self.layers.empty()
+        self.world.reset()
+        self.boss_bullets.clear()
+        self.boss_bullets.emitted = self.boss_bullets.peak = 0
+
+        # Create player
+        self.player = Player(self)
+        self.add_sprite(self.player)
+
+        # Create initial enemies
+        for i in range(INITIAL_ENEMY_COUNT):
+            self.spawn_enemy()
+
+        # Game variables
+        self.score = 0
+        self.start_time = self.clock.get_ticks()
+        self.game_time = 0
+        # Wave director: every later enemy spawn is queued and released within the live budget
+        self.director = WaveDirector(
+            self.spawn_enemy,
+            DifficultyCurve(ENEMY_SPAWN_INTERVAL, -ENEMY_SPAWN_INTERVAL_STEP * 60000 / DIFFICULTY_INCREASE_INTERVAL, MIN_ENEMY_SPAWN_INTERVAL),
+            DifficultyCurve(ENEMY_BUDGET, ENEMY_BUDGET_PER_MINUTE, MAX_ENEMY_BUDGET),
+            MAX_ENEMY_SPAWNS_PER_TICK, ENEMY_SPAWN_QUEUE_LIMIT, start_time=self.start_time)
+        self.next_upgrade_score = SCORE_FOR_UPGRADE
+        self.next_life_score = SCORE_FOR_LIFE
+        self.next_wingman_score = SCORE_FOR_WINGMAN
+        self.next_skill_score = SCORE_FOR_SKILL
+        self.game_state = GAME_STATE_PLAYING
+        self.skill_options_display = []
+        self.skill_buttons = [] # New list to store skill buttons
+        self.last_fireball_spawn = 0
+        self.last_bouncing_ball_gen = 0
+        self.schedule_passives()
+        self.boss = None # Initialize boss as None
+
+    def set_phase_timer(self, timer):
+        # timer.start_frame() / timer.end_frame() wrap every step and timer.mark(phase) is called as each
+        # phase of the frame finishes. None turns timing off again (the marks then cost one no-op call).
+        self.phase_timer = timer
+        self.mark = timer.mark if timer is not None else ignore_phase
+
+    def add_sprite(self, sprite, *groups):
+        # Every sprite is updated through all_sprites and drawn through its class's render layer
+        self.all_sprites.add(sprite)
+        sprite.prev_topleft = sprite.rect.topleft # Nothing to interpolate from yet
+        self.layers.add(sprite)
+        for group in groups:
+            group.add(sprite)
+
+    def add_entity(self, proxy, group):
+        # World entities (EntityProxy) are moved by World.step and drawn through their group
+        group.add(proxy)
+
+    def spawn_bullet(self, group, x, y, speed=-10, angle=0, is_electromagnetic=False, kind=None, owner=OWNER_PLAYER):
+        # None when the owner is at the governor's projectile cap
+        cap = self.quality.projectile_cap
+        if cap != NO_LIMIT:
+            counts = self.projectile_counts
+            if counts is None: # Counted once per tick, then kept up to date here
+                world = self.world
+                owners = world.owner[world.alive & (world.owner >= 0)]
+                counts = self.projectile_counts = np.bincount(owners, minlength=OWNER_COUNT).tolist()
+            if counts[owner] >= cap:
+                return None
+            counts[owner] += 1
+        bullet = self.bullet_pool.acquire(x, y, speed, angle, is_electromagnetic, kind, owner)
+        self.add_entity(bullet, group)
+        return bullet
+
+    def set_quality(self, level):
+        self.quality_level = level
+        self.quality = QUALITY_LEVELS[level]
+        self.schedule_passives()
+
+    def schedule_passives(self):
+        # (Re)arm the passive skill spawns at the current quality's rate. They repeat whether or not they can spawn
+        # (an inactive passive just skips its turn), so this only runs when the rates change or after a restore
+        factor = self.quality.passive_spawn_factor
+        self.fireball_timer.interval = FIREBALL_COOLDOWN * factor
+        self.bouncing_ball_timer.interval = BOUNCING_BALL_GEN_INTERVAL * factor
+        self.fireball_timer.start(self.last_fireball_spawn + self.fireball_timer.interval)
+        self.bouncing_ball_timer.start(self.last_bouncing_ball_gen + self.bouncing_ball_timer.interval)
+
+    def spawn_fireball(self, current_time):
+        # Fireball timer (passive skill); a skipped turn still counts, so the timer phase can be restored
+        self.last_fireball_spawn = current_time
+        if self.game_state != GAME_STATE_PLAYING or "Fireball" not in self.skill_options_display:
+            return
+        fireball = Fireball(self)
+        self.add_entity(fireball, self.fireballs)
+
+    def spawn_bouncing_ball(self, current_time):
+        # Bouncing ball timer (passive skill)
+        self.last_bouncing_ball_gen = current_time
+        if self.game_state != GAME_STATE_PLAYING or "Bouncing Ball" not in self.skill_options_display or len(self.bouncing_balls) >= MAX_BOUNCING_BALLS:
+            return
+        bouncing_ball = BouncingBall(self)
+        self.add_entity(bouncing_ball, self.bouncing_balls)
+
+    def spawn_enemy(self):
+        enemy = Enemy(self)
+        self.add_entity(enemy, self.enemies)
+        return enemy
+
+    def step(self, inputs=NO_INPUT, dt=FRAME_TIME):
+        # Advance the game by one tick of dt milliseconds and draw it; returns False once the game should close
+        timer = self.phase_timer
+        if timer is not None:
+            timer.start_frame()
+        self.simulate(inputs, dt)
+        if self.render_enabled:
+            self.draw()
+        if timer is not None:
+            timer.end_frame()
+        return self.running
+
+    def run_frame(self, inputs, elapsed_ms):
+        # Real-time loop: simulate as many fixed ticks as elapsed_ms of wall time covers (capped by the
+        # timestep), then draw once, interpolated by the time left over. Returns False once the game should close.
+        timer = self.phase_timer
+        if timer is not None:
+            timer.start_frame()
+        if self.pending_input is not None:
+            inputs = merge_inputs(self.pending_input, inputs)
+            self.pending_input = None
+        if inputs.quit:
+            self.running = False
+        ticks = self.timestep.advance(elapsed_ms)
+        if ticks == 0:
+            self.pending_input = inputs # Key presses and clicks wait for the next tick
+        for i in range(ticks):
+            self.simulate(inputs)
+            inputs = inputs._replace(nudge=0, clicks=(), skill=None) # One-off input applies to the first tick only
+        if self.render_enabled:
+            self.draw(self.timestep.alpha if self.interpolate and self.quality.interpolate else None)
+        if timer is not None:
+            timer.end_frame()
+        return self.running
+
+    def simulate(self, inputs=NO_INPUT, dt=FRAME_TIME):
+        # One simulation tick, no drawing
+        if self.recorder is not None:
+            self.recorder.record(inputs)
+        if self.interpolate:
+            self.layers.snapshot()
+        self.clock.advance(dt)
+        self.projectile_counts = None
+        current_time = self.clock.get_ticks()
+        self.game_time = current_time - self.start_time
+        self.frame += 1
+
+        self.handle_input(inputs)
+        self.mark("events")
+        if self.game_state == GAME_STATE_PLAYING:
+            self.update_playing(current_time)
+        elif self.game_state == GAME_STATE_BOSS_FIGHT: # Boss fight logic
+            self.update_boss_fight()
+        if self.rewind is not None:
+            self.rewind.record(self)
+
+    def handle_input(self, inputs):
+        self.input = inputs
+        if inputs.quit:
+            self.running = False
+        if self.game_state == GAME_STATE_PLAYING or self.game_state == GAME_STATE_BOSS_FIGHT: # 允許在頭目戰中移動
+            # Extra step on key press (the held key moves the player in Player.update)
+            self.player.rect.x += inputs.nudge * self.player.speed
+            # 自動射擊現在由 Player.update() 處理，不需要 K_SPACE
+        elif self.game_state == GAME_STATE_SKILL_SELECTION:
+            if inputs.skill is not None:
+                self.choose_skill(inputs.skill)
+            for pos in inputs.clicks: # Handle mouse clicks
+                for i, button in enumerate(self.skill_buttons):
+                    if button.is_over(pos):
+                        self.choose_skill(i)
                         break
+                if self.game_state != GAME_STATE_SKILL_SELECTION:
+                    break
+
+    def choose_skill(self, index):
+        if self.game_state != GAME_STATE_SKILL_SELECTION or not 0 <= index < len(self.skill_options_display):
+            return
+        selected_skill = self.skill_options_display[index]
+        player = self.player
+        if selected_skill == "Shield":
+            player.activate_shield()
+        elif selected_skill == "Split Shot":
+            player.activate_split_shot()
+        elif selected_skill == "Fireball":
+            pass # Fireball is passive, no direct activation, but we still need to select it
+        elif selected_skill == "Bouncing Ball":
+            pass # Bouncing Ball is passive, no direct activation
+        elif selected_skill == "Drone":
+            player.activate_drone()
+        elif selected_skill == "Electromagnetic Wave":
+            player.activate_electromagnetic_wave()
+        self.game_state = GAME_STATE_PLAYING
+        self.skill_buttons = [] # Clear buttons after selection
+
+    def update_playing(self, current_time):
+        player = self.player
+        enemies = self.enemies
 
-    # Game logic update
-    if game_state == GAME_STATE_PLAYING:
         # Check for boss fight trigger
-        if score >= BOSS_FIGHT_SCORE_THRESHOLD and len(boss_group) == 0:
-            game_state = GAME_STATE_BOSS_FIGHT
+        if self.score >= BOSS_FIGHT_SCORE_THRESHOLD and len(self.boss_group) == 0:
+            self.game_state = GAME_STATE_BOSS_FIGHT
             # Clear all enemies and bullets
             for enemy in enemies:
                 enemy.kill()
-            for bullet in bullets:
+            for bullet in self.bullets:
                 bullet.kill()
-            for fireball in fireballs:
+            for fireball in self.fireballs:
                 fireball.kill()
-            for bouncing_ball in bouncing_balls:
+            for bouncing_ball in self.bouncing_balls:
                 bouncing_ball.kill()
             
+            self.director.clear()
+
             # Spawn the boss
-            boss = Boss()
-            all_sprites.add(boss)
-            boss_group.add(boss)
-
-        # Spawn new enemies based on time
-        if current_time - last_enemy_spawn > enemy_spawn_interval:
-            enemy = Enemy()
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            last_enemy_spawn = current_time
-
-        # Increase difficulty over time
-        if current_time - last_difficulty_increase > DIFFICULTY_INCREASE_INTERVAL:
-            enemy_spawn_interval = max(MIN_ENEMY_SPAWN_INTERVAL, 
-                                     enemy_spawn_interval - 100)
-            last_difficulty_increase = current_time
-
-        # Spawn fireballs (passive skill)
-        if "Fireball" in skill_options_display and current_time - last_fireball_spawn > FIREBALL_COOLDOWN:
-            fireball = Fireball()
-            all_sprites.add(fireball)
-            fireballs.add(fireball)
-            last_fireball_spawn = current_time
-
-        # Generate bouncing balls (passive skill)
-        if "Bouncing Ball" in skill_options_display and current_time - last_bouncing_ball_gen > BOUNCING_BALL_GEN_INTERVAL and len(bouncing_balls) < MAX_BOUNCING_BALLS:
-            bouncing_ball = BouncingBall()
-            all_sprites.add(bouncing_ball)
-            bouncing_balls.add(bouncing_ball)
-            last_bouncing_ball_gen = current_time
+            self.boss = Boss(self)
+            self.add_sprite(self.boss, self.boss_group)
 
+        # Timed spawns and queued replacements, within the live enemy budget (difficulty ramps with game time)
+        self.director.update(current_time, len(enemies))
+        self.mark("spawn")
 
         # Update game
-        all_sprites.update()
-
-        # Debugging: print sprite counts at intervals
-        if current_time % 1000 < 50: # 每秒列印一次
-            print(f"Score: {score}, Enemies: {len(enemies)}, Bullets: {len(bullets)}, Fireballs: {len(fireballs)}, Bouncing Balls: {len(bouncing_balls)}, Drones: {len(player.drones)}")
+        self.world.step(current_time) # Move, bounce and cull every entity in one batch
+        self.mark("entities")
+        self.all_sprites.update()
+        self.mark("update")
+        self.timers.run(current_time) # Shots, skill durations and passive spawns that are due
+        self.mark("timers")
 
         # Check bullet and enemy collisions
-        hits = pygame.sprite.groupcollide(enemies, bullets, True, True)
+        hits = collision.groupcollide(enemies, self.bullets, True, True)
+        chain_index_built = False
+        chain_hops_left = ELECTROMAGNETIC_HOP_BUDGET
         for hit_enemy, hit_bullets in hits.items():
-            score += 10
-            enemy = Enemy()
-            all_sprites.add(enemy)
-            enemies.add(enemy)
+            self.score += 10
+            self.director.request()
             
-            # Check for electromagnetic wave effect
-            for bullet_hit in hit_bullets:
-                if bullet_hit.is_electromagnetic:
-                    enemies_to_kill = []
-                    for other_enemy in enemies:
-                        distance = math.hypot(hit_enemy.rect.centerx - other_enemy.rect.centerx,
-                                              hit_enemy.rect.centery - other_enemy.rect.centery)
-                        if distance < ELECTROMAGNETIC_RADIUS:
-                            enemies_to_kill.append(other_enemy)
-                    
-                    for killed_enemy in enemies_to_kill:
-                        killed_enemy.kill()
-                        score += 10 # Grant score for chain kill
-                        new_enemy = Enemy() # Spawn new enemy
-                        all_sprites.add(new_enemy)
-                        enemies.add(new_enemy)
+            # Check for electromagnetic wave effect (one chain per enemy, however many wave bullets hit it)
+            if any(bullet_hit.is_electromagnetic for bullet_hit in hit_bullets):
+                if not chain_index_built: # Index enemy positions once per frame, only when a chain actually fires
+                    self.chain_index.build(enemies.sprites())
+                    chain_index_built = True
+                enemies_to_kill, chain_hops_left = chain_lightning(self.chain_index, hit_enemy, chain_hops_left)
+                for killed_enemy in enemies_to_kill:
+                    self.score += 10 # Grant score for chain kill
+                    self.director.request() # Queue a replacement enemy
 
             # Check for weapon upgrade
-            if score >= next_upgrade_score:
+            if self.score >= self.next_upgrade_score:
                 player.upgrade_weapon()
-                next_upgrade_score += SCORE_FOR_UPGRADE
+                self.next_upgrade_score += SCORE_FOR_UPGRADE
 
             # Check for extra life
-            if score >= next_life_score:
+            if self.score >= self.next_life_score:
                 player.add_life()
-                next_life_score += SCORE_FOR_LIFE
+                self.next_life_score += SCORE_FOR_LIFE
 
             # Check for wingman
-            if score >= next_wingman_score:
+            if self.score >= self.next_wingman_score:
                 player.add_wingman()
-                next_wingman_score += SCORE_FOR_WINGMAN
+                self.next_wingman_score += SCORE_FOR_WINGMAN
 
             # Check for skill trigger
-            if score >= next_skill_score:
-                game_state = GAME_STATE_SKILL_SELECTION
-                skill_options_display = random.sample(list(SKILLS.keys()), 3)
-                # Create buttons for skill selection
-                skill_buttons = []
-                button_width = 400
-                button_height = 50
-                button_start_y = WINDOW_HEIGHT // 2 - 50 # Adjust vertical position
-                for i, skill_name in enumerate(skill_options_display):
-                    button_y = button_start_y + i * (button_height + 10) # 10 pixels padding
-                    button = Button(DARK_GRAY, WINDOW_WIDTH // 2 - button_width // 2, button_y, button_width, button_height, f"{i+1}. {SKILLS[skill_name]}", WHITE)
-                    skill_buttons.append(button)
-                next_skill_score += SCORE_FOR_SKILL # Prepare for next skill trigger
+            if self.score >= self.next_skill_score:
+                self.open_skill_selection()
+        self.mark("collide_bullets")
 
         # Check fireball and enemy collisions
-        hits = pygame.sprite.groupcollide(enemies, fireballs, True, True)
+        hits = collision.groupcollide(enemies, self.fireballs, True, True)
         for hit in hits:
-            score += 10
-            enemy = Enemy()
-            all_sprites.add(enemy)
-            enemies.add(enemy)
+            self.score += 10
+            self.director.request()
+        self.mark("collide_fireballs")
         
         # Check bouncing ball and enemy collisions
-        hits = pygame.sprite.groupcollide(enemies, bouncing_balls, True, False) # Bouncing ball does not get killed
+        hits = collision.groupcollide(enemies, self.bouncing_balls, True, False) # Bouncing ball does not get killed
         for hit in hits:
-            score += 10
-            enemy = Enemy()
-            all_sprites.add(enemy)
-            enemies.add(enemy)
+            self.score += 10
+            self.director.request()
+        self.mark("collide_bouncing_balls")
         
         # Check drone bullets and enemy collisions
-        hits = pygame.sprite.groupcollide(enemies, player.drones, True, False) # Drones hit enemies
+        hits = collision.groupcollide(enemies, player.drones, True, False) # Drones hit enemies
         for hit in hits:
-            score += 10
-            enemy = Enemy()
-            all_sprites.add(enemy)
-            enemies.add(enemy)
+            self.score += 10
+            self.director.request()
+        self.mark("collide_drones")
 
         # Check player and enemy collisions
-        hits = pygame.sprite.spritecollide(player, enemies, True)
+        world = self.world
+        hits = [world.proxies[entity] for entity in world.collide_rect(player.rect, ENTITY_KIND_ENEMY)]
+        if self.pixel_collisions:
+            hits = [hit for hit in hits if collision.collide_mask(player, hit)]
         for hit in hits:
+            hit.kill()
             if player.take_damage():
-                enemy = Enemy()
-                all_sprites.add(enemy)
-                enemies.add(enemy)
+                self.director.request()
                 if player.lives <= 0:
-                    game_state = GAME_STATE_PLAYER_DEFEATED # 玩家生命歸零，進入失敗狀態
-
-    elif game_state == GAME_STATE_BOSS_FIGHT: # Boss fight logic
-        all_sprites.update() # Update all sprites, including player, boss, bullets
+                    self.game_state = GAME_STATE_PLAYER_DEFEATED # 玩家生命歸零，進入失敗狀態
+        self.mark("collide_player")
+
+    def open_skill_selection(self):
+        self.game_state = GAME_STATE_SKILL_SELECTION
+        self.skill_options_display = self.rng.sample(list(SKILLS.keys()), 3)
+        self.build_skill_buttons()
+        self.next_skill_score += SCORE_FOR_SKILL # Prepare for next skill trigger
+
+    def build_skill_buttons(self):
+        # Create buttons for skill selection
+        self.skill_buttons = []
+        button_width = 400
+        button_height = 50
+        button_start_y = WINDOW_HEIGHT // 2 - 50 # Adjust vertical position
+        for i, skill_name in enumerate(self.skill_options_display):
+            button_y = button_start_y + i * (button_height + 10) # 10 pixels padding
+            button = Button(DARK_GRAY, WINDOW_WIDTH // 2 - button_width // 2, button_y, button_width, button_height, f"{i+1}. {SKILLS[skill_name]}", WHITE)
+            self.skill_buttons.append(button)
+
+    def update_boss_fight(self):
+        self.world.step(self.clock.get_ticks()) # Move and cull every entity in one batch
+        self.boss_bullets.step()
+        self.mark("entities")
+        self.all_sprites.update() # Update all sprites, including player and boss
+        self.mark("update")
+        self.timers.run(self.clock.get_ticks()) # Shots, skill durations and boss patterns that are due
+        self.mark("timers")
 
         # Player bullets hit boss
-        hits = pygame.sprite.groupcollide(boss_group, bullets, False, True) # Boss doesn't get killed, only takes damage
+        collided = collision.collide_mask if self.pixel_collisions else None
+        hits = collision.groupcollide(self.boss_group, self.bullets, False, True, collided) # Boss doesn't get killed, only takes damage
         for boss_hit, hit_bullets in hits.items():
-            for bullet_hit in hit_bullets:
-                if boss_hit.take_damage(1): # Each bullet deals 1 damage
-                    game_state = GAME_STATE_BOSS_DEFEATED # Boss defeated
-                    print("END GAME GG!")
-                    # Clear all remaining sprites for smooth end game transition
-                    for sprite in all_sprites:
-                        sprite.kill()
-                    break
-            if game_state == GAME_STATE_BOSS_DEFEATED: # If boss was defeated, break outer loop
+            # One damage event per frame: the per-kind damage of every hit bullet, summed in one array lookup
+            # (the world ids keep their kind until they are reused, which cannot happen before this lookup)
+            entities = [bullet_hit.entity for bullet_hit in hit_bullets]
+            damage = int(self.bullet_damage[self.world.kind[entities]].sum())
+            if boss_hit.take_damage(damage):
+                self.game_state = GAME_STATE_BOSS_DEFEATED # Boss defeated
+                # Clear all remaining sprites for smooth end game transition
+                for sprite in self.all_sprites:
+                    sprite.kill()
+                self.world.clear()
+                self.boss_bullets.clear()
                 break
+        self.mark("collide_boss")
 
-        # Boss bullets hit player
-        hits = pygame.sprite.spritecollide(player, boss_bullets, True) # Boss bullets get killed
-        for hit in hits:
-            if player.take_damage():
-                if player.lives <= 0:
-                    game_state = GAME_STATE_PLAYER_DEFEATED # 玩家生命歸零，進入失敗狀態
-
-    # Draw
-    screen.fill(BLACK)
-    
-    if game_state in [GAME_STATE_PLAYING, GAME_STATE_BOSS_FIGHT, GAME_STATE_SKILL_SELECTION]:
-        # Draw all sprites except player, wingmen and drones
-        for sprite in all_sprites:
-            if sprite != player and not isinstance(sprite, Wingman) and not isinstance(sprite, Drone):
-                screen.blit(sprite.image, sprite.rect)
-        
-        # Draw player only if visible
-        if player.is_visible:
-            screen.blit(player.image, player.rect)
-
-        # Draw wingmen
-        for wingman in player.wingmen:
-            screen.blit(wingman.image, wingman.rect)
-
-        # Draw drones
-        for drone in player.drones:
-            screen.blit(drone.image, drone.rect)
-        
-        # Display score
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
+        # Boss bullets hit player (those that hit are removed)
+        if self.pixel_collisions:
+            hits = self.boss_bullets.collide_mask(self.player.rect, self.player.mask)
+        else:
+            hits = self.boss_bullets.collide_rect(self.player.rect)
+        if hits and self.player.take_damage():
+            if self.player.lives <= 0:
+                self.game_state = GAME_STATE_PLAYER_DEFEATED # 玩家生命歸零，進入失敗狀態
+        self.mark("collide_player")
+
+    def draw(self, alpha=None):
+        # alpha: how far past the last tick to draw the sprites (None draws them where they are)
+        screen = self.screen
+        font = self.font
+        player = self.player
+        game_state = self.game_state
+        renderer = self.renderer
+        # Only gameplay frames can be drawn partially; menus, end screens, overlays and state changes redraw everything
+        full_redraw = (game_state not in (GAME_STATE_PLAYING, GAME_STATE_BOSS_FIGHT)
+                       or game_state != self.drawn_state or bool(self.overlays))
+        self.drawn_state = game_state
+        renderer.begin(screen, full_redraw)
+        self.mark("clear")
         
-        # Display lives
-        lives_text = font.render(f"Lives: {player.lives}", True, WHITE)
-        screen.blit(lives_text, (10, 50))
-
-        # Display game time
-        time_text = font.render(f"Time: {game_time//1000}s", True, WHITE)
-        screen.blit(time_text, (10, 90))
-
-        # Display enemy count (or boss health)
-        if game_state == GAME_STATE_PLAYING:
-            enemy_count_text = font.render(f"Enemies: {len(enemies)}", True, WHITE)
-            screen.blit(enemy_count_text, (10, 130))
-        elif game_state == GAME_STATE_BOSS_FIGHT and boss:
-            boss_health_text = font.render(f"Boss Health: {boss.health}", True, RED)
-            screen.blit(boss_health_text, (WINDOW_WIDTH // 2 - boss_health_text.get_width() // 2, 10))
-
-        # Display weapon level
-        weapon_text = font.render(f"Weapon Level: {player.weapon_level}", True, YELLOW)
-        screen.blit(weapon_text, (10, 170))
-
-        # Display next upgrade score
-        upgrade_text = font.render(f"Next Upgrade: {next_upgrade_score}", True, YELLOW)
-        screen.blit(upgrade_text, (10, 210))
-
-        # Display next life score
-        life_text = font.render(f"Next Life: {next_life_score}", True, YELLOW)
-        screen.blit(life_text, (10, 250))
-
-        # Display wingman count
-        wingman_count_text = font.render(f"Wingmen: {len(player.wingmen)}", True, YELLOW)
-        screen.blit(wingman_count_text, (10, 290))
-
-        # Display drone count
-        drone_count_text = font.render(f"Drones: {len(player.drones)}", True, YELLOW)
-        screen.blit(drone_count_text, (10, 330))
-
-        # Display skill selection UI
-        if game_state == GAME_STATE_SKILL_SELECTION:
-            # Draw semi-transparent overlay
-            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            screen.blit(overlay, (0, 0))
-
-            title_text = font.render("Choose a Skill:", True, GREEN)
-            title_rect = title_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 150))
-            screen.blit(title_text, title_rect)
-
-            for button in skill_buttons:
-                button.draw(screen, outline=LIGHT_GRAY)
-
-    elif game_state == GAME_STATE_BOSS_DEFEATED:
-        end_game_text = font.render("END GAME GG!", True, GREEN)
-        end_game_rect = end_game_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        screen.blit(end_game_text, end_game_rect)
-
-    elif game_state == GAME_STATE_PLAYER_DEFEATED:
-        game_over_text = font.render("GAME OVER", True, RED)
-        game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-        screen.blit(game_over_text, game_over_rect)
-
+        if game_state in [GAME_STATE_PLAYING, GAME_STATE_BOSS_FIGHT, GAME_STATE_SKILL_SELECTION]:
+            # Draw every render layer back to front, one blits() batch per layer
+            self.layers.draw(screen, renderer.rects if renderer.tracks_rects else None, alpha)
+            self.mark("draw_sprites")
+            
+            # Display score, lives, time, enemy count (or boss health), weapon level and progress
+            # (each field is only re-rendered when its value changes)
+            hud = self.hud
+            hud.set("score", self.score)
+            hud.set("lives", player.lives)
+            hud.set("time", int(self.game_time) // 1000)
+            hud.set("enemies", len(self.enemies), visible=game_state == GAME_STATE_PLAYING)
+            boss_shown = game_state == GAME_STATE_BOSS_FIGHT and self.boss is not None
+            hud.set("boss_health", self.boss.health if self.boss else 0, visible=boss_shown)
+            hud.set("boss_dps", int(self.boss.damage_meter.dps(self.clock.get_ticks())) if boss_shown else 0, visible=boss_shown)
+            details = self.quality.hud_details # Progress lines are the first thing the frame governor drops
+            hud.set("weapon_level", player.weapon_level, visible=details)
+            hud.set("next_upgrade", self.next_upgrade_score, visible=details)
+            hud.set("next_life", self.next_life_score, visible=details)
+            hud.set("wingmen", len(player.wingmen), visible=details)
+            hud.set("drones", len(player.drones), visible=details)
+            hud.set("quality", self.quality_level, visible=self.quality_level > 0)
+            renderer.rects.extend(hud.draw(screen))
+
+            # Display skill selection UI
+            if game_state == GAME_STATE_SKILL_SELECTION:
+                # Draw semi-transparent overlay (built once, reused for every skill pick)
+                if self.skill_overlay is None:
+                    self.skill_overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+                    self.skill_overlay.fill((0, 0, 0, 150))
+                    title_text = font.render("Choose a Skill:", True, GREEN)
+                    title_rect = title_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 150))
+                    self.skill_overlay.blit(title_text, title_rect)
+                screen.blit(self.skill_overlay, (0, 0))
+
+                for button in self.skill_buttons:
+                    button.draw(screen, outline=LIGHT_GRAY)
+
+        elif game_state == GAME_STATE_BOSS_DEFEATED:
+            end_game_text = font.render("END GAME GG!", True, GREEN)
+            end_game_rect = end_game_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+            screen.blit(end_game_text, end_game_rect)
+
+        elif game_state == GAME_STATE_PLAYER_DEFEATED:
+            game_over_text = font.render("GAME OVER", True, RED)
+            game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+            screen.blit(game_over_text, game_over_rect)
+        self.mark("hud")
+
+        if self.overlays:
+            for overlay in self.overlays:
+                overlay.draw(screen)
+            self.mark("overlay")
+
+        renderer.present(screen)
+        self.mark("flip")
+
+
+def read_input(on_key=None):
+    # Turn this frame's pygame events and held keys into a FrameInput; on_key sees every other key press
+    quit_requested = False
+    nudge = 0
+    clicks = []
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            quit_requested = True
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT:
+                nudge -= 1
+            if event.key == pygame.K_RIGHT:
+                nudge += 1
+            if on_key is not None:
+                on_key(event.key)
+        elif event.type == pygame.MOUSEBUTTONDOWN: # Handle mouse clicks
+            clicks.append(event.pos)
+    keys = pygame.key.get_pressed()
+    return FrameInput(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], nudge, tuple(clicks), None, quit_requested)
+
+
+def freeze_heap():
+    # Call once setup is done. Everything alive now (modules, assets, the game state) is moved out of the
+    # garbage collector's reach, so the full collections triggered by the thousands of short-lived draw
+    # tuples per frame stay cheap instead of rescanning the whole heap (~20 ms hitches with 2,000+ bullets).
+    gc.collect()
+    gc.freeze()
+
+
+def show_loading_screen(screen, loader):
+    # Animates a progress bar and spinner while the loader thread decodes the assets; False if the window was closed
+    font = pygame.font.Font(None, 36)
+    title = font.render("Loading...", True, WHITE)
+    title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 40))
+    bar = pygame.Rect(0, 0, 400, 20)
+    bar.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+    clock = pygame.time.Clock()
+    frame = 0
+    while True:
+        progress = loader.poll()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        screen.fill(BLACK)
+        screen.blit(title, title_rect)
+        pygame.draw.rect(screen, LIGHT_GRAY, bar, 2)
+        pygame.draw.rect(screen, GREEN, (bar.x + 2, bar.y + 2, int((bar.width - 4) * progress), bar.height - 4))
+        for i in range(8):
+            angle = frame * 0.1 + i * math.pi / 4
+            shade = 60 + 195 * i // 7
+            pygame.draw.circle(screen, (shade, shade, shade), (int(WINDOW_WIDTH // 2 + 20 * math.cos(angle)), int(bar.bottom + 50 + 20 * math.sin(angle))), 4)
+        pygame.display.flip()
+        if loader.done:
+            return True
+        frame += 1
+        clock.tick(FPS)
+
+
+PROFILER_TOGGLE_KEY = pygame.K_F3 # Show / hide the frame profiler graph (profiling runs only while shown)
+PROFILER_DUMP_KEY = pygame.K_F4 # Write the profiler's ring buffer to a CSV file
+REWIND_KEY = pygame.K_BACKSPACE # Practice mode: go back REWIND_STEP_SECONDS
+REWIND_STEP_SECONDS = 2
+CHECKPOINT_SAVE_KEY = pygame.K_F5 # Practice mode: keep a snapshot of the current state
+CHECKPOINT_LOAD_KEY = pygame.K_F9 # Practice mode: go back to that snapshot
+
+
+def startup_report(marks):
+    # marks: (phase, perf_counter when it ended), in order, measured from LAUNCH_TIME
+    phases = []
+    previous = LAUNCH_TIME
+    for phase, end in marks:
+        phases.append(f"{phase} {(end - previous) * 1000:.0f}")
+        previous = end
+    return f"Time to first frame: {(marks[-1][1] - LAUNCH_TIME) * 1000:.0f} ms ({', '.join(phases)} ms)"
+
+
+def toggle_profiler(game, profiler):
+    if game.phase_timer is None:
+        game.set_phase_timer(profiler)
+        game.overlays.append(profiler)
+    else:
+        game.set_phase_timer(None)
+        game.overlays.remove(profiler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bullet Hell Shooter")
+    parser.add_argument("--dirty-rects", action="store_true", help="Redraw and update only the changed parts of the window")
+    parser.add_argument("--profile", action="store_true", help="Start with the frame profiler shown (toggle with F3)")
+    parser.add_argument("--uncapped", action="store_true", help="Render as fast as possible (the simulation stays at FPS ticks per second)")
+    parser.add_argument("--vsync", action="store_true", help="Render at the display refresh rate")
+    parser.add_argument("--no-interpolation", action="store_true", help="Draw sprites at their last simulated position")
+    parser.add_argument("--seed", type=int, help="Game seed (random by default)")
+    parser.add_argument("--record", metavar="PATH", help="Record the seed and every tick's input for replay.py")
+    parser.add_argument("--practice", action="store_true", help="Practice mode: Backspace rewinds, F5 / F9 save and load a checkpoint")
+    parser.add_argument("--no-governor", action="store_true", help="Always run at full quality, however long frames take")
+    args = parser.parse_args()
+    if args.practice and args.record:
+        parser.error("--practice cannot be recorded (rewinding breaks the replay)")
+
+    # Start-up: window first, then the assets decode on a worker thread behind the loading screen
+    startup = [("imports", time.perf_counter())]
+    init_pygame()
+    screen = open_window(args.vsync)
     pygame.display.flip()
-
-pygame.quit() 
\ No newline at end of file
+    startup.append(("window", time.perf_counter()))
+    if not show_loading_screen(screen, AssetLoader(assets)):
+        pygame.quit()
+        return
+    startup.append(("assets", time.perf_counter()))
+    game = Game(seed=args.seed, dirty_rects=args.dirty_rects, interpolate=not args.no_interpolation, vsync=args.vsync)
+    if args.record:
+        game.recorder = InputRecorder(game.seed)
+    if args.practice:
+        game.rewind = RewindBuffer(fps=FPS)
+    checkpoint = None
+    governor = None
+    if not args.no_governor:
+        # Recorded and practice games must simulate exactly as they would at full quality: cosmetic levels only
+        deterministic = args.record or args.practice
+        governor = FrameGovernor(FRAME_TIME, COSMETIC_QUALITY_LEVEL if deterministic else len(QUALITY_LEVELS) - 1)
+    freeze_heap()
+    profiler = FrameProfiler()
+    if args.profile:
+        toggle_profiler(game, profiler)
+
+    def on_key(key):
+        nonlocal checkpoint
+        if key == PROFILER_TOGGLE_KEY:
+            toggle_profiler(game, profiler)
+        elif key == PROFILER_DUMP_KEY and profiler.count:
+            print(f"Profile written to {profiler.dump(time.strftime('profile-%Y%m%d-%H%M%S.csv'))}")
+        elif game.rewind is not None:
+            if key == REWIND_KEY:
+                game.rewind.rewind(game, REWIND_STEP_SECONDS)
+            elif key == CHECKPOINT_SAVE_KEY:
+                checkpoint = capture(game)
+            elif key == CHECKPOINT_LOAD_KEY and checkpoint is not None:
+                restore(game, checkpoint)
+
+    # Game main loop: the render rate only decides how often we draw, game speed comes from the fixed timestep
+    clock = pygame.time.Clock()
+    render_fps = 0 if args.uncapped or args.vsync else FPS
+    startup.append(("setup", time.perf_counter()))
+    last = time.perf_counter()
+    while game.running:
+        clock.tick(render_fps)
+        now = time.perf_counter()
+        game.run_frame(read_input(on_key), (now - last) * 1000)
+        last = now
+        if governor is not None:
+            level = governor.record((time.perf_counter() - now) * 1000) # Work time only, not the wait in clock.tick
+            if level is not None:
+                game.set_quality(level)
+        if startup is not None:
+            startup.append(("first frame", time.perf_counter()))
+            print(startup_report(startup))
+            startup = None
+
+    if args.record:
+        print(f"Replay written to {game.recorder.save(args.record, state_digest(game))}")
+    print(game.assets.report())
+    if governor is not None:
+        print("Frame governor: " + ", ".join(f"{name} {value:.2f}" if isinstance(value, float) else f"{name} {value}"
+                                             for name, value in governor.metrics().items()))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# Ship the baked sprite atlas (python bake_assets.py) instead of the full-size PNGs when it exists
+if os.path.exists(os.path.join(SPECPATH, 'atlas.png')):
+    datas = [('atlas.png', '.'), ('atlas.json', '.')]
+else:
+    datas = [('我方飛船.png', '.'), ('敵方飛船.png', '.'), ('宇宙.png', '.'), ('僚機.png', '.'), ('無人機.png', '.'), ('彈球.png', '.'), ('boss.png', '.')]
 
 a = Analysis(
     ['game.py'],
     pathex=[],
     binaries=[],
-    datas=[('我方飛船.png', '.'), ('敵方飛船.png', '.'), ('宇宙.png', '.'), ('僚機.png', '.'), ('無人機.png', '.'), ('彈球.png', '.'), ('boss.png', '.')],
+    datas=datas,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,71 @@
+from collections import deque
+
+# Frame-budget governor: watches the work time of recent frames and steps the game's quality level
+# down while they run close to the frame budget, and back up once there is clear headroom again.
+# What a level turns off is the game's business (QUALITY_LEVELS in game.py); the governor only picks
+# the index. Dropping is quick and coming back is slow, so a level does not flap around the threshold.
+
+GOVERNOR_WINDOW = 30 # Recent frames looked at
+GOVERNOR_PERCENTILE = 0.9 # Frame time compared with the budget: this quantile of the window
+DEGRADE_AT = 0.9 # Drop a level once recent frames use more than this fraction of the budget
+RESTORE_AT = 0.5 # Raise it again once they use less than this
+DEGRADE_COOLDOWN = 30 # Frames after a change before dropping further (let the new level show its effect)
+RESTORE_COOLDOWN = 180 # Frames after a change before raising quality again
+
+
+class FrameGovernor():
+    def __init__(self, budget_ms, max_level, window=GOVERNOR_WINDOW, degrade_at=DEGRADE_AT, restore_at=RESTORE_AT,
+                 degrade_cooldown=DEGRADE_COOLDOWN, restore_cooldown=RESTORE_COOLDOWN, frame_ms=None):
+        self.budget_ms = budget_ms
+        self.frame_ms = frame_ms if frame_ms is not None else budget_ms # Nominal frame length, for changes_per_minute
+        self.max_level = max_level
+        self.degrade_ms = budget_ms * degrade_at
+        self.restore_ms = budget_ms * restore_at
+        self.degrade_cooldown = degrade_cooldown
+        self.restore_cooldown = restore_cooldown
+        self.times = deque(maxlen=window) # Work time of the recent frames (ms)
+        self.level = 0 # 0 is full quality
+        self.since_change = 0
+        # Metrics
+        self.frames = 0
+        self.frames_at_level = [0] * (max_level + 1)
+        self.degrades = 0
+        self.restores = 0
+
+    def load(self):
+        times = sorted(self.times)
+        return times[int(GOVERNOR_PERCENTILE * (len(times) - 1))] if times else 0
+
+    def record(self, frame_ms):
+        # Feed one frame's work time (without the wait for the next frame); returns the new level when it changed
+        self.times.append(frame_ms)
+        self.frames += 1
+        self.frames_at_level[self.level] += 1
+        self.since_change += 1
+        if len(self.times) < self.times.maxlen:
+            return None
+        load = self.load()
+        if load > self.degrade_ms and self.level < self.max_level and self.since_change >= self.degrade_cooldown:
+            self.level += 1
+            self.degrades += 1
+        elif load < self.restore_ms and self.level > 0 and self.since_change >= self.restore_cooldown:
+            self.level -= 1
+            self.restores += 1
+        else:
+            return None
+        self.since_change = 0
+        self.times.clear() # Judge the new level on its own frames
+        return self.level
+
+    def metrics(self):
+        minutes = self.frames * self.frame_ms / 60000 # Nominal play time
+        changes = self.degrades + self.restores
+        return {
+            "level": self.level,
+            "load_ms": self.load(),
+            "budget_ms": self.budget_ms,
+            "degrades": self.degrades,
+            "restores": self.restores,
+            "changes_per_minute": changes / minutes if minutes else 0,
+            "frames_at_level": list(self.frames_at_level),
+        }
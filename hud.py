@@ -0,0 +1,85 @@
+import pygame
+
+# HUD widgets that cache their rendered text.
+# font.render only runs when a field's value changes; with composite=True the visible fields are
+# also merged into one surface that is blitted once per frame and rebuilt only after a change.
+
+
+class HudField():
+    def __init__(self, font, template, color, pos, centered=False):
+        self.font = font
+        self.template = template # e.g. "Score: {}"
+        self.color = color
+        self.pos = pos # Top-left, or (center x, top) when centered
+        self.centered = centered
+        self.value = None
+        self.surface = None
+        self.rect = pygame.Rect(pos, (0, 0))
+        self.visible = True
+        self.render_count = 0
+
+    def set(self, value):
+        # Returns True when the text had to be re-rendered
+        if self.surface is not None and value == self.value:
+            return False
+        self.value = value
+        self.surface = self.font.render(self.template.format(value), True, self.color)
+        self.render_count += 1
+        self.rect = self.surface.get_rect()
+        if self.centered:
+            self.rect.midtop = self.pos
+        else:
+            self.rect.topleft = self.pos
+        return True
+
+
+class Hud():
+    def __init__(self, font, composite=False):
+        self.font = font
+        self.composite = composite
+        self.fields = {} # name -> HudField, drawn in insertion order
+        self.changed = True # Something moved, appeared or was re-rendered since the last draw
+        self.surface = None # Composited HUD (composite mode)
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+    def add(self, name, template, color, pos, centered=False):
+        self.fields[name] = HudField(self.font, template, color, pos, centered)
+
+    def set(self, name, value, visible=True):
+        field = self.fields[name]
+        if field.visible != visible:
+            field.visible = visible
+            self.changed = True
+        if visible and field.set(value):
+            self.changed = True
+
+    def dirty_rects(self):
+        # Screen areas covered by the visible fields
+        return [field.rect for field in self.fields.values() if field.visible and field.surface is not None]
+
+    def rebuild(self):
+        rects = self.dirty_rects()
+        self.rect = rects[0].unionall(rects[1:]) if rects else pygame.Rect(0, 0, 0, 0)
+        if self.surface is None or self.surface.get_width() < self.rect.width or self.surface.get_height() < self.rect.height:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        for field in self.fields.values():
+            if field.visible and field.surface is not None:
+                self.surface.blit(field.surface, field.rect.move(-self.rect.x, -self.rect.y))
+
+    def draw(self, screen):
+        # Returns the screen areas drawn
+        if not self.composite:
+            drawn = []
+            for field in self.fields.values():
+                if field.visible and field.surface is not None:
+                    drawn.append(screen.blit(field.surface, field.rect))
+        else:
+            if self.changed:
+                self.rebuild()
+            drawn = [screen.blit(self.surface, self.rect, pygame.Rect((0, 0), self.rect.size))]
+        self.changed = False
+        return drawn
+
+    def render_count(self):
+        return sum(field.render_count for field in self.fields.values())
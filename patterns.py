@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+# Boss bullet patterns. A pattern is plain data (see BOSS_PHASES in game.py); PatternEmitter builds its
+# velocity table once and fires every volley as one BulletField.emit call. Angles follow the bullet
+# engine: 0 is straight down, velocity = speed * (sin(angle), cos(angle)).
+#
+#   {"type": "volley", "offsets": [...], "speed": s, "interval": ms}           straight down, one bullet per x offset
+#   {"type": "ring", "count": n, "speed": s, "spin": rad, "interval": ms}       n bullets all around, turned by spin each volley (spin makes spirals)
+#   {"type": "fan", "count": n, "spread": rad, "speed": s, "interval": ms}     n bullets over spread, centred on the player
+
+
+def velocity_table(angles, speed):
+    angles = np.asarray(angles, dtype=float)
+    return np.column_stack((speed * np.sin(angles), speed * np.cos(angles)))
+
+
+def rotated(table, angle):
+    if not angle:
+        return table
+    c = math.cos(angle)
+    s = math.sin(angle)
+    x = table[:, 0]
+    y = table[:, 1]
+    return np.column_stack((x * c + y * s, y * c - x * s))
+
+
+class PatternEmitter():
+    def __init__(self, pattern, start_time):
+        self.pattern = pattern
+        self.type = pattern["type"]
+        self.interval = pattern["interval"]
+        self.last_fire = start_time
+        self.volleys = 0
+        self.offsets = 0
+        if self.type == "volley":
+            self.offsets = np.asarray(pattern["offsets"], dtype=float)
+            self.table = velocity_table(np.zeros(len(self.offsets)), pattern["speed"])
+        elif self.type == "ring":
+            count = pattern["count"]
+            self.table = velocity_table(np.arange(count) * (2 * math.pi / count), pattern["speed"])
+        elif self.type == "fan":
+            count = pattern["count"]
+            spread = pattern["spread"]
+            self.table = velocity_table(np.linspace(-spread / 2, spread / 2, count), pattern["speed"])
+        else:
+            raise ValueError(f"Unknown bullet pattern type: {self.type}")
+
+    def fire(self, field, x, y, target):
+        vel = self.table
+        if self.type == "ring":
+            vel = rotated(vel, self.volleys * self.pattern.get("spin", 0))
+        elif self.type == "fan":
+            vel = rotated(vel, math.atan2(target[0] - x, target[1] - y)) # Aim the middle of the fan at the target
+        field.emit(x + self.offsets, y, vel)
+        self.volleys += 1
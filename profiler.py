@@ -0,0 +1,114 @@
+import csv
+import json
+import time
+from array import array
+
+import pygame
+
+# Per-phase frame profiler. Plugged into Game.set_phase_timer only while enabled, so a disabled
+# profiler costs nothing beyond the no-op phase marks in Game.step.
+
+PROFILER_CAPACITY = 600 # Frames kept in the ring buffer (10 seconds at 60 FPS)
+FRAME_BUDGET_MS = 1000 / 60
+GRAPH_WIDTH = 300 # One pixel column per frame
+GRAPH_HEIGHT = 100
+GRAPH_SCALE_MS = 2 * FRAME_BUDGET_MS # Height of the graph in ms
+LEGEND_REFRESH_FRAMES = 30 # The legend text is re-rendered twice a second, not every frame
+PHASE_COLORS = [(230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48), (145, 30, 180),
+                (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 212), (0, 128, 128), (170, 110, 40)]
+
+
+class FrameProfiler():
+    def __init__(self, capacity=PROFILER_CAPACITY):
+        self.capacity = capacity
+        self.phases = [] # Phase names, in the order they were first seen
+        self.columns = {} # phase -> ring buffer of ms per frame
+        self.totals = array("d", bytes(8 * capacity)) # Whole step() time per frame (ms)
+        self.head = 0 # Slot written by the current frame
+        self.count = 0
+        self.frame_start = 0
+        self.last = 0
+        self.font = None
+        self.background = None
+        self.legend = [] # Rendered legend lines, refreshed every LEGEND_REFRESH_FRAMES
+        self.legend_age = LEGEND_REFRESH_FRAMES
+
+    def start_frame(self):
+        head = self.head
+        for column in self.columns.values():
+            column[head] = 0
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        column = self.columns.get(phase)
+        if column is None:
+            column = self.columns[phase] = array("d", bytes(8 * self.capacity))
+            self.phases.append(phase)
+        column[self.head] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        self.totals[self.head] = (time.perf_counter() - self.frame_start) * 1000
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def slots(self):
+        # Ring buffer slots from oldest to newest
+        start = (self.head - self.count) % self.capacity
+        return [(start + i) % self.capacity for i in range(self.count)]
+
+    def rows(self):
+        for slot in self.slots():
+            yield [round(self.totals[slot], 4)] + [round(self.columns[phase][slot], 4) for phase in self.phases]
+
+    def dump(self, path):
+        # Write the buffered frames to CSV, or JSON when path ends in .json
+        header = ["total"] + self.phases
+        if path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"unit": "ms", "columns": header, "frames": list(self.rows())}, f)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(self.rows())
+        return path
+
+    def draw(self, screen):
+        # Stacked per-phase bars for the most recent frames, with a line at the 60 FPS budget
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+            self.background = pygame.Surface((GRAPH_WIDTH, GRAPH_HEIGHT), pygame.SRCALPHA)
+            self.background.fill((0, 0, 0, 180))
+        x0 = screen.get_width() - GRAPH_WIDTH - 10
+        y0 = screen.get_height() - GRAPH_HEIGHT - 10
+        screen.blit(self.background, (x0, y0))
+
+        scale = GRAPH_HEIGHT / GRAPH_SCALE_MS
+        slots = self.slots()[-GRAPH_WIDTH:]
+        bottom = y0 + GRAPH_HEIGHT
+        for x, slot in enumerate(slots, x0):
+            y = bottom
+            for i, phase in enumerate(self.phases):
+                height = self.columns[phase][slot] * scale
+                if height >= 1:
+                    top = max(y0, y - height)
+                    pygame.draw.line(screen, PHASE_COLORS[i % len(PHASE_COLORS)], (x, y), (x, top))
+                    y = top
+        budget_y = bottom - FRAME_BUDGET_MS * scale
+        pygame.draw.line(screen, (255, 255, 255), (x0, budget_y), (x0 + GRAPH_WIDTH, budget_y))
+
+        # Legend: mean ms per phase over the visible frames
+        self.legend_age += 1
+        if slots and self.legend_age >= LEGEND_REFRESH_FRAMES:
+            self.legend_age = 0
+            average = sum(self.totals[slot] for slot in slots) / len(slots)
+            self.legend = [self.font.render(f"frame {average:.2f} ms", True, (255, 255, 255))]
+            for i, phase in enumerate(self.phases):
+                mean = sum(self.columns[phase][slot] for slot in slots) / len(slots)
+                self.legend.append(self.font.render(f"{phase} {mean:.2f} ms", True, PHASE_COLORS[i % len(PHASE_COLORS)]))
+        y = y0 - 14 * len(self.legend) - 2
+        for line in self.legend:
+            screen.blit(line, (x0, y))
+            y += 14
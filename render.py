@@ -0,0 +1,139 @@
+import pygame
+
+from timestep import interpolated_position
+
+# Frame presenters. Game.draw calls begin() before drawing, appends the rect of everything it draws
+# to renderer.rects, and calls present() at the end.
+
+DIRTY_AREA_LIMIT = 0.5 # Dirty rects covering more than this share of the screen fall back to a full redraw
+DIRTY_RECT_LIMIT = 150 # Past this many rects the per-rect clearing costs more than one full fill
+
+
+class FullRedraw():
+    # Default mode: clear the whole window and flip the whole framebuffer every frame
+    def __init__(self, background):
+        self.background = background
+        self.rects = []
+        self.tracks_rects = False # Nothing reads the drawn rects, so batched draws can skip returning them
+
+    def begin(self, screen, full=False):
+        screen.fill(self.background)
+        self.rects.clear()
+
+    def present(self, screen):
+        pygame.display.flip()
+
+
+class DirtyRectRenderer():
+    # Clears only the areas drawn last frame and pushes only the changed areas with display.update(rects).
+    # Everything visible is redrawn every frame, so whatever lies outside last frame's and this
+    # frame's rects is still background and does not need to be touched.
+    def __init__(self, background, area_limit=DIRTY_AREA_LIMIT, rect_limit=DIRTY_RECT_LIMIT):
+        self.background = background
+        self.area_limit = area_limit
+        self.rect_limit = rect_limit
+        self.background_surface = None # Screen-sized background, blitted back over the old rects
+        self.tracks_rects = True
+        self.rects = [] # Drawn this frame
+        self.previous = [] # Drawn last frame, cleared at the start of this one
+        self.full = True # The first frame is always a full redraw
+        self.full_redraws = 0
+        self.partial_redraws = 0
+
+    def too_large(self, screen, rects):
+        if len(rects) > self.rect_limit:
+            return True
+        area = sum(rect.width * rect.height for rect in rects)
+        return area > self.area_limit * screen.get_width() * screen.get_height()
+
+    def begin(self, screen, full=False):
+        self.full = self.full or full or self.too_large(screen, self.previous)
+        if self.full:
+            screen.fill(self.background)
+        else:
+            if self.background_surface is None or self.background_surface.get_size() != screen.get_size():
+                self.background_surface = pygame.Surface(screen.get_size()).convert(screen)
+                self.background_surface.fill(self.background)
+            # One batched call; per-rect Surface.fill is several times slower on the display surface
+            background = self.background_surface
+            screen.blits([(background, rect, rect) for rect in self.previous], doreturn=False)
+        self.rects = []
+
+    def present(self, screen):
+        if not self.full:
+            dirty = self.previous + self.rects
+            if self.too_large(screen, dirty):
+                self.full = True # Too much changed: one flip is cheaper than many small updates
+        if self.full:
+            pygame.display.flip()
+            self.full_redraws += 1
+        else:
+            pygame.display.update(dirty)
+            self.partial_redraws += 1
+        self.previous = self.rects
+        self.full = False
+
+
+class RenderLayer(pygame.sprite.Group):
+    # One z level. Being a Group, a sprite leaves its layer on kill() like it leaves every other group
+    def __init__(self, z):
+        super().__init__()
+        self.z = z
+        self.visible = True
+        self.sources = [] # Sprite-less drawables (e.g. BulletField) with blit_sequence(alpha)
+
+
+class RenderLayers():
+    # Sprites are registered once, at creation, to the layer named by their class's `layer` attribute.
+    # draw() walks the layers back to front and blits each one with a single Surface.blits call,
+    # so drawing needs no per-sprite type checks.
+    def __init__(self):
+        self.layers = {} # z -> RenderLayer
+        self.order = [] # Layers sorted back to front
+
+    def layer(self, z):
+        layer = self.layers.get(z)
+        if layer is None:
+            layer = self.layers[z] = RenderLayer(z)
+            self.order = sorted(self.layers.values(), key=lambda layer: layer.z)
+        return layer
+
+    def add(self, sprite):
+        self.layer(sprite.layer).add(sprite)
+
+    def attach(self, z, source):
+        # source.blit_sequence(alpha) returns (image, position) pairs drawn in the same batch as the layer's sprites
+        self.layer(z).sources.append(source)
+
+    def set_visible(self, z, visible):
+        self.layer(z).visible = visible
+
+    def is_visible(self, z):
+        return self.layer(z).visible
+
+    def empty(self):
+        # Drop every sprite, keeping the layers' sources and visibility (snapshot restore re-adds them)
+        for layer in self.order:
+            layer.empty()
+
+    def snapshot(self):
+        # Remember where every sprite was before the next simulation tick (render interpolation)
+        for layer in self.order:
+            for sprite in layer:
+                sprite.prev_topleft = sprite.rect.topleft
+
+    def draw(self, screen, rects=None, alpha=None):
+        # Appends the screen areas drawn to rects when given (dirty-rect mode). With alpha, every sprite
+        # is drawn that far between its snapshot position and its current one.
+        blits = screen.blits
+        for layer in self.order:
+            if layer.visible and (layer or layer.sources):
+                if alpha is None:
+                    batch = [(sprite.image, sprite.rect) for sprite in layer]
+                else:
+                    batch = [(sprite.image, interpolated_position(sprite, alpha)) for sprite in layer]
+                for source in layer.sources:
+                    batch.extend(source.blit_sequence(alpha))
+                drawn = blits(batch, doreturn=rects is not None)
+                if rects is not None:
+                    rects.extend(drawn)
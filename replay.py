@@ -0,0 +1,142 @@
+# Input recording and deterministic replay.
+# A replay file holds the game seed and the FrameInput of every simulation tick, which is all a Game
+# needs to play the same session again (all randomness goes through game.rng, all timers through the
+# sim clock). A digest of the final state is stored too, so a replay can tell whether it diverged.
+#
+#   python game.py --record session.replay [--seed N]
+#   python replay.py session.replay [--realtime] [--render] [--profile out.csv]
+#
+# File layout: header (magic, version, seed, ticks, final state digest) followed by the zlib-compressed
+# tick records. A record is one flags byte, then only the fields its flags announce; held arrow keys
+# repeat for long stretches, so a 30-minute session compresses to a few KB.
+import argparse
+import hashlib
+import struct
+import time
+import zlib
+
+REPLAY_MAGIC = b"BHRP"
+REPLAY_VERSION = 3 # 3: passive spawns keep their cadence while inactive, so old inputs play out differently
+HEADER = struct.Struct("<4sHQI20s") # magic, version, seed, ticks, sha1 digest of the final state
+
+FLAG_LEFT = 1
+FLAG_RIGHT = 2
+FLAG_NUDGE = 4 # int8 follows
+FLAG_CLICKS = 8 # uint8 count, then count x (uint16 x, uint16 y)
+FLAG_SKILL = 16 # uint8 index follows
+FLAG_QUIT = 32
+
+
+def state_digest(game):
+    # Changes as soon as two runs disagree on anything random or scored
+    state = (game.frame, game.score, game.player.lives, game.game_state, len(game.enemies), game.rng.getstate())
+    return hashlib.sha1(repr(state).encode()).digest()
+
+
+class InputRecorder():
+    def __init__(self, seed):
+        self.seed = seed
+        self.ticks = 0
+        self.data = bytearray()
+
+    def record(self, inputs):
+        flags = (FLAG_LEFT if inputs.left else 0) | (FLAG_RIGHT if inputs.right else 0)
+        extra = b""
+        if inputs.nudge:
+            flags |= FLAG_NUDGE
+            extra += struct.pack("<b", max(-128, min(127, inputs.nudge)))
+        if inputs.clicks:
+            flags |= FLAG_CLICKS
+            clicks = inputs.clicks[:255]
+            extra += struct.pack("<B", len(clicks)) + b"".join(struct.pack("<HH", x, y) for x, y in clicks)
+        if inputs.skill is not None:
+            flags |= FLAG_SKILL
+            extra += struct.pack("<B", inputs.skill)
+        if inputs.quit:
+            flags |= FLAG_QUIT
+        self.data.append(flags)
+        self.data += extra
+        self.ticks += 1
+
+    def save(self, path, digest=bytes(20)):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.ticks, digest))
+            f.write(zlib.compress(bytes(self.data), 9))
+        return path
+
+
+def decode_inputs(data, ticks):
+    from game import FrameInput
+    inputs = []
+    offset = 0
+    for i in range(ticks):
+        flags = data[offset]
+        offset += 1
+        nudge = 0
+        clicks = ()
+        skill = None
+        if flags & FLAG_NUDGE:
+            nudge = struct.unpack_from("<b", data, offset)[0]
+            offset += 1
+        if flags & FLAG_CLICKS:
+            count = data[offset]
+            offset += 1
+            clicks = tuple(struct.unpack_from("<HH", data, offset + 4 * j) for j in range(count))
+            offset += 4 * count
+        if flags & FLAG_SKILL:
+            skill = data[offset]
+            offset += 1
+        inputs.append(FrameInput(bool(flags & FLAG_LEFT), bool(flags & FLAG_RIGHT), nudge, clicks, skill, bool(flags & FLAG_QUIT)))
+    return inputs
+
+
+def load_replay(path):
+    # Returns (seed, [FrameInput per tick], final state digest)
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        body = f.read()
+    magic, version, seed, ticks, digest = HEADER.unpack(header)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay file")
+    return seed, decode_inputs(zlib.decompress(body), ticks), digest
+
+
+def play(path, realtime=False, render=False, phase_timer=None):
+    # Runs the recorded session; returns (game, whether the final state matches the recording)
+    import pygame
+    from game import Game, FPS, freeze_heap
+    seed, inputs, digest = load_replay(path)
+    game = Game(seed=seed, headless=not realtime, render=render or realtime)
+    freeze_heap()
+    game.set_phase_timer(phase_timer)
+    clock = pygame.time.Clock()
+    for tick_inputs in inputs:
+        if realtime:
+            clock.tick(FPS)
+            pygame.event.pump() # Keep the window responsive; live input is ignored
+        game.step(tick_inputs)
+    return game, state_digest(game) == digest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    parser.add_argument("path")
+    parser.add_argument("--realtime", action="store_true", help="Play in a window at normal speed (default: headless, as fast as possible)")
+    parser.add_argument("--render", action="store_true", help="Also draw every frame when replaying headless")
+    parser.add_argument("--profile", help="Write the per-phase frame times to this CSV/JSON file")
+    args = parser.parse_args()
+
+    from game import FRAME_TIME
+    from profiler import FrameProfiler
+    seed, inputs, digest = load_replay(args.path)
+    profiler = FrameProfiler(capacity=len(inputs)) if args.profile else None
+    start = time.perf_counter()
+    game, matches = play(args.path, args.realtime, args.render, profiler)
+    elapsed = time.perf_counter() - start
+    game_seconds = game.frame * FRAME_TIME / 1000
+    print(f"Replayed {game.frame} ticks ({game_seconds:.0f}s of game time) in {elapsed:.2f}s "
+          f"({game_seconds / elapsed:.0f}x real time), score {game.score}")
+    print("Final state matches the recording" if matches else "Final state DIFFERS from the recording")
+    if profiler is not None:
+        print(f"Profile written to {profiler.dump(args.profile)}")
+    raise SystemExit(0 if matches else 1)
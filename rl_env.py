@@ -0,0 +1,275 @@
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+import game
+from game import (Game, FrameInput, ENTITY_KIND_ENEMY, WINDOW_WIDTH, WINDOW_HEIGHT, MAX_WEAPON_LEVEL,
+                  GAME_STATE_SKILL_SELECTION, GAME_STATE_BOSS_FIGHT, GAME_STATE_BOSS_DEFEATED, GAME_STATE_PLAYER_DEFEATED)
+
+# Gym-style training environments. The game runs headless with drawing off, one simulation tick per step
+# (or frame_skip ticks with the action held), and observations are read straight from the game state.
+#
+#   env = ShooterEnv(seed=0)
+#   obs, info = env.reset()
+#   obs, reward, terminated, truncated, info = env.step(action)
+#
+#   envs = VectorShooterEnv(16, seed=0)
+#   obs, infos = envs.reset()                  # obs: (16, OBSERVATION_SIZE) float32
+#   obs, rewards, terminated, truncated, infos = envs.step(actions)
+#
+#   envs = ProcessVectorShooterEnv(64, workers=8, seed=0)   # same interface, games stepped in worker processes
+#   ...
+#   envs.close()
+#
+# One game steps at roughly 2-4k steps/s per core, so VectorShooterEnv (one process) stays in that range;
+# ProcessVectorShooterEnv adds about that much per worker up to the number of cores. Both give the same
+# episodes for the same seed.
+# Actions are ints in range(ACTION_COUNT): move + 3 * skill, move 0 = stay, 1 = left, 2 = right, skill 0 =
+# none, 1..3 = pick that option when the skill selection is open. Reward is the score gained.
+#
+# Observation (float32, positions relative to the player's center, scaled by the window size):
+#   [0:8]    player x, y, lives, weapon level, invincible, skill selection open, boss fight, boss health
+#   then     NEAREST_ENEMIES x (present, dx, dy, vx, vy), nearest first
+#   then     NEAREST_BOSS_BULLETS x (present, dx, dy, vx, vy), nearest first
+
+MOVES = ((False, False), (True, False), (False, True)) # stay, left, right
+ACTION_COUNT = len(MOVES) * 4
+NEAREST_ENEMIES = 8
+NEAREST_BOSS_BULLETS = 16
+PLAYER_FEATURES = 8
+OBJECT_FEATURES = 5
+OBSERVATION_SIZE = PLAYER_FEATURES + OBJECT_FEATURES * (NEAREST_ENEMIES + NEAREST_BOSS_BULLETS)
+VELOCITY_SCALE = 10 # Pixels per tick mapped to 1.0
+MAX_EPISODE_STEPS = 30 * 60 * 60 # 30 minutes of game time at frame_skip 1
+
+# Pre-built inputs, one per action
+ACTION_INPUTS = [FrameInput(left=left, right=right, skill=skill - 1 if skill else None)
+                 for skill in range(4) for left, right in MOVES]
+
+
+def write_nearest(out, centers, vel, origin, count):
+    # Fills out (count x OBJECT_FEATURES) with the count objects closest to origin; missing ones stay zero
+    out[:] = 0
+    if not len(centers):
+        return
+    rel = centers - origin
+    d2 = rel[:, 0] ** 2 + rel[:, 1] ** 2
+    if len(d2) > count:
+        nearest = np.argpartition(d2, count)[:count]
+        nearest = nearest[np.argsort(d2[nearest])]
+    else:
+        nearest = np.argsort(d2)
+    n = len(nearest)
+    out[:n, 0] = 1
+    out[:n, 1] = rel[nearest, 0] / WINDOW_WIDTH
+    out[:n, 2] = rel[nearest, 1] / WINDOW_HEIGHT
+    out[:n, 3:5] = vel[nearest] / VELOCITY_SCALE
+
+
+class ShooterEnv():
+    def __init__(self, seed=None, frame_skip=1, max_steps=MAX_EPISODE_STEPS):
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.seeds = random.Random(seed) # Seeds for the episodes reset() starts without one
+        self.game = None
+        self.steps = 0
+        self.observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+        split = PLAYER_FEATURES + OBJECT_FEATURES * NEAREST_ENEMIES
+        self.enemy_features = self.observation[PLAYER_FEATURES:split].reshape(NEAREST_ENEMIES, OBJECT_FEATURES)
+        self.bullet_features = self.observation[split:].reshape(NEAREST_BOSS_BULLETS, OBJECT_FEATURES)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.seeds.randrange(1 << 32)
+        if self.game is None:
+            self.game = Game(seed=seed, headless=True, render=False)
+        else:
+            self.game.reset(seed) # Keeps the window, assets and entity arrays of the last episode
+        self.steps = 0
+        return self.observe(), self.info()
+
+    def step(self, action):
+        g = self.game
+        inputs = ACTION_INPUTS[action]
+        score = g.score
+        for i in range(self.frame_skip):
+            g.simulate(inputs)
+            if g.game_state == GAME_STATE_PLAYER_DEFEATED or g.game_state == GAME_STATE_BOSS_DEFEATED:
+                break
+        self.steps += 1
+        terminated = g.game_state == GAME_STATE_PLAYER_DEFEATED or g.game_state == GAME_STATE_BOSS_DEFEATED
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.observe(), float(g.score - score), terminated, truncated, self.info()
+
+    def observe(self):
+        g = self.game
+        player = g.player
+        origin = player.rect.center
+        obs = self.observation
+        obs[0] = origin[0] / WINDOW_WIDTH
+        obs[1] = origin[1] / WINDOW_HEIGHT
+        obs[2] = player.lives / 10
+        obs[3] = player.weapon_level / MAX_WEAPON_LEVEL
+        obs[4] = player.is_invincible
+        obs[5] = g.game_state == GAME_STATE_SKILL_SELECTION
+        obs[6] = g.game_state == GAME_STATE_BOSS_FIGHT
+        obs[7] = g.boss.health / game.BOSS_HEALTH if g.boss is not None else 0
+
+        world = g.world
+        enemies = np.flatnonzero(world.alive & (world.kind == ENTITY_KIND_ENEMY))
+        write_nearest(self.enemy_features, world.pos[enemies] + world.size[enemies] / 2, world.vel[enemies], origin, NEAREST_ENEMIES)
+        field = g.boss_bullets
+        count = field.count
+        half_size = (field.bullet_width / 2, field.bullet_height / 2)
+        write_nearest(self.bullet_features, field.pos[:count] + half_size, field.vel[:count], origin, NEAREST_BOSS_BULLETS)
+        return obs # Reused by the next step, copy it to keep it
+
+    def info(self):
+        g = self.game
+        return {"score": g.score, "lives": g.player.lives, "frame": g.frame, "state": g.game_state}
+
+
+def env_seeds(n, seed):
+    # Seeds of the n games of a vector env; the process variant hands slices of these to its workers
+    seeds = random.Random(seed)
+    return [seeds.randrange(1 << 32) for i in range(n)]
+
+
+class VectorShooterEnv():
+    # n independent games stepped by one call. Finished games are reset on the spot: their row of the
+    # returned observations already belongs to the next episode, the last one is in infos[i]["final_observation"].
+    def __init__(self, n, seed=None, frame_skip=1, max_steps=MAX_EPISODE_STEPS, seeds=None):
+        if seeds is None:
+            seeds = env_seeds(n, seed)
+        self.envs = [ShooterEnv(env_seed, frame_skip, max_steps) for env_seed in seeds]
+        self.observations = np.zeros((n, OBSERVATION_SIZE), dtype=np.float32)
+        self.rewards = np.zeros(n, dtype=np.float32)
+        self.terminated = np.zeros(n, dtype=bool)
+        self.truncated = np.zeros(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self, seed=None):
+        infos = []
+        for i, env in enumerate(self.envs):
+            obs, info = env.reset(None if seed is None else seed + i)
+            self.observations[i] = obs
+            infos.append(info)
+        return self.observations, infos
+
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, reward, terminated, truncated, info = env.step(int(action))
+            if terminated or truncated:
+                info["final_observation"] = obs.copy()
+                obs, reset_info = env.reset()
+            self.observations[i] = obs
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            infos.append(info)
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
+
+    def close(self):
+        self.envs = []
+
+
+def vector_worker(connection, seeds, frame_skip, max_steps, buffers, start):
+    # Worker process of ProcessVectorShooterEnv: steps its slice of the games and writes the results
+    # straight into the shared arrays; only the commands and the info dicts go through the pipe
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1" # Leave SIGTERM to Python, so terminate() still works
+    envs = VectorShooterEnv(len(seeds), frame_skip=frame_skip, max_steps=max_steps, seeds=seeds)
+    end = start + len(seeds)
+    observations, rewards, terminated, truncated, actions = (array[start:end] for array in shared_views(buffers))
+    try:
+        while True:
+            command, argument = connection.recv()
+            if command == "step":
+                obs, step_rewards, step_terminated, step_truncated, infos = envs.step(actions)
+                rewards[:] = step_rewards
+                terminated[:] = step_terminated
+                truncated[:] = step_truncated
+            elif command == "reset":
+                obs, infos = envs.reset(None if argument is None else argument + start)
+            else:
+                break
+            observations[:] = obs
+            connection.send(infos)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        connection.close()
+
+
+def shared_views(buffers):
+    # numpy views of the shared arrays: observations, rewards, terminated, truncated, actions
+    observations, rewards, terminated, truncated, actions = buffers
+    return (np.frombuffer(observations, dtype=np.float32).reshape(-1, OBSERVATION_SIZE),
+            np.frombuffer(rewards, dtype=np.float32),
+            np.frombuffer(terminated, dtype=bool),
+            np.frombuffer(truncated, dtype=bool),
+            np.frombuffer(actions, dtype=np.int64))
+
+
+class ProcessVectorShooterEnv():
+    # VectorShooterEnv split over worker processes: each worker owns a contiguous slice of the n games and
+    # steps it with one message per call. Observations, rewards, flags and actions live in shared memory.
+    # Workers are spawned (not forked), so a parent that already runs a Game with a display is no problem.
+    def __init__(self, n, workers=None, seed=None, frame_skip=1, max_steps=MAX_EPISODE_STEPS):
+        workers = max(1, min(n, workers or os.cpu_count() or 1))
+        context = multiprocessing.get_context("spawn")
+        self.buffers = (context.RawArray("f", n * OBSERVATION_SIZE), context.RawArray("f", n),
+                        context.RawArray("b", n), context.RawArray("b", n), context.RawArray("q", n))
+        self.observations, self.rewards, self.terminated, self.truncated, self.actions = shared_views(self.buffers)
+        seeds = env_seeds(n, seed)
+        self.n = n
+        self.connections = []
+        self.processes = []
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(target=vector_worker, args=(child, seeds[start:end], frame_skip, max_steps, self.buffers, int(start)),
+                                      name=f"shooter-env-{start}", daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def __len__(self):
+        return self.n
+
+    def gather(self, command, argument=None):
+        for connection in self.connections:
+            connection.send((command, argument))
+        infos = []
+        for connection in self.connections:
+            infos.extend(connection.recv())
+        return infos
+
+    def reset(self, seed=None):
+        infos = self.gather("reset", seed)
+        return self.observations, infos
+
+    def step(self, actions):
+        self.actions[:] = actions
+        infos = self.gather("step")
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.connections = []
+        self.processes = []
@@ -0,0 +1,100 @@
+import heapq
+import itertools
+
+# Simulation-time scheduler: cooldowns, durations and periodic spawns register a Timer instead of comparing
+# get_ticks() against their own timestamp every tick. run(now) pops only the timers that are due, so a tick
+# costs O(due timers * log pending) however many timers are waiting.
+#
+# Timers due in the same run fire in (due, slot, creation) order. The slot is a fixed rank per kind of timer
+# (TIMER_* in game.py) rather than registration order, so a game rebuilt from a snapshot, which registers its
+# timers again in whatever order, fires them exactly as the original did.
+#
+# A timer is due once now is past its due time (like the old `now - last > interval` checks). A repeating
+# timer is re-armed interval ms after the tick it fired in, before its callback runs, so the callback can
+# still stop it or move it.
+
+
+class Timer():
+    def __init__(self, scheduler, slot, sequence, callback, interval):
+        self.scheduler = scheduler
+        self.slot = slot
+        self.sequence = sequence
+        self.callback = callback # callback(now)
+        self.interval = interval # ms between firings, None for a one-shot timer
+        self.due = None # None while stopped
+        self.entry = None # Live heap entry
+
+    @property
+    def active(self):
+        return self.entry is not None
+
+    def start(self, due):
+        self.scheduler.push(self, due)
+
+    def stop(self):
+        self.scheduler.remove(self)
+
+
+class Scheduler():
+    def __init__(self):
+        self.heap = [] # [due, slot, sequence, push id, timer or None once stopped or moved]
+        self.sequence = itertools.count()
+        self.pushes = itertools.count()
+        self.stale = 0 # Dead entries still in the heap
+        # Metrics
+        self.fired = 0
+        self.peak = 0
+
+    def timer(self, slot, callback, interval=None):
+        # A stopped timer; start(due) arms it
+        return Timer(self, slot, next(self.sequence), callback, interval)
+
+    def push(self, timer, due):
+        if timer.entry is not None:
+            self.remove(timer)
+        timer.due = due
+        timer.entry = [due, timer.slot, timer.sequence, next(self.pushes), timer]
+        heapq.heappush(self.heap, timer.entry)
+        self.peak = max(self.peak, len(self.heap) - self.stale)
+
+    def remove(self, timer):
+        # Lazy: the entry stays in the heap, marked dead, until it reaches the top or the heap is compacted
+        if timer.entry is None:
+            return
+        timer.entry[-1] = None
+        timer.entry = None
+        timer.due = None
+        self.stale += 1
+        if self.stale > 64 and self.stale > len(self.heap) // 2:
+            # In place: run() may be iterating this list (a callback stopping or moving timers)
+            self.heap[:] = [entry for entry in self.heap if entry[-1] is not None]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def run(self, now):
+        heap = self.heap
+        while heap and heap[0][0] < now:
+            timer = heapq.heappop(heap)[-1]
+            if timer is None:
+                self.stale -= 1
+                continue
+            timer.entry = None
+            timer.due = None
+            if timer.interval is not None:
+                self.push(timer, now + timer.interval)
+            self.fired += 1
+            timer.callback(now)
+
+    def clear(self):
+        for entry in self.heap:
+            if entry[-1] is not None:
+                entry[-1].entry = None
+                entry[-1].due = None
+        self.heap.clear()
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.heap) - self.stale
+
+    def metrics(self):
+        return {"pending": len(self), "peak": self.peak, "fired": self.fired}
@@ -0,0 +1,408 @@
+# Game state snapshots and the practice-mode rewind buffer.
+# capture(game) packs everything that decides how the game goes on (the game's counters and timers, the
+# rng, the World and boss bullet arrays, the player, wingmen, drones, boss and wave director) into one
+# bytes object; restore(game, data) puts a game back into exactly that state, so the same inputs
+# afterwards give the same frames as they did the first time. Sprite groups and render layers are
+# rebuilt in their original order (it decides collision and kill order).
+#
+# RewindBuffer keeps the last few seconds of snapshots in a fixed memory budget: every KEYFRAME_INTERVAL-th
+# snapshot is stored whole, the ones in between zlib-compressed with their keyframe as the preset
+# dictionary, so they only cost what changed (entity rows move around as entities come and go, which a
+# dictionary match follows and a byte-wise XOR would not).
+import json
+import math
+import struct
+import zlib
+from collections import deque
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"BHSS"
+SNAPSHOT_VERSION = 2 # 2: bullet and entity kinds renumbered (BULLET_KIND_SPLIT)
+# magic, version, frame, clock time, start time, game time, score, next upgrade / life / wingman / skill score,
+# game state, last fireball spawn, last bouncing ball generation
+GAME_STRUCT = struct.Struct("<4sHQdddqqqqqBdd")
+# x, y, lives, weapon level, shoot delay, last shot, invincible, invincible since, visible, last flash,
+# split shot, split shot end, electromagnetic wave
+PLAYER_STRUCT = struct.Struct("<iiiiid?d?d?d?")
+# last timed spawn, interval, budget, population, peak population, spawned, throttled, blocked ticks
+DIRECTOR_STRUCT = struct.Struct("<ddiiiqqq")
+WINGMAN_STRUCT = struct.Struct("<iidi") # x, y, last shot, offset x
+DRONE_STRUCT = struct.Struct("<iidd") # x, y, angle, last shot
+BOSS_STRUCT = struct.Struct("<qiiiiqq") # health, x, y, speed x, phase, damage in window, total damage
+EMITTER_STRUCT = struct.Struct("<dI") # last fire, volleys
+COUNT = struct.Struct("<I")
+
+# all_sprites order codes
+SPRITE_PLAYER = b"P"
+SPRITE_WINGMAN = b"W"
+SPRITE_DRONE = b"D"
+SPRITE_BOSS = b"B"
+
+DIRECTOR_REASONS = ("timed", "replace", "escaped") # Spawn request reasons, stored by index
+
+REWIND_INTERVAL = 6 # Simulation ticks between rewind snapshots (10 per second)
+REWIND_SECONDS = 10 # How far back the buffer reaches
+REWIND_MEMORY_LIMIT = 8 * 1024 * 1024 # Bytes kept at most; the oldest snapshots go first
+KEYFRAME_INTERVAL = 10 # Every 10th snapshot is stored whole
+DELTA_LEVEL = 1 # zlib level of the deltas (fast; the dictionary does most of the work)
+DELTA_WINDOW = 32768 # zlib only looks back this far, so that much of the keyframe is the dictionary
+
+
+class Writer():
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, packer, *values):
+        self.parts.append(packer.pack(*values))
+
+    def array(self, values, dtype):
+        values = np.ascontiguousarray(values, dtype=dtype)
+        self.parts.append(COUNT.pack(values.size))
+        self.parts.append(values.tobytes())
+
+    def raw(self, data):
+        self.parts.append(COUNT.pack(len(data)))
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+class Reader():
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, packer):
+        values = packer.unpack_from(self.data, self.offset)
+        self.offset += packer.size
+        return values
+
+    def array(self, dtype, columns=None):
+        size = COUNT.unpack_from(self.data, self.offset)[0]
+        self.offset += COUNT.size
+        values = np.frombuffer(self.data, dtype=dtype, count=size, offset=self.offset)
+        self.offset += values.nbytes
+        return values.reshape(-1, columns) if columns else values
+
+    def raw(self):
+        size = COUNT.unpack_from(self.data, self.offset)[0]
+        self.offset += COUNT.size
+        data = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+
+def id_dtype(capacity):
+    return np.uint16 if capacity <= 1 << 16 else np.uint32
+
+
+def capture(game):
+    from game import Bullet, Wingman, Drone, Boss, LAYER_PLAYER, SKILLS
+    out = Writer()
+    out.pack(GAME_STRUCT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, game.frame, game.clock.time, game.start_time, game.game_time,
+             game.score, game.next_upgrade_score, game.next_life_score, game.next_wingman_score, game.next_skill_score,
+             game.game_state, game.last_fireball_spawn, game.last_bouncing_ball_gen)
+    skill_names = list(SKILLS)
+    out.raw(bytes(skill_names.index(name) for name in game.skill_options_display))
+
+    # rng: Mersenne Twister words, plus the cached gauss value (NaN for none)
+    version, words, gauss = game.rng.getstate()
+    out.array(words, np.uint32)
+    out.array([math.nan if gauss is None else gauss], np.float64)
+
+    player = game.player
+    out.pack(PLAYER_STRUCT, player.rect.x, player.rect.y, player.lives, player.weapon_level, player.shoot_delay, player.last_shot,
+             player.is_invincible, player.invincible_start_time, game.layers.is_visible(LAYER_PLAYER), player.last_flash_time,
+             player.has_split_shot, player.split_shot_end_time, player.has_electromagnetic_wave)
+
+    # Updated sprites, in all_sprites order
+    order = bytearray()
+    wingmen = []
+    drones = []
+    boss = None
+    for sprite in game.all_sprites:
+        if sprite is player:
+            order += SPRITE_PLAYER
+        elif isinstance(sprite, Wingman):
+            order += SPRITE_WINGMAN
+            wingmen.append(WINGMAN_STRUCT.pack(sprite.rect.x, sprite.rect.y, sprite.last_shot, sprite.offset_x))
+        elif isinstance(sprite, Drone):
+            order += SPRITE_DRONE
+            drones.append(DRONE_STRUCT.pack(sprite.rect.x, sprite.rect.y, sprite.angle, sprite.last_shot))
+        elif isinstance(sprite, Boss):
+            order += SPRITE_BOSS
+            boss = sprite
+    out.raw(bytes(order))
+    out.raw(b"".join(wingmen))
+    out.raw(b"".join(drones))
+    if boss is not None:
+        meter = boss.damage_meter
+        out.pack(BOSS_STRUCT, boss.health, boss.rect.x, boss.rect.y, boss.speed_x, boss.phase, meter.window_total, meter.total)
+        out.raw(b"".join(EMITTER_STRUCT.pack(emitter.last_fire, emitter.volleys) for emitter in boss.emitters))
+        out.raw(json.dumps(boss.phases).encode()) # Plain data; a game may fight other phases than BOSS_PHASES
+        out.array(list(meter.events), np.float64)
+
+    director = game.director
+    out.pack(DIRECTOR_STRUCT, director.last_timed_spawn, director.interval, director.budget, director.population,
+             director.peak_population, director.spawned, director.throttled, director.blocked_ticks)
+    out.raw(bytes(DIRECTOR_REASONS.index(reason) for reason in director.queue))
+
+    # World: component rows of the live entities, the free list, and the proxies group by group in group
+    # order (restore adds them back in the same order); bullets also carry their shot parameters
+    world = game.world
+    live, data, tags, free = world.state()
+    ids = id_dtype(world.capacity)
+    out.pack(COUNT, world.capacity)
+    out.array(live, ids)
+    out.array(data, np.float64)
+    out.array(tags, np.int32)
+    out.array(free, ids)
+    entities = []
+    shots = []
+    for group in (game.enemies, game.fireballs, game.bouncing_balls, game.bullets):
+        for proxy in group:
+            entities.append(proxy.entity)
+            if isinstance(proxy, Bullet):
+                shots.append((proxy.speed, proxy.angle, proxy.is_electromagnetic))
+    out.array(entities, ids)
+    out.array(shots, np.float64)
+    pool = game.bullet_pool
+    out.pack(COUNT, pool.capacity)
+    out.pack(COUNT, pool.exhausted_count)
+
+    field = game.boss_bullets
+    count = field.count
+    out.array(field.pos[:count], np.float64)
+    out.array(field.vel[:count], np.float64)
+    out.array([field.emitted, field.peak], np.int64)
+    return out.getvalue()
+
+
+def restore(game, data):
+    from game import (Enemy, Bullet, Fireball, BouncingBall, Wingman, Drone, Boss, LAYER_PLAYER, SKILLS, NO_INPUT,
+                      GAME_STATE_SKILL_SELECTION, ENTITY_KIND_ENEMY, ENTITY_KIND_FIREBALL, ENTITY_KIND_BOUNCING_BALL)
+    from patterns import PatternEmitter
+    src = Reader(data)
+    (magic, version, game.frame, game.clock.time, game.start_time, game.game_time, game.score, game.next_upgrade_score,
+     game.next_life_score, game.next_wingman_score, game.next_skill_score, game.game_state, game.last_fireball_spawn,
+     game.last_bouncing_ball_gen) = src.unpack(GAME_STRUCT)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"not a version {SNAPSHOT_VERSION} snapshot")
+    skill_names = list(SKILLS)
+    game.skill_options_display = [skill_names[index] for index in src.raw()]
+    words = tuple(src.array(np.uint32).tolist())
+    gauss = src.array(np.float64)[0]
+    rng_state = (3, words, None if math.isnan(gauss) else float(gauss))
+
+    # Take everything apart; the world arrays are replaced wholesale below, so nothing is destroyed one by one.
+    # Timers are armed again from the restored fields (their slots keep the firing order, see scheduler.py)
+    player = game.player
+    game.timers.clear()
+    game.bullet_pool.release_all(game.bullets.sprites())
+    for group in (game.all_sprites, game.enemies, game.bullets, game.fireballs, game.bouncing_balls, game.boss_group,
+                  player.wingmen, player.drones):
+        group.empty()
+    game.layers.empty()
+    game.boss = None
+
+    (player.rect.x, player.rect.y, player.lives, player.weapon_level, player.shoot_delay, player.last_shot,
+     player.is_invincible, player.invincible_start_time, visible, player.last_flash_time, player.has_split_shot,
+     player.split_shot_end_time, player.has_electromagnetic_wave) = src.unpack(PLAYER_STRUCT)
+    game.layers.set_visible(LAYER_PLAYER, visible)
+    player.schedule()
+
+    order = src.raw()
+    wingmen = src.raw()
+    drones = src.raw()
+    wingman_offset = drone_offset = 0
+    for code in order:
+        code = bytes((code,))
+        if code == SPRITE_PLAYER:
+            game.add_sprite(player)
+        elif code == SPRITE_WINGMAN:
+            x, y, last_shot, offset_x = WINGMAN_STRUCT.unpack_from(wingmen, wingman_offset)
+            wingman_offset += WINGMAN_STRUCT.size
+            wingman = Wingman(game, 0, 0, offset_x)
+            wingman.rect.topleft = (x, y)
+            wingman.last_shot = last_shot
+            game.add_sprite(wingman, player.wingmen)
+        elif code == SPRITE_DRONE:
+            x, y, angle, last_shot = DRONE_STRUCT.unpack_from(drones, drone_offset)
+            drone_offset += DRONE_STRUCT.size
+            drone = Drone(game, player) # Draws a random angle; the rng state is put back last
+            drone.rect.topleft = (x, y)
+            drone.angle = angle
+            drone.last_shot = last_shot
+            drone.schedule()
+            game.add_sprite(drone, player.drones)
+        elif code == SPRITE_BOSS:
+            health, x, y, speed_x, phase, window_total, total = src.unpack(BOSS_STRUCT)
+            emitters = src.raw()
+            phases = json.loads(src.raw())
+            events = src.array(np.float64, 2)
+            boss = Boss(game, phases)
+            boss.health = health
+            boss.rect.topleft = (x, y)
+            boss.speed_x = speed_x
+            boss.phase = phase
+            boss.emitters = []
+            for i, pattern in enumerate(boss.phases[phase][1]):
+                emitter = PatternEmitter(pattern, 0)
+                emitter.last_fire, emitter.volleys = EMITTER_STRUCT.unpack_from(emitters, i * EMITTER_STRUCT.size)
+                boss.emitters.append(emitter)
+            boss.schedule()
+            meter = boss.damage_meter
+            meter.events = deque((time, int(damage)) for time, damage in events.tolist())
+            meter.window_total = window_total
+            meter.total = total
+            game.boss = boss
+            game.add_sprite(boss, game.boss_group)
+
+    director = game.director
+    (director.last_timed_spawn, director.interval, director.budget, director.population, director.peak_population,
+     director.spawned, director.throttled, director.blocked_ticks) = src.unpack(DIRECTOR_STRUCT)
+    director.queue = deque(DIRECTOR_REASONS[index] for index in src.raw())
+
+    world = game.world
+    capacity = src.unpack(COUNT)[0]
+    ids = id_dtype(capacity)
+    live = src.array(ids).astype(np.intp)
+    rows = src.array(np.float64, world.data.shape[1])
+    tags = src.array(np.int32, world.tags.shape[1])
+    free = src.array(ids).tolist()
+    world.load_state(capacity, live, rows, tags, free)
+    entities = src.array(ids).tolist()
+    shots = src.array(np.float64, 3).tolist()
+    pool = game.bullet_pool
+    pool_capacity = src.unpack(COUNT)[0]
+    if pool_capacity > pool.capacity:
+        pool.add_bullets(pool_capacity - pool.capacity)
+    pool.exhausted_count = src.unpack(COUNT)[0]
+    kinds = world.kind
+    shot = 0
+    for entity in entities:
+        kind = kinds[entity]
+        if kind == ENTITY_KIND_ENEMY:
+            game.add_entity(Enemy(game, entity), game.enemies)
+        elif kind == ENTITY_KIND_FIREBALL:
+            game.add_entity(Fireball(game, entity), game.fireballs)
+        elif kind == ENTITY_KIND_BOUNCING_BALL:
+            game.add_entity(BouncingBall(game, entity), game.bouncing_balls)
+        else:
+            speed, angle, is_electromagnetic = shots[shot]
+            shot += 1
+            game.add_entity(pool.acquire_entity(entity, speed, angle, bool(is_electromagnetic)), game.bullets)
+
+    field = game.boss_bullets
+    pos = src.array(np.float64, 2)
+    vel = src.array(np.float64, 2)
+    field.count = 0
+    field.reserve(len(pos))
+    field.pos[:len(pos)] = pos
+    field.vel[:len(vel)] = vel
+    field.count = len(pos)
+    field.emitted, field.peak = src.array(np.int64).tolist()
+
+    game.schedule_passives()
+    if game.game_state == GAME_STATE_SKILL_SELECTION:
+        game.build_skill_buttons()
+    else:
+        game.skill_buttons = []
+    game.rng.setstate(rng_state)
+    game.input = NO_INPUT
+    game.pending_input = None
+    game.drawn_state = None # Next frame is a full redraw
+
+
+class RewindBuffer():
+    def __init__(self, seconds=REWIND_SECONDS, interval=REWIND_INTERVAL, keyframe_interval=KEYFRAME_INTERVAL,
+                 memory_limit=REWIND_MEMORY_LIMIT, fps=60):
+        self.interval = interval
+        self.keyframe_interval = keyframe_interval
+        self.memory_limit = memory_limit
+        self.entries = deque(maxlen=max(1, seconds * fps // interval)) # (frame, keyframe bytes, delta or None), oldest first
+        self.fps = fps
+        self.since_keyframe = keyframe_interval
+        self.keyframe = None
+        self.memory = 0 # Bytes held (keyframes counted once)
+
+    def record(self, game):
+        # Called after every simulation tick; snapshots every interval-th one
+        if game.frame % self.interval:
+            return
+        data = capture(game)
+        if self.since_keyframe >= self.keyframe_interval:
+            self.keyframe = data
+            self.since_keyframe = 0
+            entry = (game.frame, data, None)
+            self.memory += len(data)
+        else:
+            entry = (game.frame, self.keyframe, encode(self.keyframe, data))
+            self.memory += len(entry[2])
+        self.since_keyframe += 1
+        if len(self.entries) == self.entries.maxlen:
+            self.drop_oldest()
+        self.entries.append(entry)
+        while self.memory > self.memory_limit and len(self.entries) > 1:
+            self.drop_oldest()
+
+    def drop_oldest(self):
+        frame, keyframe, delta = self.entries.popleft()
+        if delta is None:
+            self.memory -= len(keyframe)
+            # Deltas against this keyframe may follow: the oldest of them becomes a keyframe itself
+            if self.entries and self.entries[0][2] is not None and self.entries[0][1] is keyframe:
+                next_frame, next_keyframe, next_delta = self.entries.popleft()
+                promoted = decode(next_keyframe, next_delta)
+                self.memory += len(promoted) - len(next_delta)
+                self.entries.appendleft((next_frame, promoted, None))
+                self.rebase(keyframe, promoted)
+        else:
+            self.memory -= len(delta)
+
+    def rebase(self, old, new):
+        # Deltas still pointing at old keyframe bytes are re-encoded against new
+        for i, (frame, keyframe, delta) in enumerate(self.entries):
+            if delta is not None and keyframe is old:
+                rebased = encode(new, decode(old, delta))
+                self.memory += len(rebased) - len(delta)
+                self.entries[i] = (frame, new, rebased)
+        if self.keyframe is old:
+            self.keyframe = new
+
+    def seconds(self):
+        # How far back the buffer currently reaches
+        if not self.entries:
+            return 0
+        return (self.entries[-1][0] - self.entries[0][0]) / self.fps
+
+    def rewind(self, game, seconds):
+        # Puts game back to the newest snapshot at least `seconds` old (or the oldest kept); the snapshots
+        # after it are dropped. Returns the number of ticks rewound, 0 if there is nothing to go back to.
+        if not self.entries:
+            return 0
+        target = game.frame - int(seconds * self.fps)
+        while len(self.entries) > 1 and self.entries[-1][0] > target:
+            frame, keyframe, delta = self.entries.pop()
+            self.memory -= len(keyframe) if delta is None else len(delta)
+        frame, keyframe, delta = self.entries[-1]
+        rewound = game.frame - frame
+        restore(game, decode(keyframe, delta))
+        # Continue recording against a fresh keyframe
+        self.keyframe = None
+        self.since_keyframe = self.keyframe_interval
+        return rewound
+
+
+def encode(keyframe, data):
+    compressor = zlib.compressobj(DELTA_LEVEL, zdict=keyframe[-DELTA_WINDOW:])
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode(keyframe, delta):
+    if delta is None:
+        return keyframe
+    decompressor = zlib.decompressobj(zdict=keyframe[-DELTA_WINDOW:])
+    return decompressor.decompress(delta) + decompressor.flush()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# Headless: the game modules open an SDL display when a Game is created
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def pixel_cache_dir(tmp_path_factory):
+    # Keep the raw pixel cache out of the user's real cache directory. game.py builds its AssetManager on
+    # import, so its cache is pointed here as well; the environment variable covers spawned processes.
+    from assets import PIXEL_CACHE_ENV
+    import game
+    directory = str(tmp_path_factory.mktemp("pixel_cache"))
+    os.environ[PIXEL_CACHE_ENV] = directory
+    game.assets.pixel_cache.directory = directory
+    return directory
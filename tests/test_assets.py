@@ -0,0 +1,48 @@
+import os
+
+import pygame
+
+import assets
+from assets import PixelCache
+
+
+def make_image(path, color):
+    surface = pygame.Surface((6, 4), pygame.SRCALPHA)
+    surface.fill(color)
+    pygame.image.save(surface, str(path))
+
+
+def test_pixel_cache_round_trip(tmp_path):
+    image = tmp_path / "ship.png"
+    make_image(image, (10, 20, 30, 255))
+    cache = PixelCache(str(tmp_path / "cache"))
+    size, pixels = cache.read(str(image))
+    assert (size, pixels[:4], len(pixels)) == ((6, 4), bytes((10, 20, 30, 255)), 6 * 4 * 4)
+    assert cache.read(str(image)) == (size, pixels)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    scaled_size, scaled = cache.read(str(image), (12, 8)) # Another entry per target size
+    assert scaled_size == (12, 8) and len(scaled) == 12 * 8 * 4
+    assert cache.misses == 2
+
+
+def test_pixel_cache_rejects_stale_and_truncated_entries(tmp_path):
+    image = tmp_path / "ship.png"
+    make_image(image, (10, 20, 30, 255))
+    cache = PixelCache(str(tmp_path / "cache"))
+    entry = cache.entry_path(str(image), None)
+    cache.read(str(image))
+    with open(entry, "r+b") as f:
+        f.truncate(20)
+    assert cache.read(str(image))[1][:4] == bytes((10, 20, 30, 255))
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    make_image(image, (200, 0, 0, 255))
+    os.utime(image, ns=(0, os.stat(image).st_mtime_ns + 10 ** 9)) # Edited: a new size/mtime key
+    assert cache.read(str(image))[1][:4] == bytes((200, 0, 0, 255))
+    assert cache.misses == 3
+
+
+def test_cache_dir_override(monkeypatch, tmp_path):
+    monkeypatch.setenv(assets.PIXEL_CACHE_ENV, str(tmp_path))
+    assert assets.default_cache_dir() == str(tmp_path)
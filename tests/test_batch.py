@@ -0,0 +1,23 @@
+import pytest
+
+import batch
+
+
+def test_parse_overrides_reads_value_lists():
+    grid = batch.parse_overrides(["ENEMY_BUDGET=10,20", "FIREBALL_COOLDOWN=1500.5"])
+    assert grid == {"ENEMY_BUDGET": [10, 20], "FIREBALL_COOLDOWN": [1500.5]}
+    jobs = batch.make_jobs(grid, seeds=2, base_seed=7, ticks=100)
+    assert [(seed, overrides["ENEMY_BUDGET"]) for job_id, seed, overrides, ticks in jobs] == [(7, 10), (8, 10), (7, 20), (8, 20)]
+
+
+@pytest.mark.parametrize("spec", [
+    "NOT_A_CONSTANT=1", # Unknown
+    "random=1", # Not a constant
+    "FPS=30", # Fixed step
+    "GAME_STATE_PLAYING=3", # An id
+    "WINDOW_WIDTH=800", # Window size
+    "WHITE=(0, 0, 0)", # A color
+])
+def test_parse_overrides_rejects_what_cannot_be_swept(spec):
+    with pytest.raises(SystemExit):
+        batch.parse_overrides([spec])
@@ -0,0 +1,36 @@
+import numpy as np
+import pygame
+
+from bullet_engine import BulletField
+
+
+def test_step_moves_and_culls_bullets_that_leave_the_window():
+    field = BulletField(2, 100, 100, (4, 8))
+    # Emitted by centerx / bottom; the field grows past its initial capacity
+    field.emit(50, 50, np.array([[0, -30], [0, 5], [60, 0], [-3, 0], [0, 60]]))
+    assert field.count == 5 and field.emitted == 5
+    field.step() # Off the right and off the bottom
+    assert field.pos[:field.count].tolist() == [[48, 12], [48, 47], [45, 42]]
+    field.step() # Off the top; the survivors stay packed in order
+    assert field.pos[:field.count].tolist() == [[48, 52], [42, 42]]
+    assert field.vel[:field.count].tolist() == [[0, 5], [-3, 0]]
+
+
+def test_collide_rect_counts_and_removes_hits():
+    field = BulletField(8, 100, 100, (4, 8))
+    field.emit(np.array([10, 30, 50]), 50, np.zeros((3, 2)))
+    assert field.collide_rect((20, 40, 20, 20), remove=False) == 1
+    assert field.count == 3
+    assert field.collide_rect((0, 40, 40, 20)) == 2
+    assert field.pos[:field.count].tolist() == [[48, 42]]
+
+
+def test_collide_mask_skips_bullets_over_clear_pixels():
+    field = BulletField(8, 200, 200, (4, 4))
+    mask = pygame.mask.Mask((40, 40))
+    mask.draw(pygame.mask.Mask((10, 40), fill=True), (0, 0)) # Only the left quarter is solid
+    # Bullet top-lefts (x - 2, y - 4): over the solid part, over the clear part, outside the rect
+    field.emit(np.array([107, 130, 160]), np.array([124, 124, 124]), np.zeros((3, 2)))
+    assert field.collide_rect((100, 100, 40, 40), remove=False) == 2
+    assert field.collide_mask((100, 100, 40, 40), mask) == 1
+    assert field.pos[:field.count].tolist() == [[128, 120], [158, 120]]
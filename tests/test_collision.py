@@ -0,0 +1,71 @@
+import random
+
+import pygame
+import pytest
+
+import collision
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, name, x, y, w, h):
+        super().__init__()
+        self.name = name
+        self.rect = pygame.Rect(x, y, w, h)
+
+
+def scattered_groups(seed, count_a, count_b):
+    # Enemy-sized boxes against bullet-sized ones, with some large enough to span several grid cells
+    rng = random.Random(seed)
+    groupa = pygame.sprite.Group(Box(("a", i), rng.randrange(600), rng.randrange(800), rng.choice([40, 40, 150]), 40)
+                                 for i in range(count_a))
+    groupb = pygame.sprite.Group(Box(("b", i), rng.randrange(600), rng.randrange(800), 5, rng.choice([10, 10, 90]))
+                                 for i in range(count_b))
+    return groupa, groupb
+
+
+def names(hits):
+    return [(a.name, [b.name for b in bs]) for a, bs in hits.items()]
+
+
+@pytest.mark.parametrize("dokilla, dokillb", [(False, False), (True, False), (False, True), (True, True)])
+def test_groupcollide_matches_pygame(dokilla, dokillb):
+    expected_a, expected_b = scattered_groups(1, 60, 300) # Far above BRUTE_FORCE_PAIRS, so the grid is used
+    groupa, groupb = scattered_groups(1, 60, 300)
+    expected = pygame.sprite.groupcollide(expected_a, expected_b, dokilla, dokillb)
+    hits = collision.groupcollide(groupa, groupb, dokilla, dokillb)
+    assert expected and names(hits) == names(expected)
+    assert [s.name for s in groupa] == [s.name for s in expected_a]
+    assert [s.name for s in groupb] == [s.name for s in expected_b]
+
+
+def test_collided_callback_only_sees_overlapping_rects():
+    groupa, groupb = scattered_groups(2, 60, 300)
+    seen = []
+    collision.groupcollide(groupa, groupb, False, False, lambda a, b: seen.append((a, b)) or True)
+    assert seen and all(a.rect.colliderect(b.rect) for a, b in seen)
+
+
+def ring_mask(size):
+    # Only the outline is set: rects that overlap the middle miss at pixel level
+    mask = pygame.mask.Mask((size, size))
+    for i in range(size):
+        for j in (0, size - 1):
+            mask.set_at((i, j))
+            mask.set_at((j, i))
+    return mask
+
+
+def test_collide_mask_hits_set_pixels_only():
+    ring = Box("ring", 100, 100, 40, 40)
+    ring.mask = ring_mask(40)
+    inside = Box("inside", 110, 110, 10, 10) # Rects overlap, no set pixel under it
+    edge = Box("edge", 95, 110, 10, 10) # Covers the left outline
+    apart = Box("apart", 200, 200, 10, 10)
+    assert not collision.collide_mask(ring, inside)
+    assert collision.collide_mask(ring, edge) and collision.collide_mask(edge, ring)
+    assert not collision.collide_mask(ring, apart)
+    assert collision.collide_mask(inside, Box("solid", 115, 115, 10, 10)) # No masks: plain rect test
+
+    hits = collision.groupcollide(pygame.sprite.Group(ring), pygame.sprite.Group(inside, edge, apart), False, False,
+                                  collision.collide_mask)
+    assert names(hits) == [("ring", ["edge"])]
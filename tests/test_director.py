@@ -0,0 +1,31 @@
+import random
+
+from director import DifficultyCurve, WaveDirector
+
+
+def test_population_never_exceeds_the_budget():
+    rng = random.Random(4)
+    live = []
+    director = WaveDirector(lambda: live.append(0), DifficultyCurve(500, -200, 100), DifficultyCurve(5, 10, 20),
+                            max_spawns_per_tick=3, queue_limit=30)
+    for tick in range(6000):
+        now = tick * 20
+        director.update(now, len(live))
+        assert len(live) <= director.budget
+        assert len(director.queue) <= 30
+        kills = rng.randrange(4) if rng.random() < 0.2 else 0
+        del live[:kills]
+        director.request(count=kills) # Replacements, dropped while the queue is full
+    assert director.budget == 20 and director.peak_population == 20
+    assert director.throttled > 0 and director.blocked_ticks > 0
+
+
+def test_spawns_per_tick_are_capped():
+    live = []
+    director = WaveDirector(lambda: live.append(0), DifficultyCurve(1000, 0, 1000), DifficultyCurve(50, 0, 50),
+                            max_spawns_per_tick=4, queue_limit=100)
+    director.request(count=10)
+    director.update(0, 0)
+    assert len(live) == 4 and len(director.queue) == 6
+    director.update(20, len(live))
+    assert len(live) == 8
@@ -0,0 +1,52 @@
+import pygame
+
+from ecs import World, EntityGroup
+
+
+class Proxy():
+    def __init__(self, world, x, y, **kwargs):
+        self.world = world
+        self.rect = pygame.Rect(x, y, 10, 10)
+        self.image = None
+        self.group = None
+        self.entity = world.create(x, y, 10, 10, 0, proxy=self, **kwargs)
+
+    def on_removed(self):
+        self.world.destroy(self.entity)
+
+
+def test_interpolation_follows_a_bounce_and_snaps_on_reuse():
+    world = World(4, 100, 100)
+    group = EntityGroup(world)
+    ball = Proxy(world, 88, 50, vel=(4, 0), bounce=True)
+    group.add(ball)
+    world.step(0) # 88 -> 92 hits the wall, the velocity flips for the next tick
+    assert group.blit_sequence(0.5) == [(None, [90, 50])]
+
+    world.destroy(ball.entity)
+    group.remove(ball)
+    far = Proxy(world, 5, 5) # Reuses the slot
+    group.add(far)
+    assert group.blit_sequence(0.5) == [(None, [5, 5])]
+    world.pos[far.entity] = (80, 80) # Teleported
+    assert group.blit_sequence(0.5) == [(None, [80, 80])]
+
+
+def test_step_culls_expires_and_bounces():
+    world = World(2, 100, 100) # Grows on the third create
+    group = EntityGroup(world)
+    falling = Proxy(world, 10, 90, vel=(0, 5), cull=(-1, -1, 100, 100))
+    expiring = Proxy(world, 10, 10, expires=50)
+    ball = Proxy(world, 5, 50, vel=(-8, 0), bounce=True)
+    for proxy in (falling, expiring, ball):
+        group.add(proxy)
+    world.step(0)
+    assert world.count() == 3
+    assert world.vel[ball.entity].tolist() == [8, 0] # Left the window on the left, heads back
+    assert ball.rect.topleft == (-3, 50)
+    world.step(25) # 95 -> 100 is still inside the cull box
+    world.step(50)
+    assert world.count() == 1
+    assert not world.alive[falling.entity] and not world.alive[expiring.entity]
+    assert ball.rect.topleft == (13, 50)
+    assert world.capacity == 4
@@ -0,0 +1,121 @@
+import pygame
+
+import collision
+import game
+import snapshot
+from benchmarks.stress import keep_player_alive
+from game import Game, BouncingBall, FrameInput
+
+
+def ticks_for(ms):
+    return int(ms / game.FRAME_TIME) + 2
+
+
+def test_passive_spawn_starts_once_its_skill_is_offered(monkeypatch):
+    g = Game(seed=2, headless=True, render=False)
+    keep_player_alive(g)
+    spawned = []
+    add = g.fireballs.add
+    monkeypatch.setattr(g.fireballs, "add", lambda proxy: (spawned.append(proxy), add(proxy))) # Enemies may kill them at once
+    g.skill_options_display = ["Drone"]
+    for tick in range(ticks_for(game.FIREBALL_COOLDOWN)):
+        g.step()
+    assert not spawned
+    g.skill_options_display = ["Fireball"] # No schedule_passives() needed
+    for tick in range(ticks_for(game.FIREBALL_COOLDOWN)):
+        g.step()
+    assert len(spawned) == 1
+
+
+def test_bouncing_balls_respawn_after_one_is_removed():
+    g = Game(seed=2, headless=True, render=False)
+    keep_player_alive(g)
+    g.skill_options_display = ["Bouncing Ball"]
+    for i in range(game.MAX_BOUNCING_BALLS):
+        g.add_entity(BouncingBall(g), g.bouncing_balls)
+    for tick in range(ticks_for(game.BOUNCING_BALL_GEN_INTERVAL)):
+        g.step()
+    assert len(g.bouncing_balls) == game.MAX_BOUNCING_BALLS
+    next(iter(g.bouncing_balls)).kill()
+    for tick in range(ticks_for(game.BOUNCING_BALL_GEN_INTERVAL)):
+        g.step()
+    assert len(g.bouncing_balls) == game.MAX_BOUNCING_BALLS
+
+
+def test_reset_plays_out_like_a_new_game(monkeypatch):
+    monkeypatch.setattr(game, "BOSS_FIGHT_SCORE_THRESHOLD", 100)
+    inputs = [FrameInput(left=(tick // 90) % 2 == 0, right=(tick // 90) % 2 == 1, skill=0 if tick % 7 == 0 else None)
+              for tick in range(600)]
+    reused = Game(seed=4, headless=True, render=False)
+    for tick_inputs in inputs: # Leaves a boss fight, bullets and timers behind
+        reused.step(tick_inputs)
+    reused.reset(9)
+    fresh = Game(seed=9, headless=True, render=False)
+    assert snapshot.capture(reused) == snapshot.capture(fresh)
+    for tick_inputs in inputs:
+        reused.step(tick_inputs)
+        fresh.step(tick_inputs)
+    assert snapshot.capture(reused) == snapshot.capture(fresh)
+
+
+class Target():
+    # Enough of an Enemy for chain_lightning: a rect, alive() and kill()
+    def __init__(self, x, y):
+        self.rect = pygame.Rect(x, y, 40, 40)
+        self.kills = 0
+
+    def alive(self):
+        return self.kills == 0
+
+    def kill(self):
+        self.kills += 1
+
+
+def chain(targets, source, hops_left):
+    index = collision.SpatialHash(game.ELECTROMAGNETIC_RADIUS)
+    index.build(targets)
+    return game.chain_lightning(index, source, hops_left)
+
+
+def test_chain_lightning_stops_after_max_hops():
+    line = [Target(x, 300) for x in range(0, 660, 60)] # Each one only reaches its neighbours
+    killed, hops_left = chain(line, Target(-60, 300), 10)
+    assert killed == line[:game.ELECTROMAGNETIC_MAX_HOPS]
+    assert hops_left == 10 - game.ELECTROMAGNETIC_MAX_HOPS
+
+
+def test_chain_lightning_spends_the_frame_budget_and_hits_each_enemy_once():
+    line = [Target(x, 300) for x in range(0, 660, 60)]
+    killed, hops_left = chain(line, Target(-60, 300), 2)
+    assert (killed, hops_left) == (line[:2], 0)
+    assert chain(line, Target(-60, 300), 0) == ([], 0)
+
+    cluster = [Target(300 + dx, 300 + dy) for dx in (0, 20, 40) for dy in (0, 20, 40)] # All within each other's radius
+    killed, hops_left = chain(cluster, Target(320, 320), 20)
+    assert sorted(killed, key=id) == sorted(cluster, key=id)
+    assert all(target.kills == 1 for target in cluster)
+    assert hops_left == 20 - 1 - len(cluster) # A query from the source, then one from each kill that found no one left
+
+
+def test_damage_meter_window():
+    meter = game.DamageMeter(window=1000)
+    meter.record(0, 30)
+    meter.record(500, 10)
+    assert meter.dps(900) == 40
+    assert meter.dps(1000) == 10 # The first event left the window
+    assert meter.total == 40 and len(meter.events) == 1
+
+
+def test_boss_takes_one_damage_event_per_frame(monkeypatch):
+    monkeypatch.setattr(game, "BOSS_FIGHT_SCORE_THRESHOLD", 0)
+    g = Game(seed=3, headless=True, render=False)
+    keep_player_alive(g)
+    g.step() # Into the boss fight
+    g.pixel_collisions = False
+    boss = g.boss
+    x, y = boss.rect.center
+    for kind in (game.BULLET_KIND_NORMAL, game.BULLET_KIND_NORMAL, game.BULLET_KIND_SPLIT):
+        g.spawn_bullet(g.bullets, x, y, speed=0, kind=kind)
+    g.step()
+    assert [damage for time, damage in boss.damage_meter.events] == [1 + 1 + 3]
+    assert boss.health == game.BOSS_HEALTH - 5
@@ -0,0 +1,31 @@
+from governor import FrameGovernor
+
+
+def feed(governor, frame_ms, frames):
+    # Frame numbers (1-based within this run) at which the level changed, with the new level
+    changes = []
+    for frame in range(1, frames + 1):
+        level = governor.record(frame_ms)
+        if level is not None:
+            changes.append((frame, level))
+    return changes
+
+
+def test_steps_down_quickly_and_back_up_slowly():
+    governor = FrameGovernor(16, 3, window=10, degrade_cooldown=5, restore_cooldown=20)
+    # Over 90% of the budget: a level per full window, down to max_level and no further
+    assert feed(governor, 15, 50) == [(10, 1), (20, 2), (30, 3)]
+    # Between the thresholds: no change either way
+    assert feed(governor, 10, 100) == []
+    # Under 50%: back up (once the 90th percentile of the window is, i.e. one slow frame is left), then one
+    # level per restore cooldown
+    assert feed(governor, 5, 60) == [(9, 2), (29, 1), (49, 0)]
+    metrics = governor.metrics()
+    assert (metrics["degrades"], metrics["restores"], metrics["level"]) == (3, 3, 0)
+
+
+def test_a_single_spike_does_not_degrade():
+    governor = FrameGovernor(16, 3, window=10, degrade_cooldown=5, restore_cooldown=20)
+    for frame in range(40):
+        assert governor.record(40 if frame % 10 == 5 else 6) is None # The 90th percentile ignores one frame in ten
+    assert governor.level == 0
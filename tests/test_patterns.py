@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+import pytest
+
+from bullet_engine import BulletField
+from patterns import PatternEmitter
+
+
+@pytest.mark.parametrize("pattern, per_volley", [
+    ({"type": "volley", "offsets": [-20, 0, 20], "speed": 5, "interval": 100}, 3),
+    ({"type": "ring", "count": 12, "speed": 3, "spin": 0.2, "interval": 100}, 12),
+    ({"type": "fan", "count": 5, "spread": 1.0, "speed": 4, "interval": 100}, 5),
+])
+def test_every_volley_emits_the_whole_pattern(pattern, per_volley):
+    field = BulletField(4, 800, 800, (10, 10))
+    emitter = PatternEmitter(pattern, 0)
+    for i in range(4):
+        emitter.fire(field, 400, 200, (400, 700))
+    assert emitter.volleys == 4
+    assert field.count == field.emitted == 4 * per_volley
+    speeds = np.hypot(field.vel[:field.count, 0], field.vel[:field.count, 1])
+    assert np.allclose(speeds, pattern["speed"])
+
+
+def test_ring_spins_and_fan_aims_at_the_target():
+    field = BulletField(64, 800, 800, (10, 10))
+    ring = PatternEmitter({"type": "ring", "count": 4, "speed": 1, "spin": 0.5, "interval": 100}, 0)
+    ring.fire(field, 400, 200, None)
+    ring.fire(field, 400, 200, None)
+    first, second = field.vel[0], field.vel[4]
+    assert math.isclose(math.atan2(second[0], second[1]) - math.atan2(first[0], first[1]), 0.5)
+
+    field.clear()
+    fan = PatternEmitter({"type": "fan", "count": 3, "spread": 1.0, "speed": 2, "interval": 100}, 0)
+    fan.fire(field, 400, 200, (700, 500)) # Down and to the right at 45 degrees
+    middle = field.vel[1]
+    assert np.allclose(middle, (math.sqrt(2), math.sqrt(2)))
@@ -0,0 +1,39 @@
+import random
+
+import replay
+from game import Game, FrameInput
+from replay import InputRecorder, state_digest
+
+SEED = 5
+
+
+def record_session(path, ticks):
+    g = Game(seed=SEED, headless=True, render=False)
+    recorder = InputRecorder(SEED)
+    rng = random.Random(1)
+    for tick in range(ticks):
+        inputs = FrameInput(left=rng.random() < 0.4, right=rng.random() < 0.4, nudge=rng.choice([0, 0, 3, -3]),
+                            skill=rng.randrange(3) if tick % 11 == 0 else None)
+        recorder.record(inputs)
+        g.step(inputs)
+    recorder.save(path, state_digest(g))
+    return g
+
+
+def test_replay_reaches_the_recorded_state(tmp_path):
+    path = tmp_path / "session.replay"
+    recorded = record_session(path, 900)
+    replayed, matches = replay.play(path)
+    assert matches
+    assert (replayed.frame, replayed.score, len(replayed.enemies)) == (recorded.frame, recorded.score, len(recorded.enemies))
+
+
+def test_replay_cut_short_does_not_match(tmp_path):
+    path = tmp_path / "session.replay"
+    record_session(path, 300)
+    seed, inputs, digest = replay.load_replay(path)
+    assert len(inputs) == 300
+    g = Game(seed=seed, headless=True, render=False)
+    for tick_inputs in inputs[:-1]: # One tick short
+        g.step(tick_inputs)
+    assert state_digest(g) != digest
@@ -0,0 +1,89 @@
+from scheduler import Scheduler
+
+
+def test_due_timers_fire_in_due_then_slot_order():
+    timers = Scheduler()
+    fired = []
+    for name, slot, due in (("late", 0, 30), ("b", 2, 10), ("a", 1, 10), ("first", 5, 5)):
+        timers.timer(slot, lambda now, name=name: fired.append(name)).start(due)
+    timers.run(20)
+    assert fired == ["first", "a", "b"]
+    timers.run(31)
+    assert fired == ["first", "a", "b", "late"]
+    assert len(timers) == 0
+
+
+def test_timer_fires_only_once_now_is_past_due():
+    timers = Scheduler()
+    fired = []
+    timers.timer(0, fired.append).start(100)
+    timers.run(100)
+    assert fired == []
+    timers.run(100.5)
+    assert fired == [100.5]
+
+
+def test_repeating_timer_rearms_from_the_tick_it_fired_in():
+    timers = Scheduler()
+    fired = []
+    timer = timers.timer(0, fired.append, interval=10)
+    timer.start(5)
+    for now in range(0, 50, 3):
+        timers.run(now)
+    assert fired == [6, 18, 30, 42]
+    assert timer.active and timer.due == 52
+
+
+def test_stop_and_restart_inside_a_callback():
+    timers = Scheduler()
+    fired = []
+    other = timers.timer(1, lambda now: fired.append("other"))
+    other.start(5)
+
+    def first(now):
+        fired.append("first")
+        other.stop() # Due in this same run, must not fire
+        self_timer.start(now + 100) # Moves the repeating timer that run() just re-armed
+
+    self_timer = timers.timer(0, first, interval=10)
+    self_timer.start(5)
+    timers.run(6)
+    assert fired == ["first"]
+    assert len(timers) == 1 and self_timer.due == 106
+    timers.run(50)
+    assert fired == ["first"]
+
+
+def test_compaction_inside_run_keeps_every_timer_once():
+    # A callback stopping enough timers to compact the heap while run() is popping from it
+    timers = Scheduler()
+    fillers = [timers.timer(9, lambda now: None) for i in range(200)]
+    for timer in fillers:
+        timer.start(1000)
+    counts = {"a": 0, "b": 0}
+
+    def a(now):
+        counts["a"] += 1
+        for timer in fillers:
+            if timer.active:
+                timer.stop()
+            else:
+                timer.start(1000)
+
+    timers.timer(0, a, interval=1).start(0)
+    timers.timer(1, lambda now: counts.__setitem__("b", counts["b"] + 1), interval=1).start(0)
+    for now in range(1, 21):
+        timers.run(now * 2)
+        assert len(timers) == 2 + sum(timer.active for timer in fillers)
+    assert counts == {"a": 20, "b": 20}
+    assert len([entry for entry in timers.heap if entry[-1] is not None]) == len(timers)
+
+
+def test_clear_disarms_everything():
+    timers = Scheduler()
+    timer = timers.timer(0, lambda now: None, interval=5)
+    timer.start(1)
+    timers.clear()
+    assert not timer.active and len(timers) == 0
+    timers.run(100)
+    assert timers.fired == 0
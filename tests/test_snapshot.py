@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import game
+import snapshot
+from game import Game, FrameInput
+
+
+def scripted_input(tick, rng):
+    # Sweeps left and right, nudges now and then and picks the first skill whenever offered
+    return FrameInput(left=(tick // 90) % 2 == 0, right=(tick // 90) % 2 == 1, nudge=rng.choice([0, 0, 0, 1, -1]),
+                      skill=0 if tick % 7 == 0 else None)
+
+
+def loaded_game(seed):
+    # Drones, split shot, shield and both passive spawns, so every kind of timer and entity is in the snapshot
+    g = Game(seed=seed, headless=True, render=False)
+    player = g.player
+    player.activate_drone()
+    player.activate_split_shot()
+    player.activate_shield()
+    g.skill_options_display = ["Fireball", "Bouncing Ball", "Drone"]
+    return g
+
+
+@pytest.mark.parametrize("boss_threshold", [10 ** 9, 100], ids=["playing", "boss_fight"])
+def test_restore_into_a_fresh_game_plays_out_identically(monkeypatch, boss_threshold):
+    monkeypatch.setattr(game, "BOSS_FIGHT_SCORE_THRESHOLD", boss_threshold)
+    rng = random.Random(3)
+    g = loaded_game(7)
+    for tick in range(300):
+        g.step(scripted_input(tick, rng))
+    g.player.take_damage()
+    for tick in range(300, 337):
+        g.step(scripted_input(tick, rng))
+    saved = snapshot.capture(g)
+    rng_state = rng.getstate()
+    for tick in range(337, 900):
+        g.step(scripted_input(tick, rng))
+    expected = snapshot.capture(g)
+
+    restored = Game(seed=1, headless=True, render=False)
+    snapshot.restore(restored, saved)
+    assert snapshot.capture(restored) == saved
+    rng.setstate(rng_state)
+    for tick in range(337, 900):
+        restored.step(scripted_input(tick, rng))
+    assert snapshot.capture(restored) == expected
+    assert restored.timers.metrics()["pending"] == g.timers.metrics()["pending"]
+
+
+def test_rewind_returns_to_a_recorded_frame():
+    rng = random.Random(5)
+    g = loaded_game(11)
+    rewind = snapshot.RewindBuffer(interval=10, keyframe_interval=4)
+    frames = {}
+    for tick in range(400):
+        g.step(scripted_input(tick, rng))
+        rewind.record(g)
+        if g.frame % 10 == 0:
+            frames[g.frame] = snapshot.capture(g)
+    rewound = rewind.rewind(g, 2)
+    assert rewound > 0
+    assert snapshot.capture(g) == frames[g.frame]
@@ -0,0 +1,37 @@
+# Fixed-timestep driver: real elapsed time goes into an accumulator that is spent in whole simulation
+# ticks, so the game runs at the same speed whatever the render rate. Whatever is left over (alpha, 0..1)
+# tells the renderer how far between the last two simulated states to draw.
+
+MAX_CATCH_UP_TICKS = 5 # Ticks simulated per rendered frame at most; beyond that the game slows down instead of spiralling
+INTERPOLATION_SNAP_DISTANCE = 100 # Sprites that moved further than this in one tick (respawned, recycled) are not interpolated
+
+
+class FixedTimestep():
+    def __init__(self, tick_ms, max_ticks=MAX_CATCH_UP_TICKS):
+        self.tick_ms = tick_ms
+        self.max_ticks = max_ticks
+        self.accumulator = 0
+        self.alpha = 0
+        self.dropped_ms = 0 # Real time thrown away by the catch-up cap
+
+    def advance(self, elapsed_ms):
+        # Returns the number of ticks to simulate for elapsed_ms of real time
+        self.accumulator += elapsed_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        if ticks > self.max_ticks:
+            dropped = (ticks - self.max_ticks) * self.tick_ms
+            self.accumulator -= dropped
+            self.dropped_ms += dropped
+            ticks = self.max_ticks
+        self.accumulator -= ticks * self.tick_ms
+        self.alpha = self.accumulator / self.tick_ms
+        return ticks
+
+
+def interpolated_position(sprite, alpha):
+    # Top-left between the sprite's position before the last tick (prev_topleft) and now
+    x0, y0 = sprite.prev_topleft
+    x1, y1 = sprite.rect.topleft
+    if abs(x1 - x0) + abs(y1 - y0) > INTERPOLATION_SNAP_DISTANCE:
+        return x1, y1
+    return x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha